@@ -0,0 +1,129 @@
+"""
+Admission control for reviews: bounds how many run at once and how many may wait for a turn.
+
+Without it a burst of pull request events piles review coroutines onto the event loop until memory or provider limits
+give out. Reviews beyond the in-flight limit wait in a FIFO queue, and once that is full too new reviews are refused
+with a 503 and a Retry-After. Azure DevOps retries refused webhook deliveries later on its own.
+
+A review is admitted in two steps, because webhooks are acknowledged before the review starts in the background: a
+place is reserved when the request is accepted, and turned into a running slot when the review starts.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import logfire
+from fastapi import HTTPException
+
+from app.auth import get_azure_devops_settings
+
+_queued_reviews = logfire.metric_up_down_counter(
+    "reviews.queued", unit="{review}", description="Reviews accepted but not yet running."
+)
+_running_reviews = logfire.metric_up_down_counter(
+    "reviews.in_flight", unit="{review}", description="Reviews currently running."
+)
+_admission_wait = logfire.metric_histogram(
+    "reviews.admission_wait", unit="s", description="Time a review waited in the queue before it started running."
+)
+_rejected_reviews = logfire.metric_counter(
+    "reviews.rejected", unit="{review}", description="Reviews refused because the queue was full."
+)
+
+
+class ReviewAdmissionController:
+    """Bounded in-flight slots with a bounded FIFO queue in front of them."""
+
+    def __init__(self, max_in_flight: int, max_queued: int, initial_duration_seconds: float = 60.0):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.queued = 0
+        # Moving average of review durations, to tell refused callers when a place is likely to be free again
+        self.average_duration_seconds = initial_duration_seconds
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def retry_after_seconds(self) -> int:
+        """Rough estimate of when there will be room again, given the reviews ahead and how long reviews take."""
+        backlog = self.queued + self.in_flight - self.max_in_flight - self.max_queued + 1
+        return max(1, math.ceil(self.average_duration_seconds * max(1, backlog) / self.max_in_flight))
+
+    def reserve(self) -> None:
+        """
+        Reserve a place for a review that will start later.
+
+        Raises:
+            HTTPException: 503 with a Retry-After header if the slots and the queue are all taken
+        """
+        if self.queued + self.in_flight >= self.max_in_flight + self.max_queued:
+            retry_after = self.retry_after_seconds()
+            _rejected_reviews.add(1)
+            logfire.warning("Refusing review, admission queue is full.", queued=self.queued, retry_after=retry_after)
+            raise HTTPException(
+                status_code=503,
+                detail="Too many reviews in progress, try again later",
+                headers={"Retry-After": str(retry_after)},
+            )
+        self.queued += 1
+        _queued_reviews.add(1)
+
+    def withdraw(self) -> None:
+        """Give back a reserved place that won't be used after all."""
+        if self.queued > 0:
+            self.queued -= 1
+            _queued_reviews.add(-1)
+
+    @asynccontextmanager
+    async def running(self) -> AsyncIterator[None]:
+        """Wait for a running slot and hold it for the duration of the review, using up a reservation if one exists."""
+        queued_at = time.monotonic()
+        await self._acquire_slot()
+        self.withdraw()
+        _running_reviews.add(1)
+        started_at = time.monotonic()
+        _admission_wait.record(started_at - queued_at)
+        try:
+            yield
+        finally:
+            duration = time.monotonic() - started_at
+            self.average_duration_seconds = 0.8 * self.average_duration_seconds + 0.2 * duration
+            _running_reviews.add(-1)
+            self._release_slot()
+
+    async def _acquire_slot(self) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we got cancelled, pass it on
+                self._release_slot()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release_slot(self) -> None:
+        # Hand the slot straight to the next waiter, so in_flight stays the same and nobody can jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+@lru_cache(maxsize=1)
+def get_review_admission() -> ReviewAdmissionController:
+    """Instantiate the process-wide review admission controller or return the existing one."""
+    settings = get_azure_devops_settings()
+    return ReviewAdmissionController(max_in_flight=settings.REVIEW_MAX_IN_FLIGHT, max_queued=settings.REVIEW_MAX_QUEUED)
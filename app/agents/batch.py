@@ -0,0 +1,179 @@
+"""
+Message batch backends for deferred reviews.
+
+Batched requests cost about half as much as interactive ones and count against a separate quota, in exchange for taking
+up to a day to complete. Reviews that nobody is waiting for, like those of draft pull requests or backlog sweeps, don't
+need anything faster than that.
+
+A batch request can't run a pydantic-ai agent loop, so the review output is requested as the input of a forced tool
+call with the schema of BatchReviewOutput. That gives the same structured result as the sub-agents' output type.
+
+The local backend runs the same requests through a pydantic-ai model in the background. It stands in for the batch
+endpoint in tests and local development.
+"""
+
+import asyncio
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from typing import cast
+
+import logfire
+from anthropic import AsyncAnthropic
+from anthropic.types.message_create_params import MessageCreateParamsNonStreaming
+from anthropic.types.messages.batch_create_params import Request
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_ai import Agent
+from pydantic_ai.models import Model
+
+from app.agents.http_client import HttpLane, current_anthropic_client, get_llm_http_client
+from app.agents.models import sub_agent_model
+from app.auth import get_azure_devops_settings
+from app.models.review_models import CompactFinding
+
+REVIEW_OUTPUT_TOOL = "submit_review"
+
+
+class BatchReviewOutput(BaseModel):
+    items: list[CompactFinding] | None = Field(
+        description="The rule violations in the file, or null if there is nothing to comment on."
+    )
+
+
+@dataclass
+class BatchReviewRequest:
+    custom_id: str
+    system_prompt: str
+    user_prompt: str
+
+
+class BatchStatus(str, Enum):
+    IN_PROGRESS = "in_progress"
+    ENDED = "ended"
+
+
+class BatchBackend(ABC):
+    """Submits review requests as one batch and collects their results once the batch has ended."""
+
+    @abstractmethod
+    async def submit(self, requests: list[BatchReviewRequest]) -> str:
+        """Submit the requests as one batch and return its id."""
+
+    @abstractmethod
+    async def status(self, batch_id: str) -> BatchStatus:
+        """Report whether the batch has ended."""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> dict[str, list[CompactFinding] | None]:
+        """The review output per custom_id. Requests that failed are left out."""
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """The Anthropic Message Batches API."""
+
+    def __init__(self, client: AsyncAnthropic, model_name: str, max_tokens: int, lane: HttpLane | None = None):
+        self._client = client
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        # The lane of the shared HTTP client the client is built on, if any, see http_client.py
+        self.lane = lane
+
+    @property
+    def client(self) -> AsyncAnthropic:
+        if self.lane is not None:
+            self._client = cast(AsyncAnthropic, current_anthropic_client(self._client, self.lane))
+        return self._client
+
+    def _params(self, request: BatchReviewRequest) -> MessageCreateParamsNonStreaming:
+        return {
+            "model": self.model_name,
+            "max_tokens": self.max_tokens,
+            "system": request.system_prompt,
+            "messages": [{"role": "user", "content": request.user_prompt}],
+            "tools": [
+                {
+                    "name": REVIEW_OUTPUT_TOOL,
+                    "description": "Submit the outcome of the review.",
+                    "input_schema": BatchReviewOutput.model_json_schema(),
+                }
+            ],
+            "tool_choice": {"type": "tool", "name": REVIEW_OUTPUT_TOOL},
+        }
+
+    async def submit(self, requests: list[BatchReviewRequest]) -> str:
+        """See BatchBackend.submit."""
+        batch = await self.client.messages.batches.create(
+            requests=[Request(custom_id=request.custom_id, params=self._params(request)) for request in requests]
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> BatchStatus:
+        """See BatchBackend.status."""
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        return BatchStatus.ENDED if batch.processing_status == "ended" else BatchStatus.IN_PROGRESS
+
+    async def results(self, batch_id: str) -> dict[str, list[CompactFinding] | None]:
+        """See BatchBackend.results."""
+        outputs = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type != "succeeded":
+                logfire.warning("Batch review request failed.", custom_id=entry.custom_id, result=entry.result.type)
+                continue
+            for block in entry.result.message.content:
+                if block.type == "tool_use" and block.name == REVIEW_OUTPUT_TOOL:
+                    try:
+                        outputs[entry.custom_id] = BatchReviewOutput.model_validate(block.input).items
+                    except ValidationError as e:
+                        logfire.warning("Invalid batch review output.", custom_id=entry.custom_id, error=str(e))
+        return outputs
+
+
+class LocalBatchBackend(BatchBackend):
+    """Runs batches in the background with a pydantic-ai model, as a stand-in for a provider's batch endpoint."""
+
+    def __init__(self, model: Model):
+        self.model = model
+        self._batches: dict[str, asyncio.Task] = {}
+
+    async def _run_request(self, request: BatchReviewRequest) -> list[CompactFinding] | None:
+        agent = Agent(model=self.model, output_type=BatchReviewOutput, system_prompt=request.system_prompt)
+        return (await agent.run(request.user_prompt)).output.items
+
+    async def _run_batch(self, requests: list[BatchReviewRequest]) -> dict[str, list[CompactFinding] | None]:
+        outputs = await asyncio.gather(*(self._run_request(request) for request in requests), return_exceptions=True)
+        results = {}
+        for request, output in zip(requests, outputs):
+            if isinstance(output, Exception):
+                logfire.warning("Batch review request failed.", custom_id=request.custom_id, error=str(output))
+            else:
+                results[request.custom_id] = output
+        return results
+
+    async def submit(self, requests: list[BatchReviewRequest]) -> str:
+        """See BatchBackend.submit."""
+        batch_id = f"local-{uuid.uuid4().hex}"
+        self._batches[batch_id] = asyncio.create_task(self._run_batch(requests))
+        return batch_id
+
+    async def status(self, batch_id: str) -> BatchStatus:
+        """See BatchBackend.status."""
+        return BatchStatus.ENDED if self._batches[batch_id].done() else BatchStatus.IN_PROGRESS
+
+    async def results(self, batch_id: str) -> dict[str, list[CompactFinding] | None]:
+        """See BatchBackend.results."""
+        return await self._batches.pop(batch_id)
+
+
+@lru_cache(maxsize=1)
+def get_batch_backend() -> BatchBackend:
+    """Instantiate the configured batch backend or return the existing one."""
+    settings = get_azure_devops_settings()
+    if settings.BATCH_BACKEND == "local":
+        return LocalBatchBackend(sub_agent_model)
+
+    client = AsyncAnthropic(api_key=settings.AGENT_API_KEY, http_client=get_llm_http_client(HttpLane.BULK))
+    return AnthropicBatchBackend(
+        client, model_name=settings.BATCH_MODEL, max_tokens=settings.BATCH_MAX_TOKENS, lane=HttpLane.BULK
+    )
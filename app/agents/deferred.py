@@ -0,0 +1,290 @@
+"""
+Deferred reviews: the files of one or more pull requests are reviewed in a single provider message batch.
+
+Unlike the interactive review there's no coordinator agent here. Which files to review, with which rules, and how to
+post the outcome is fixed anyway, so a plain pipeline does the coordinator's part:
+1. collect the reviewable files of every pull request from their diffs;
+2. submit one review request per file, all together as one batch, see batch.py;
+3. poll until the batch has ended;
+4. post the outcome of every file as comment threads, and a summary per pull request.
+"""
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+
+import logfire
+
+from app.agents.batch import BatchReviewRequest, BatchStatus, get_batch_backend
+from app.agents.fallback import post_review_error_comment
+from app.agents.file_batching import cap_findings
+from app.agents.sub_agents import review_specification
+from app.analysis import StaticReview, run_static_checks
+from app.analysis.positions import LineIndex
+from app.analysis.risk import rank_changes
+from app.analysis.triviality import SKIPPED_CHANGES, TrivialChange, classify_change, rules_for_change
+from app.auth import get_azure_devops_settings
+from app.mcp.operations import create_thread, get_blob_content, get_diffs, get_item, get_pull_request
+from app.models.azure_devops.comment_thread_models import Comment, CommentPosition, CommentThreadContext
+from app.models.azure_devops.enums import GitVersionType
+from app.models.azure_devops.lean_models import DiffSummary
+from app.models.review_models import (
+    CompactFinding,
+    ReviewComment,
+    ReviewInput,
+    ReviewOutcomeItem,
+    ReviewRuleLanguage,
+    ReviewRuleSeverity,
+)
+from app.prompts.comments import (
+    DECLINED_COMMENT_TEMPLATE,
+    DEFERRED_SUMMARY,
+    FAILED_FILES_NOTE,
+    GENERIC_COMMENT_TEMPLATE,
+    NO_ISSUES_SUMMARY,
+    NOTHING_TO_REVIEW_NOTE,
+    RULE_COMMENT_TEMPLATE,
+    SUMMARY_COMMENT_TEMPLATE,
+    SUMMARY_ROW_TEMPLATE,
+    TRIVIAL_FILES_NOTE,
+)
+from app.prompts.markdown_reviewer import MD_REVIEWER_PROMPT
+from app.prompts.python_reviewer import PYTHON_REVIEWER_PROMPT
+from app.prompts.sql_reviewer import SQL_REVIEWER_PROMPT
+from app.rules import get_review_rules
+
+LANGUAGES_BY_EXTENSION = {
+    ".py": ReviewRuleLanguage.PYTHON,
+    ".sql": ReviewRuleLanguage.SQL,
+    ".md": ReviewRuleLanguage.MD,
+}
+REVIEWER_PROMPTS = {
+    ReviewRuleLanguage.PYTHON: PYTHON_REVIEWER_PROMPT,
+    ReviewRuleLanguage.SQL: SQL_REVIEWER_PROMPT,
+    ReviewRuleLanguage.MD: MD_REVIEWER_PROMPT,
+}
+REVIEW_USER_PROMPT = "Complete the review with the specification provided."
+
+
+@dataclass
+class FileReviewJob:
+    """A file to review. Files with a change too trivial to review have no request, they're only noted in the summary."""
+
+    pull_request_id: int
+    repository_id: str
+    file_path: str
+    request: BatchReviewRequest | None
+    static_review: StaticReview
+    trivial_change: TrivialChange | None = None
+    # Of the content under review, to repair the positions the reviewer comes back with
+    line_index: LineIndex | None = None
+
+
+def _branch_name(ref_name: str) -> str:
+    return ref_name.removeprefix("refs/heads/")
+
+
+async def _base_content(repository_id: str, file_path: str, original_object_id: str) -> str | None:
+    try:
+        return await get_blob_content(repository_id, original_object_id)
+    except Exception as e:
+        # The file is reviewed in full then, as if its change wasn't trivial
+        logfire.warning("Couldn't retrieve the previous version of a file.", file_path=file_path, error=str(e))
+        return None
+
+
+async def collect_review_jobs(pull_request_id: int) -> list[FileReviewJob]:
+    """One review job for every changed file of the pull request that one of the reviewers can handle."""
+    pull_request = await get_pull_request(pull_request_id)
+    repository_id = str(pull_request.repository.id)
+    source_branch = _branch_name(pull_request.source_ref_name)
+    target_branch = _branch_name(pull_request.target_ref_name)
+    # Ranked by risk so that, if the batch doesn't finish in time, what's missing matters least
+    diffs = await rank_changes(
+        repository_id,
+        target_branch,
+        DiffSummary.from_diffs(await get_diffs(repository_id, target_branch, source_branch)),
+    )
+
+    jobs = []
+    for index, change in enumerate(diffs.changes):
+        language = LANGUAGES_BY_EXTENSION.get(PurePosixPath(change.path).suffix.lower())
+        if language is None or "delete" in change.change_type.lower():
+            continue
+
+        item = await get_item(
+            repository_id, change.path, source_branch, GitVersionType.BRANCH, object_id=change.object_id
+        )
+        content = item.content or ""
+        trivial_change = None
+        if get_azure_devops_settings().SKIP_TRIVIAL_CHANGES and change.original_object_id:
+            trivial_change = classify_change(
+                language, content, await _base_content(repository_id, change.path, change.original_object_id)
+            )
+        # A trivial change is only reviewed against the rules it can violate, if there are any
+        rules = (
+            []
+            if trivial_change in SKIPPED_CHANGES
+            else rules_for_change(await get_review_rules(language), trivial_change)
+        )
+        if trivial_change is not None and not rules:
+            jobs.append(
+                FileReviewJob(pull_request_id, repository_id, change.path, None, StaticReview([], []), trivial_change)
+            )
+            continue
+
+        static_review = run_static_checks(language, change.path, content, rules)
+        review_input = ReviewInput(reviewRules=static_review.remaining_rules, filePath=change.path, fileContent=content)
+        request = BatchReviewRequest(
+            # Batch APIs limit custom ids to short alphanumeric strings, so the path can't be part of it
+            custom_id=f"pr{pull_request_id}-file{index}",
+            system_prompt=REVIEWER_PROMPTS[language] + "\n\n" + review_specification(review_input),
+            user_prompt=REVIEW_USER_PROMPT,
+        )
+        jobs.append(
+            FileReviewJob(
+                pull_request_id, repository_id, change.path, request, static_review, line_index=LineIndex(content)
+            )
+        )
+    return jobs
+
+
+def render_review_comment(review_comment: ReviewComment) -> str:
+    """Render a sub-agent's review comment in the format the coordinator would use."""
+    if review_comment.rule_level == ReviewRuleSeverity.DECLINED:
+        return DECLINED_COMMENT_TEMPLATE
+    if review_comment.rule_level == ReviewRuleSeverity.GENERIC or review_comment.rule_id is None:
+        return GENERIC_COMMENT_TEMPLATE.format(
+            problem_description=review_comment.problem_description, expected_fix=review_comment.expected_fix or ""
+        )
+    return RULE_COMMENT_TEMPLATE.format(
+        rule_level=review_comment.rule_level.value.upper(),
+        rule_title=review_comment.rule_title or "",
+        rule_id=review_comment.rule_id,
+        problem_description=review_comment.problem_description,
+        expected_fix=review_comment.expected_fix or "",
+    )
+
+
+def _thread_context(file_path: str, item: ReviewOutcomeItem) -> CommentThreadContext:
+    start_line = item.start_line or 1
+    end_line = max(item.end_line or start_line, start_line)
+    return CommentThreadContext.model_validate(
+        {
+            "filePath": file_path,
+            "rightFileStart": CommentPosition(line=start_line, offset=item.start_offset or 1),
+            "rightFileEnd": CommentPosition(line=end_line, offset=item.end_offset or 1),
+        }
+    )
+
+
+def render_summary_comment(
+    outcomes: dict[str, list[ReviewOutcomeItem] | None],
+    failed_file_paths: list[str],
+    trivial_file_paths: list[str] | None = None,
+) -> str:
+    """Summary table with one row per combination of file and severity level."""
+    rows = []
+    for file_path, items in outcomes.items():
+        levels = Counter(item.review_comment.rule_level.value.upper() for item in items or [] if item.review_comment)
+        rows.extend(
+            SUMMARY_ROW_TEMPLATE.format(file_path=file_path, level=level, count=count)
+            for level, count in levels.items()
+        )
+
+    summary = DEFERRED_SUMMARY if rows else f"{DEFERRED_SUMMARY} {NO_ISSUES_SUMMARY}"
+    if failed_file_paths:
+        summary += " " + FAILED_FILES_NOTE.format(file_paths=", ".join(failed_file_paths))
+    if trivial_file_paths:
+        summary += " " + TRIVIAL_FILES_NOTE.format(file_paths=", ".join(trivial_file_paths))
+    return SUMMARY_COMMENT_TEMPLATE.format(summary=summary, rows="\n".join(rows))
+
+
+async def post_review_results(jobs: list[FileReviewJob], results: dict[str, list[CompactFinding] | None]) -> None:
+    """Post the comment threads of every file and the summary, for the pull request all the jobs belong to."""
+    outcomes: dict[str, list[ReviewOutcomeItem] | None] = {}
+    failed_file_paths, trivial_file_paths = [], []
+    for job in jobs:
+        if job.trivial_change is not None:
+            trivial_file_paths.append(f"{job.file_path} ({job.trivial_change.value})")
+            continue
+        if job.request is None or job.request.custom_id not in results:
+            failed_file_paths.append(job.file_path)
+            continue
+        findings = CompactFinding.expand_all(
+            cap_findings(results[job.request.custom_id]), job.file_path, job.static_review.remaining_rules
+        )
+        if job.line_index is not None:
+            findings = [job.line_index.repair_item(finding) for finding in findings or []] or None
+        outcomes[job.file_path] = items = job.static_review.merge(findings)
+        for item in items or []:
+            if item.review_comment is None:
+                continue
+            await create_thread(
+                job.repository_id,
+                job.pull_request_id,
+                [Comment.model_validate({"content": render_review_comment(item.review_comment)})],
+                _thread_context(job.file_path, item),
+            )
+
+    summary = render_summary_comment(outcomes, failed_file_paths, trivial_file_paths)
+    await create_thread(jobs[0].repository_id, jobs[0].pull_request_id, [Comment.model_validate({"content": summary})])
+
+
+async def post_nothing_to_review(pull_request_id: int) -> None:
+    """Post the summary of a pull request without any file a reviewer can handle, like the coordinator would."""
+    pull_request = await get_pull_request(pull_request_id)
+    summary = SUMMARY_COMMENT_TEMPLATE.format(summary=f"{DEFERRED_SUMMARY} {NOTHING_TO_REVIEW_NOTE}", rows="")
+    await create_thread(
+        str(pull_request.repository.id), pull_request_id, [Comment.model_validate({"content": summary})]
+    )
+
+
+async def run_deferred_reviews(pull_request_ids: list[int]) -> None:
+    """Review the given pull requests in one batch, and post the results once the batch has ended."""
+    jobs_per_pull_request: dict[int, list[FileReviewJob]] = {}
+    for pull_request_id in pull_request_ids:
+        try:
+            jobs = await collect_review_jobs(pull_request_id)
+        except Exception as e:
+            logfire.error("Failed to prepare deferred review.", pull_request_id=pull_request_id, error=str(e))
+            await post_review_error_comment(pull_request_id, e)
+            continue
+        if jobs:
+            jobs_per_pull_request[pull_request_id] = jobs
+            continue
+        try:
+            await post_nothing_to_review(pull_request_id)
+        except Exception as e:
+            logfire.error("Failed to post deferred review.", pull_request_id=pull_request_id, error=str(e))
+
+    requests = [job.request for jobs in jobs_per_pull_request.values() for job in jobs if job.request is not None]
+    # When every file had a trivial change there's nothing to submit, only the summaries to post
+    batch_id, results = None, {}
+    if requests:
+        settings = get_azure_devops_settings()
+        backend = get_batch_backend()
+        try:
+            batch_id = await backend.submit(requests)
+            logfire.info(
+                "Submitted deferred review batch.",
+                batch_id=batch_id,
+                pull_request_ids=list(jobs_per_pull_request),
+                requests=len(requests),
+            )
+            while await backend.status(batch_id) != BatchStatus.ENDED:
+                await asyncio.sleep(settings.BATCH_POLL_INTERVAL_SECONDS)
+            results = await backend.results(batch_id)
+        except Exception as e:
+            logfire.error("Deferred review batch failed.", pull_request_ids=list(jobs_per_pull_request), error=str(e))
+            for pull_request_id in jobs_per_pull_request:
+                await post_review_error_comment(pull_request_id, e)
+            return
+
+    for pull_request_id, jobs in jobs_per_pull_request.items():
+        try:
+            await post_review_results(jobs, results)
+        except Exception as e:
+            logfire.error("Failed to post deferred review.", pull_request_id=pull_request_id, error=str(e))
+    logfire.info("Posted deferred reviews.", batch_id=batch_id, pull_request_ids=list(jobs_per_pull_request))
@@ -0,0 +1,97 @@
+"""
+Deterministic handling of failed reviews.
+
+A review usually fails because we exceeded our usage limits or because the model provider misbehaves. Those are exactly
+the moments where spinning up yet another agent is a bad idea, so the error comment is rendered from a template and
+posted straight through the Azure DevOps REST client. Letting an LLM write the summary is opt-in, and even then the
+template summary is used whenever that LLM call fails.
+"""
+
+import asyncio
+
+import logfire
+from pydantic_ai import Agent, RunContext, UsageLimits, UsageLimitExceeded, UnexpectedModelBehavior
+
+from app.agents.models import coordinator_agent_model
+from app.auth import get_azure_devops_settings
+from app.mcp.operations import create_thread, get_pull_request
+from app.models.agents import FallbackAgentDeps
+from app.models.azure_devops.comment_thread_models import Comment
+from app.prompts.errors import (
+    ERROR_COMMENT_TEMPLATE,
+    ERROR_SUMMARY_PROMPT,
+    GENERIC_ERROR_SUMMARY,
+    MODEL_BEHAVIOR_SUMMARY,
+    USAGE_LIMIT_SUMMARY,
+)
+
+LLM_SUMMARY_TIMEOUT_SECONDS = 15.0
+
+
+def summarize_error(error: Exception) -> str:
+    """Pick the template summary that matches the kind of error that stopped the review."""
+    if isinstance(error, UsageLimitExceeded):
+        return USAGE_LIMIT_SUMMARY
+    if isinstance(error, UnexpectedModelBehavior):
+        return MODEL_BEHAVIOR_SUMMARY
+    return GENERIC_ERROR_SUMMARY
+
+
+def render_error_comment(summary: str) -> str:
+    """Fill the error comment template with a summary."""
+    return ERROR_COMMENT_TEMPLATE.format(summary=summary)
+
+
+async def _summarize_error_with_llm(pull_request_id: int, error: Exception) -> str | None:
+    """Ask the coordinator model for a summary. Returns None if that fails in any way, so callers can fall back."""
+    agent = Agent(
+        model=coordinator_agent_model, deps_type=FallbackAgentDeps, output_type=str, system_prompt=ERROR_SUMMARY_PROMPT
+    )
+
+    @agent.system_prompt
+    def add_the_error_message_and_pr_id(ctx: RunContext[FallbackAgentDeps]) -> str:
+        return f"The pull request id is {ctx.deps.pull_request_id}. \n The error message is: {ctx.deps.error_message}"
+
+    try:
+        output = await asyncio.wait_for(
+            agent.run(
+                "Please summarize the error that is provided to you.",
+                deps=FallbackAgentDeps(pull_request_id=pull_request_id, error_message=str(error)),
+                usage_limits=UsageLimits(output_tokens_limit=300),
+            ),
+            timeout=LLM_SUMMARY_TIMEOUT_SECONDS,
+        )
+        return output.output
+    except Exception as e:
+        logfire.warning("LLM error summary failed, using the template summary instead.", error=str(e))
+        return None
+
+
+async def post_review_error_comment(pull_request_id: int, error: Exception) -> str | None:
+    """
+    Post a comment to the pull request explaining that its review was abandoned.
+
+    Args:
+        pull_request_id: The ID of the pull request whose review failed
+        error: The exception that stopped the review
+
+    Returns:
+        str | None: The posted comment content, or None if the comment could not be posted
+    """
+    summary = None
+    if get_azure_devops_settings().ERROR_SUMMARY_WITH_LLM:
+        summary = await _summarize_error_with_llm(pull_request_id, error)
+    content = render_error_comment(summary or summarize_error(error))
+
+    try:
+        pull_request = await get_pull_request(pull_request_id)
+        await create_thread(
+            str(pull_request.repository.id), pull_request_id, [Comment.model_validate({"content": content})]
+        )
+    except Exception as e:
+        # Nothing sensible left to do here, the error is already logged by the caller as well.
+        logfire.error("Failed to post the review error comment.", pull_request_id=pull_request_id, error=str(e))
+        return None
+
+    logfire.info("Posted review error comment.", pull_request_id=pull_request_id)
+    return content
@@ -0,0 +1,232 @@
+"""
+Reviews small files together, several of them in one sub-agent call.
+
+Every review pays for the reviewer prompt, the full list of rules and the output schema, which for an __init__.py or a
+short config snippet is many times the size of the file itself. The coordinator asks for the reviews of several files
+at once, and those tool calls run concurrently. Small files that arrive within SMALL_FILE_BATCH_WINDOW_SECONDS of each
+other, for the same reviewer, rules and model tier, are sent as sections of a single request. The reviewer answers
+with an outcome per file path, which is handed back to the tool call of each file, so the coordinator can't tell the
+difference.
+
+A batch is sent early once it reaches SMALL_FILE_BATCH_MAX_TOKENS or SMALL_FILE_BATCH_MAX_FILES. A file that ends up in
+a batch on its own, or that the reviewer left out of its answer, is reviewed like any other file.
+"""
+
+import asyncio
+import hashlib
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import logfire
+from pydantic_ai import Agent
+
+from app.agents.routing import RoutingDecision, get_tier_pools
+from app.analysis.chunking import estimate_tokens
+from app.analysis.markdown import rules_digest
+from app.auth import get_azure_devops_settings
+from app.models.review_models import (
+    CompactFinding,
+    FileReviewOutcome,
+    ReviewOutcomeItem,
+    ReviewRule,
+    ReviewRuleSeverity,
+)
+from app.prompts.core import CAPPED_REVIEW_DESCRIPTION, MAX_VIOLATIONS_PER_FILE
+
+REVIEW_USER_PROMPT = "Complete the review with the specification provided."
+
+_batched_files = logfire.metric_histogram(
+    "reviews.files_per_batch", unit="{file}", description="Number of small files reviewed in one sub-agent call."
+)
+
+
+ReviewAlone = Callable[[], Awaitable[list[ReviewOutcomeItem] | None]]
+
+# The DECLINED item the reviewer is asked to add itself when it stops at the violation cap
+DECLINED_FINDING = CompactFinding(
+    r=ReviewRuleSeverity.DECLINED.name, sl=1, so=1, el=1, eo=1, p=CAPPED_REVIEW_DESCRIPTION
+)
+
+
+def cap_findings(findings: list[CompactFinding] | None) -> list[CompactFinding] | None:
+    """The violation cap, for output that couldn't be cut off while it was generated, like that of a batch request."""
+    if findings is None or len(findings) <= MAX_VIOLATIONS_PER_FILE:
+        return findings
+    return [*findings[:MAX_VIOLATIONS_PER_FILE], DECLINED_FINDING]
+
+
+@dataclass
+class _SmallFile:
+    file_path: str
+    file_content: str
+    tokens: int
+    # How to review the file when no other file came in to review it with
+    review_alone: ReviewAlone
+    result: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+@dataclass
+class _PendingBatch:
+    routing: RoutingDecision
+    system_prompt: str
+    review_rules: list[ReviewRule]
+    files: list[_SmallFile] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> int:
+        return sum(file.tokens for file in self.files)
+
+
+def batch_review_specification(review_rules: list[ReviewRule], files: list[tuple[str, str]]) -> str:
+    """The part of a reviewer's system prompt that describes several files under review, one section per file."""
+    sections = "\n\n".join(f"### File path: {file_path}\n```\n{file_content}\n```" for file_path, file_content in files)
+    return (
+        f"The list of review rules is: {review_rules}. \n\n "
+        f"You are reviewing {len(files)} files at once. Review each file on its own: line numbers refer to the "
+        f"file's own content and every file gets its own entry in your answer, with the file path as it is given. "
+        f"The files are:\n\n{sections}"
+    )
+
+
+class SmallFileBatcher:
+    """Groups concurrent reviews of small files into batches and reviews each batch with one model call."""
+
+    def __init__(self, max_file_tokens: int, max_batch_tokens: int, max_files: int, window_seconds: float):
+        self.max_file_tokens = max_file_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.max_files = max_files
+        self.window_seconds = window_seconds
+        self._pending: dict[tuple, _PendingBatch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def accepts(self, file_content: str) -> bool:
+        return estimate_tokens([file_content]) <= self.max_file_tokens
+
+    async def review(
+        self,
+        routing: RoutingDecision,
+        system_prompt: str,
+        review_rules: list[ReviewRule],
+        file_path: str,
+        file_content: str,
+        review_alone: ReviewAlone,
+    ) -> list[ReviewOutcomeItem] | None:
+        """Review a small file together with the other small files that come in for the same reviewer and rules."""
+        prompt_digest = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        key = (routing.tier, prompt_digest, rules_digest(review_rules))
+        small_file = _SmallFile(file_path, file_content, estimate_tokens([file_content]), review_alone)
+
+        batch = self._pending.get(key)
+        if batch is not None and batch.tokens + small_file.tokens > self.max_batch_tokens:
+            self._send(key)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(routing, system_prompt, review_rules)
+            asyncio.get_running_loop().call_later(self.window_seconds, self._send, key, batch)
+        batch.files.append(small_file)
+        if len(batch.files) >= self.max_files:
+            self._send(key)
+
+        return await small_file.result
+
+    def _send(self, key: tuple, batch: _PendingBatch | None = None) -> None:
+        # The timer of a batch that was already sent early finds another batch, or none, under its key
+        if batch is not None and self._pending.get(key) is not batch:
+            return
+        batch = self._pending.pop(key)
+        task = asyncio.create_task(self._review_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _review_batch(self, batch: _PendingBatch) -> None:
+        # A caller that was cancelled has a result that's done already, and is skipped
+        try:
+            outcomes = await self._run(batch)
+            omitted = []
+            for small_file in batch.files:
+                key = _normalized_path(small_file.file_path)
+                if key not in outcomes:
+                    omitted.append(small_file)
+                elif not small_file.result.done():
+                    small_file.result.set_result(outcomes[key])
+            # No entry for a file isn't the same as no issues in it
+            if omitted:
+                logfire.warning(
+                    "Reviewer left files out of its answer, reviewing them alone.",
+                    file_paths=[small_file.file_path for small_file in omitted],
+                )
+                await asyncio.gather(*(_review_alone(small_file) for small_file in omitted))
+        except Exception as e:
+            for small_file in batch.files:
+                if not small_file.result.done():
+                    small_file.result.set_exception(e)
+        finally:
+            # Nothing is left waiting forever, also not when the batch itself is cancelled
+            for small_file in batch.files:
+                if not small_file.result.done():
+                    small_file.result.cancel()
+
+    async def _run(self, batch: _PendingBatch) -> dict[str, list[ReviewOutcomeItem] | None]:
+        """The outcome of every file in the batch, keyed by normalized file path."""
+        _batched_files.record(len(batch.files))
+        if len(batch.files) == 1:
+            small_file = batch.files[0]
+            return {_normalized_path(small_file.file_path): await small_file.review_alone()}
+
+        logfire.info(
+            "Reviewing small files together.",
+            file_paths=[small_file.file_path for small_file in batch.files],
+            tokens=batch.tokens,
+        )
+        specification = batch_review_specification(
+            batch.review_rules, [(small_file.file_path, small_file.file_content) for small_file in batch.files]
+        )
+        agent = Agent(
+            model=batch.routing.model,
+            output_type=list[FileReviewOutcome],
+            system_prompt=[batch.system_prompt, specification],
+        )
+        # The answer is cut off once it has an outcome for every file, and the violation cap is applied per file
+        response = await get_tier_pools().run_capped(
+            batch.routing, agent, REVIEW_USER_PROMPT, deps=None, max_items=len(batch.files)
+        )
+
+        outcomes: dict[str, list[ReviewOutcomeItem] | None] = {}
+        paths = {_normalized_path(small_file.file_path): small_file.file_path for small_file in batch.files}
+        for outcome in response.output or []:
+            key = _normalized_path(outcome.file_path)
+            if key not in paths:
+                logfire.warning("Reviewer answered for a file it wasn't given.", file_path=outcome.file_path)
+                continue
+            items = CompactFinding.expand_all(cap_findings(outcome.findings), paths[key], batch.review_rules) or []
+            outcomes[key] = [*(outcomes.get(key) or []), *items] or None
+        return outcomes
+
+
+async def _review_alone(small_file: _SmallFile) -> None:
+    try:
+        result = await small_file.review_alone()
+    except Exception as e:
+        if not small_file.result.done():
+            small_file.result.set_exception(e)
+        return
+    if not small_file.result.done():
+        small_file.result.set_result(result)
+
+
+def _normalized_path(file_path: str) -> str:
+    # Models tend to drop the leading slash of a path
+    return file_path.strip().lstrip("/")
+
+
+@lru_cache(maxsize=1)
+def get_small_file_batcher() -> SmallFileBatcher:
+    """Instantiate the process-wide small file batcher or return the existing one."""
+    settings = get_azure_devops_settings()
+    return SmallFileBatcher(
+        max_file_tokens=settings.SMALL_FILE_MAX_TOKENS,
+        max_batch_tokens=settings.SMALL_FILE_BATCH_MAX_TOKENS,
+        max_files=settings.SMALL_FILE_BATCH_MAX_FILES,
+        window_seconds=settings.SMALL_FILE_BATCH_WINDOW_SECONDS,
+    )
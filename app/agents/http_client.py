@@ -0,0 +1,99 @@
+"""
+Shared HTTP clients for requests to the model provider.
+
+Every provider instance used to create its own client with default settings: separate connection pools, the default
+timeouts and no control over keep-alive. Instead, all model providers share explicitly configured clients, opened once
+and closed with the app's lifespan.
+
+There are two lanes, each with its own client and connection pool. The interactive lane serves the coordinator and the
+fast tier, whose calls are short and sit on the critical path of every review. The bulk lane serves the strong tier,
+whose long generations could otherwise hold every connection while the coordinator waits for one.
+
+HTTP/2 is used when enabled and the optional h2 package is installed, multiplexing many requests over few connections.
+
+Closing the clients also forgets them, so an app that starts again gets new ones. Anthropic clients built on the old
+ones move over to the new ones through current_anthropic_client.
+"""
+
+import importlib.util
+from enum import Enum
+from functools import lru_cache
+
+import httpx
+import logfire
+from pydantic_ai.providers.anthropic import AsyncAnthropicClient
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from app.auth import get_azure_devops_settings
+
+
+class HttpLane(str, Enum):
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+@lru_cache(maxsize=None)
+def get_llm_http_client(lane: HttpLane) -> httpx.AsyncClient:
+    """Instantiate the HTTP client of a lane or return the existing one."""
+    settings = get_azure_devops_settings()
+    reserved = settings.LLM_HTTP_INTERACTIVE_CONNECTIONS
+    max_connections = reserved if lane == HttpLane.INTERACTIVE else max(1, settings.LLM_HTTP_MAX_CONNECTIONS - reserved)
+
+    http2 = settings.LLM_HTTP2 and _http2_available()
+    if settings.LLM_HTTP2 and not http2:
+        logfire.warning("HTTP/2 was requested for model providers, but h2 isn't installed. Using HTTP/1.1.")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.LLM_HTTP_CONNECT_TIMEOUT_SECONDS,
+            read=settings.LLM_HTTP_READ_TIMEOUT_SECONDS,
+            write=settings.LLM_HTTP_CONNECT_TIMEOUT_SECONDS,
+            # Waiting for a free connection, which should be rare given the separate lanes
+            pool=settings.LLM_HTTP_READ_TIMEOUT_SECONDS,
+        ),
+    )
+
+
+async def close_llm_http_clients() -> None:
+    """Close the clients of all lanes that were opened. Called when the app shuts down."""
+    for lane in HttpLane:
+        client = get_llm_http_client(lane)
+        if not client.is_closed:
+            await client.aclose()
+    get_llm_http_client.cache_clear()
+
+
+def current_anthropic_client(client: AsyncAnthropicClient, lane: HttpLane) -> AsyncAnthropicClient:
+    """The Anthropic client, or a copy of it on the lane's current HTTP client if its own was closed since."""
+    http_client = get_llm_http_client(lane)
+    return client if client._client is http_client else client.copy(http_client=http_client)
+
+
+def _observe_connections(options: CallbackOptions):
+    """Connections per lane and state. Reads httpcore's pool directly, httpx doesn't expose these numbers."""
+    for lane in HttpLane:
+        pool = getattr(get_llm_http_client(lane)._transport, "_pool", None)
+        connections = getattr(pool, "connections", [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        yield Observation(idle, {"lane": lane.value, "state": "idle"})
+        yield Observation(len(connections) - idle, {"lane": lane.value, "state": "active"})
+        queued = sum(1 for request in getattr(pool, "_requests", []) if request.is_queued())
+        yield Observation(queued, {"lane": lane.value, "state": "queued_requests"})
+
+
+logfire.metric_gauge_callback(
+    "llm.http.connections",
+    [_observe_connections],
+    unit="{connection}",
+    description="Connections to the model provider per lane, and requests waiting for one.",
+)
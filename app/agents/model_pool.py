@@ -0,0 +1,174 @@
+"""
+A pool of interchangeable models for one tier, possibly from different providers.
+
+Built on pydantic-ai's FallbackModel, which already moves on to the next model when one fails. On top of that:
+- every attempt has a timeout, and timeouts fail over just like errors do, so a provider that hangs doesn't stall
+  every review;
+- optionally, requests are hedged: when the current model hasn't answered within its own p95 latency, the same request
+  goes to the next model as well and whichever answers first wins. The other request is cancelled.
+
+Hedging costs a second request now and then, roughly 5% of them when latencies are stable, in exchange for cutting off
+the slow tail. Streamed requests aren't hedged, since they are consumed as they arrive, but the timeout applies to the
+start of the stream: a model that doesn't start answering in time is failed over like one that doesn't answer at all.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Sequence
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any
+
+import logfire
+from anthropic import APIConnectionError
+from pydantic_ai import ModelHTTPError
+from pydantic_ai.exceptions import FallbackExceptionGroup
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.fallback import FallbackModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.tools import RunContext
+
+FAILOVER_ERRORS = (ModelHTTPError, TimeoutError, APIConnectionError)
+
+_failovers = logfire.metric_counter("llm.failovers", unit="{request}", description="Model requests that failed over.")
+_hedges = logfire.metric_counter(
+    "llm.hedged", unit="{request}", description="Model requests that were sent to a second model."
+)
+
+
+class ModelPool(FallbackModel):
+    """Models tried in order, with per-attempt timeouts and optional hedging on slow responses."""
+
+    def __init__(
+        self,
+        models: Sequence[Model],
+        timeout_seconds: float | None = None,
+        hedge: bool = False,
+        latency_window: int = 50,
+        min_latency_samples: int = 10,
+    ):
+        super().__init__(*models, fallback_on=FAILOVER_ERRORS)
+        self.timeout_seconds = timeout_seconds
+        self.hedge = hedge
+        self.min_latency_samples = min_latency_samples
+        self._latencies: dict[int, deque[float]] = {
+            index: deque(maxlen=latency_window) for index in range(len(self.models))
+        }
+
+    @property
+    def model_name(self) -> str:
+        return f"pool:{','.join(model.model_name for model in self.models)}"
+
+    def p95_latency(self, index: int) -> float | None:
+        """The 95th percentile latency of a model's recent successful requests, once there are enough of them."""
+        latencies = sorted(self._latencies[index])
+        if len(latencies) < self.min_latency_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    async def _attempt(
+        self,
+        index: int,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        started_at = time.monotonic()
+        response = await asyncio.wait_for(
+            self.models[index].request(messages, model_settings, model_request_parameters), self.timeout_seconds
+        )
+        self._latencies[index].append(time.monotonic() - started_at)
+        return response
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        """Try the models in order until one succeeds, hedging on the next one when the current one is slow."""
+        exceptions: list[Exception] = []
+        remaining = deque(range(len(self.models)))
+        pending: dict[asyncio.Task, int] = {}
+
+        def start_next() -> None:
+            index = remaining.popleft()
+            task = asyncio.create_task(self._attempt(index, messages, model_settings, model_request_parameters))
+            pending[task] = index
+
+        try:
+            while remaining or pending:
+                if not pending:
+                    start_next()
+
+                hedge_after = None
+                if self.hedge and remaining and len(pending) == 1:
+                    hedge_after = self.p95_latency(next(iter(pending.values())))
+
+                done, _ = await asyncio.wait(pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    _hedges.add(1)
+                    logfire.info("Hedging slow model request.", after_seconds=hedge_after)
+                    start_next()
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    exception = task.exception()
+                    if exception is None:
+                        self._set_span_attributes(self.models[index], model_request_parameters)
+                        return task.result()
+                    # A cancelled attempt is not a model error, it must not be failed over
+                    if not isinstance(exception, Exception) or not self._fallback_on(exception):
+                        raise exception
+                    _failovers.add(1)
+                    logfire.warning(
+                        "Model request failed, failing over.",
+                        model_name=self.models[index].model_name,
+                        error=repr(exception),
+                    )
+                    exceptions.append(exception)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise FallbackExceptionGroup("All models from ModelPool failed", exceptions)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        """Try the models in order until one starts streaming within the timeout."""
+        exceptions: list[Exception] = []
+        for model in self.models:
+            async with AsyncExitStack() as stack:
+                try:
+                    _, prepared_parameters = model.prepare_request(model_settings, model_request_parameters)
+                    response = await asyncio.wait_for(
+                        stack.enter_async_context(
+                            model.request_stream(messages, model_settings, model_request_parameters, run_context)
+                        ),
+                        self.timeout_seconds,
+                    )
+                except Exception as exception:
+                    if not self._fallback_on(exception):
+                        raise
+                    _failovers.add(1)
+                    logfire.warning(
+                        "Model stream failed to start, failing over.",
+                        model_name=model.model_name,
+                        error=repr(exception),
+                    )
+                    exceptions.append(exception)
+                    continue
+
+                self._set_span_attributes(model, prepared_parameters)
+                yield response
+                return
+
+        raise FallbackExceptionGroup("All models from ModelPool failed", exceptions)
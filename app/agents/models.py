@@ -6,21 +6,99 @@ For decisions like this I quite appreciate https://llm-stats.com/.
 
 The coordinator agent can get away with using a 'weaker' model than the sub-agents.
 Of course if we want models from different providers we'd change AGENT_API_KEY to a duo of variables instead.
+
+Each of the two is a pool of models, possibly from different providers, configured in PR_APP_MODEL_POOL_FAST and
+PR_APP_MODEL_POOL_STRONG. The pool fails over between them and can hedge slow requests, see model_pool.py.
+
+All models share one adaptive concurrency limit on their requests to the provider, see throttling.py, and one
+tokens-per-minute budget, see token_budget.py.
 """
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from pydantic_ai import RunContext
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse, infer_model
 from pydantic_ai.models.anthropic import AnthropicModel
 from pydantic_ai.providers.anthropic import AnthropicProvider
+from pydantic_ai.settings import ModelSettings
 
+from app.agents.http_client import HttpLane, current_anthropic_client, get_llm_http_client
+from app.agents.model_pool import ModelPool
+from app.agents.throttling import ConcurrencyLimitedModel
+from app.agents.token_budget import TokenBudgetedModel
 from app.auth import get_azure_devops_settings
 
+
+def _throttled(model: Model) -> Model:
+    """
+    Budget is reserved before a concurrency slot is taken, so requests waiting for budget don't hold up others.
+
+    A pool is throttled as a whole, so its per-attempt timeouts and latencies only count the time spent at the provider,
+    not the time spent waiting for budget or a slot. A hedged request shares the slot and the budget of its original.
+    """
+    return TokenBudgetedModel(ConcurrencyLimitedModel(model))
+
+
+class LaneAnthropicModel(AnthropicModel):
+    """Anthropic model on the shared HTTP client of its lane, also after the client was closed and opened again."""
+
+    def __init__(self, model_name: str, lane: HttpLane):
+        super().__init__(
+            model_name,
+            provider=AnthropicProvider(
+                api_key=get_azure_devops_settings().AGENT_API_KEY, http_client=get_llm_http_client(lane)
+            ),
+        )
+        self.lane = lane
+
+    async def request(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        self.client = current_anthropic_client(self.client, self.lane)
+        return await super().request(*args, **kwargs)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        self.client = current_anthropic_client(self.client, self.lane)
+        async with super().request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as response_stream:
+            yield response_stream
+
+
+def _build_model(name: str, lane: HttpLane) -> Model:
+    """
+    Anthropic models use our own API key and the shared HTTP client of their lane, see http_client.py. Other providers
+    pick up their usual environment variables.
+    """
+    provider, _, model_name = name.partition(":")
+    if provider == "anthropic":
+        return LaneAnthropicModel(model_name, lane)
+    return infer_model(name)
+
+
+def _build_pool(names: list[str], lane: HttpLane) -> Model:
+    settings = get_azure_devops_settings()
+    return _throttled(
+        ModelPool(
+            [_build_model(name, lane) for name in names],
+            timeout_seconds=settings.MODEL_REQUEST_TIMEOUT_SECONDS,
+            hedge=settings.MODEL_HEDGING,
+        )
+    )
+
+
 # If I'd want gemini, I could do something like:
 # provider = GoogleProvider(api_key=get_azure_devops_settings().AGENT_API_KEY)
 # coordinator_agent_model = GoogleModel("gemini-2.0-flash", provider=provider)
 # sub_agent_model = GoogleModel("gemini-2.5-flash", provider=provider)
 
-coordinator_agent_model = AnthropicModel(
-    "claude-haiku-4-5", provider=AnthropicProvider(api_key=get_azure_devops_settings().AGENT_API_KEY)
-)
-sub_agent_model = AnthropicModel(
-    "claude-sonnet-4-5", provider=AnthropicProvider(api_key=get_azure_devops_settings().AGENT_API_KEY)
-)
+coordinator_agent_model = _build_pool(get_azure_devops_settings().MODEL_POOL_FAST, HttpLane.INTERACTIVE)
+sub_agent_model = _build_pool(get_azure_devops_settings().MODEL_POOL_STRONG, HttpLane.BULK)
@@ -0,0 +1,186 @@
+"""
+Routes each sub-agent review to a model tier.
+
+Not every file needs the strong model: a five-line README tweak reviews just as well on the fast one, at a fraction
+of the cost and latency. The decision is based on what we know before the review starts: the language, the size and
+change type of the file and a cheap complexity score, which counts branching constructs with a regex.
+
+Each tier has its own pool of concurrent reviews, so a flood of small files can't starve the large ones or the other
+way around. Decisions are logged, and review duration and token usage are recorded per tier to measure their impact.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Generic, TypeVar
+
+import logfire
+from pydantic_ai import Agent
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.models import Model
+from pydantic_ai.usage import RunUsage
+
+from app.agents.models import coordinator_agent_model, sub_agent_model
+from app.auth import get_azure_devops_settings
+from app.models.review_models import ReviewRequest, ReviewRuleLanguage
+
+_BRANCHING_PATTERNS = {
+    ReviewRuleLanguage.PYTHON: re.compile(r"\b(if|elif|for|while|except|with|and|or|lambda|yield|await)\b"),
+    ReviewRuleLanguage.SQL: re.compile(r"\b(join|where|case|when|union|having|over|exists|merge)\b", re.IGNORECASE),
+}
+
+_routed_reviews = logfire.metric_counter(
+    "reviews.routed", unit="{review}", description="Sub-agent reviews per model tier."
+)
+_review_duration = logfire.metric_histogram(
+    "reviews.sub_agent_duration", unit="s", description="Duration of sub-agent reviews per model tier."
+)
+_review_tokens = logfire.metric_counter(
+    "reviews.sub_agent_tokens", unit="{token}", description="Tokens used by sub-agent reviews per model tier."
+)
+_capped_reviews = logfire.metric_counter(
+    "reviews.capped", unit="{review}", description="Sub-agent reviews stopped early at the violation cap."
+)
+
+
+class ModelTier(str, Enum):
+    FAST = "fast"
+    STRONG = "strong"
+
+
+MODELS_BY_TIER: dict[ModelTier, Model] = {
+    ModelTier.FAST: coordinator_agent_model,
+    ModelTier.STRONG: sub_agent_model,
+}
+
+
+@dataclass
+class RoutingDecision:
+    tier: ModelTier
+    reason: str
+    line_count: int
+    complexity: int
+
+    @property
+    def model(self) -> Model:
+        return MODELS_BY_TIER[self.tier]
+
+
+def complexity_score(file_content: str, language: ReviewRuleLanguage) -> int:
+    """Number of branching constructs in the content. Cheap, and a decent proxy for how much there is to get wrong."""
+    pattern = _BRANCHING_PATTERNS.get(language)
+    return len(pattern.findall(file_content)) if pattern else 0
+
+
+def route_review(review_request: ReviewRequest, language: ReviewRuleLanguage) -> RoutingDecision:
+    """Pick the model tier for reviewing a single file."""
+    settings = get_azure_devops_settings()
+    line_count = review_request.file_content.count("\n") + 1
+    complexity = complexity_score(review_request.file_content, language)
+    change_type = (review_request.change_type or "").lower()
+
+    if "delete" in change_type:
+        tier, reason = ModelTier.FAST, "deleted file"
+    elif language == ReviewRuleLanguage.MD and line_count <= settings.ROUTING_FAST_MAX_DOC_LINES:
+        tier, reason = ModelTier.FAST, "documentation"
+    elif line_count <= settings.ROUTING_FAST_MAX_LINES and complexity <= settings.ROUTING_FAST_MAX_COMPLEXITY:
+        tier, reason = ModelTier.FAST, "small and simple"
+    else:
+        tier, reason = ModelTier.STRONG, "large or complex"
+
+    decision = RoutingDecision(tier=tier, reason=reason, line_count=line_count, complexity=complexity)
+    _routed_reviews.add(1, {"tier": tier.value})
+    logfire.info(
+        "Routed review.",
+        file_path=review_request.file_path,
+        tier=tier.value,
+        reason=reason,
+        line_count=line_count,
+        complexity=complexity,
+    )
+    return decision
+
+
+OutputT = TypeVar("OutputT")
+ItemT = TypeVar("ItemT")
+
+
+@dataclass
+class CappedOutput(Generic[ItemT]):
+    output: list[ItemT] | None
+    # Whether the generation was stopped because the output reached the cap
+    capped: bool
+
+
+class _CapReached(Exception):
+    """Raised inside a streamed run to abort it. Leaving the stream normally would wait for the rest of the output."""
+
+
+class TierPools:
+    """A bounded number of concurrent reviews per model tier."""
+
+    def __init__(self, limits: dict[ModelTier, int]):
+        self._semaphores = {tier: asyncio.Semaphore(limit) for tier, limit in limits.items()}
+
+    async def run(
+        self, decision: RoutingDecision, agent: Agent[Any, OutputT], user_prompt: str, deps: Any
+    ) -> AgentRunResult[OutputT]:
+        """Run the review agent within the pool of its tier, recording how long it took and how many tokens it used."""
+        async with self._semaphores[decision.tier]:
+            started_at = time.monotonic()
+            response = await agent.run(user_prompt, deps=deps)
+
+        self._record(decision, started_at, response.usage())
+        return response
+
+    async def run_capped(
+        self,
+        decision: RoutingDecision,
+        agent: Agent[Any, list[ItemT] | None],
+        user_prompt: str,
+        deps: Any,
+        max_items: int,
+    ) -> CappedOutput[ItemT]:
+        """
+        Run a review agent with list output like run, but stop the generation once the output has max_items items.
+
+        The output is streamed and validated as it comes in. Once item max_items + 1 has started, the ones before it
+        are complete, and the request is aborted: the rest of the output isn't waited for, nor paid for.
+        """
+        async with self._semaphores[decision.tier]:
+            started_at = time.monotonic()
+            output: list[ItemT] | None = None
+            capped, usage = False, RunUsage()
+            try:
+                async with agent.run_stream(user_prompt, deps=deps) as stream:
+                    async for partial in stream.stream_output(debounce_by=None):
+                        if isinstance(partial, list) and len(partial) > max_items:
+                            output, capped, usage = partial[:max_items], True, stream.usage()
+                            raise _CapReached()
+                    output, usage = await stream.get_output(), stream.usage()
+            except _CapReached:
+                pass
+
+        self._record(decision, started_at, usage)
+        if capped:
+            _capped_reviews.add(1, {"tier": decision.tier.value})
+        return CappedOutput(output=output, capped=capped)
+
+    @staticmethod
+    def _record(decision: RoutingDecision, started_at: float, usage: RunUsage) -> None:
+        attributes = {"tier": decision.tier.value}
+        _review_duration.record(time.monotonic() - started_at, attributes)
+        _review_tokens.add(usage.input_tokens, {**attributes, "direction": "input"})
+        _review_tokens.add(usage.output_tokens, {**attributes, "direction": "output"})
+
+
+@lru_cache(maxsize=1)
+def get_tier_pools() -> TierPools:
+    """Instantiate the process-wide tier pools or return the existing ones."""
+    settings = get_azure_devops_settings()
+    return TierPools(
+        {ModelTier.FAST: settings.ROUTING_FAST_CONCURRENCY, ModelTier.STRONG: settings.ROUTING_STRONG_CONCURRENCY}
+    )
@@ -5,17 +5,149 @@ There is a fair bit of code repetition in this file but for now I am okay with i
 I like how easy to read each individual sub-agent's code is.
 """
 
+import asyncio
+
 import logfire
 from pydantic_ai import RunContext, Agent
 
-from app.agents.models import sub_agent_model
-from app.models.review_models import ReviewOutcomeItem, ReviewInput, ReviewRuleLanguage, ReviewRequest
+from app.agents.file_batching import DECLINED_FINDING, get_small_file_batcher
+from app.agents.routing import RoutingDecision, get_tier_pools, route_review
+from app.analysis import run_static_checks
+from app.analysis.positions import repair_positions
+from app.analysis.triviality import SKIPPED_CHANGES, classify_change, rules_for_change
+from app.analysis.chunking import Chunk, chunk_python, chunk_sql, map_to_file, merge_reviews
+from app.analysis.markdown import (
+    changed_sections,
+    get_section_review_cache,
+    markdown_sections,
+    rules_digest,
+    section_chunks,
+)
+from app.auth import get_azure_devops_settings
+from app.mcp.operations import get_blob_content
+from app.models.review_models import (
+    CompactFinding,
+    ReviewInput,
+    ReviewOutcomeItem,
+    ReviewRequest,
+    ReviewRule,
+    ReviewRuleLanguage,
+    ReviewRuleSeverity,
+)
+from app.prompts.core import MAX_VIOLATIONS_PER_FILE, TRIVIAL_CHANGE_NOTE
 from app.prompts.markdown_reviewer import MD_REVIEWER_PROMPT
 from app.prompts.python_reviewer import PYTHON_REVIEWER_PROMPT
 from app.prompts.sql_reviewer import SQL_REVIEWER_PROMPT
 from app.rules import get_review_rules
 
 
+def review_specification(review_input: ReviewInput) -> str:
+    """The part of a reviewer's system prompt that describes the file under review and the rules to apply."""
+    specification = (
+        f"The list of review rules is: {review_input.review_rules}. \n\n "
+        f"The file content is: {review_input.file_content}. \n\n "
+        f"The file path is: {review_input.file_path}."
+    )
+    if review_input.excerpt:
+        specification += f" \n\n {review_input.excerpt}"
+    return specification
+
+
+async def _base_content(review_request: ReviewRequest) -> str | None:
+    """The content of the file before the change, if the coordinator passed along where to find it."""
+    if not review_request.repository_id or not review_request.original_object_id:
+        return None
+    try:
+        return await get_blob_content(review_request.repository_id, review_request.original_object_id)
+    except Exception as e:
+        # Without the previous version the whole file is reviewed, which is what we'd do anyway
+        logfire.warning(
+            "Couldn't retrieve the previous version of a file.", file_path=review_request.file_path, error=str(e)
+        )
+        return None
+
+
+async def _review_rules(
+    review_request: ReviewRequest, language: ReviewRuleLanguage, base_content: str | None
+) -> tuple[list[ReviewRule], str | None]:
+    """
+    The rules to review the file with. A trivial change is only reviewed against the rules it can violate, and when
+    there are none, a note for the coordinator is returned instead. See app/analysis/triviality.py.
+    """
+    kind = None
+    if get_azure_devops_settings().SKIP_TRIVIAL_CHANGES:
+        kind = classify_change(language, review_request.file_content, base_content)
+    rules = [] if kind in SKIPPED_CHANGES else rules_for_change(await get_review_rules(language=language), kind)
+    if kind is None:
+        return rules, None
+    if rules:
+        logfire.info(
+            "Reviewing trivial change against the rules it can violate.",
+            file_path=review_request.file_path,
+            kind=kind.value,
+            rule_ids=[rule.id for rule in rules],
+        )
+        return rules, None
+    logfire.info("Skipping review of trivial change.", file_path=review_request.file_path, kind=kind.value)
+    return rules, TRIVIAL_CHANGE_NOTE.format(file_path=review_request.file_path, kind=kind.value)
+
+
+async def _review_chunks(
+    routing: RoutingDecision,
+    system_prompt: str,
+    review_rules: list[ReviewRule],
+    file_path: str,
+    chunks: list[Chunk],
+) -> list[ReviewOutcomeItem] | None:
+    """Review the chunks of a file concurrently, and merge the findings into one review of the whole file."""
+
+    async def review_chunk(chunk: Chunk) -> list[ReviewOutcomeItem]:
+        review_input = ReviewInput(
+            reviewRules=review_rules, filePath=file_path, fileContent=chunk.content, excerpt=chunk.describe()
+        )
+        agent = Agent(
+            model=routing.model,
+            deps_type=ReviewInput,
+            output_type=list[CompactFinding] | None,
+            system_prompt=system_prompt,
+        )
+
+        @agent.system_prompt
+        def get_review_specification(ctx: RunContext[ReviewInput]) -> str:
+            return review_specification(ctx.deps)
+
+        # The generation is stopped at the violation cap instead of waiting for the model to stop by itself
+        response = await get_tier_pools().run_capped(
+            routing,
+            agent,
+            "Complete the review with the specification provided.",
+            deps=review_input,
+            max_items=MAX_VIOLATIONS_PER_FILE,
+        )
+        findings = response.output or []
+        if response.capped:
+            logfire.info("Stopped review at the violation cap.", file_path=file_path, cap=MAX_VIOLATIONS_PER_FILE)
+            findings = [*findings, DECLINED_FINDING]
+        items = CompactFinding.expand_all(findings, file_path, review_rules)
+        return [map_to_file(chunk, item) for item in items or []]
+
+    # A small file is reviewed together with other small files that come in at the same time, see file_batching.py
+    batcher = get_small_file_batcher()
+    if len(chunks) == 1 and not chunks[0].is_excerpt and batcher.accepts(chunks[0].content):
+        chunk = chunks[0]
+        return merge_reviews(
+            [
+                await batcher.review(
+                    routing, system_prompt, review_rules, file_path, chunk.content, lambda: review_chunk(chunk)
+                )
+            ]
+        )
+
+    if len(chunks) > 1:
+        logfire.info("Reviewing file in chunks.", file_path=file_path, chunks=len(chunks))
+    return merge_reviews(await asyncio.gather(*(review_chunk(chunk) for chunk in chunks)))
+
+
 # Keeping RunContext in even though it's not strictly used as most future extensions would be sure to require it.
 async def python_code_reviewer(ctx: RunContext, review_request: ReviewRequest):
     """
@@ -27,33 +159,30 @@ async def python_code_reviewer(ctx: RunContext, review_request: ReviewRequest):
             review_rules: The list of review rules to use when reviewing this function.
             file_path: The file path for the content you are asked to review. This must always be formatted as relative path.
             file_content: The file content that needs to be reviewed
+            change_type: The change type of the file in the diff, if known
+            repository_id: The ID of the repository the file belongs to
+            original_object_id: The object id of the file before the change, from the diff, if any
 
     """
     logfire.info("Starting Python code reviewer agent.", file_path=review_request.file_path)
 
-    python_rules = await get_review_rules(language=ReviewRuleLanguage.PYTHON)
+    base_content = await _base_content(review_request)
+    python_rules, trivial_change_note = await _review_rules(review_request, ReviewRuleLanguage.PYTHON, base_content)
+    if trivial_change_note:
+        return trivial_change_note
 
-    review_input = ReviewInput(
-        reviewRules=python_rules, filePath=review_request.file_path, fileContent=review_request.file_content
+    routing = route_review(review_request, ReviewRuleLanguage.PYTHON)
+    # Mechanically checkable rules are checked here, the agent only gets the rules that need judgment
+    static_review = run_static_checks(
+        ReviewRuleLanguage.PYTHON, review_request.file_path, review_request.file_content, python_rules
     )
 
-    agent = Agent(
-        model=sub_agent_model,
-        deps_type=ReviewInput,
-        output_type=list[ReviewOutcomeItem] | None,
-        system_prompt=PYTHON_REVIEWER_PROMPT,
+    chunks = chunk_python(review_request.file_content, get_azure_devops_settings().REVIEW_CHUNK_MAX_TOKENS)
+    output = await _review_chunks(
+        routing, PYTHON_REVIEWER_PROMPT, static_review.remaining_rules, review_request.file_path, chunks
     )
-
-    @agent.system_prompt
-    def get_review_specification(ctx: RunContext[ReviewInput]) -> str:
-        return (
-            f"The list of review rules is: {ctx.deps.review_rules}. \n\n "
-            f"The file content is: {ctx.deps.file_content}. \n\n "
-            f"The file path is: {ctx.deps.file_path}."
-        )
-
-    response = await agent.run("Complete the review with the specification provided.", deps=review_input)
-    return response.output
+    # Positions from the model are checked against the file, so the coordinator doesn't post a comment Azure refuses
+    return static_review.merge(repair_positions(output, review_request.file_content))
 
 
 async def sql_code_reviewer(ctx: RunContext, review_request: ReviewRequest):
@@ -66,33 +195,41 @@ async def sql_code_reviewer(ctx: RunContext, review_request: ReviewRequest):
             review_rules: The list of review rules to use when reviewing this function.
             file_path: The file path for the content you are asked to review. This must always be formatted as relative path.
             file_content: The file content that needs to be reviewed
+            change_type: The change type of the file in the diff, if known
+            repository_id: The ID of the repository the file belongs to
+            original_object_id: The object id of the file before the change, from the diff, if any
 
     """
     logfire.info("Starting SQL code reviewer agent.", file_path=review_request.file_path)
 
-    sql_rules = await get_review_rules(language=ReviewRuleLanguage.SQL)
+    base_content = await _base_content(review_request)
+    sql_rules, trivial_change_note = await _review_rules(review_request, ReviewRuleLanguage.SQL, base_content)
+    if trivial_change_note:
+        return trivial_change_note
 
-    review_input = ReviewInput(
-        reviewRules=sql_rules, filePath=review_request.file_path, fileContent=review_request.file_content
+    routing = route_review(review_request, ReviewRuleLanguage.SQL)
+    # Mechanically checkable rules are checked here, the agent only gets the rules that need judgment
+    static_review = run_static_checks(
+        ReviewRuleLanguage.SQL, review_request.file_path, review_request.file_content, sql_rules
     )
 
-    agent = Agent(
-        model=sub_agent_model,
-        deps_type=ReviewInput,
-        output_type=list[ReviewOutcomeItem] | None,
-        system_prompt=SQL_REVIEWER_PROMPT,
+    chunking = chunk_sql(
+        review_request.file_content,
+        get_azure_devops_settings().REVIEW_CHUNK_MAX_TOKENS,
+        base_source=base_content,
     )
-
-    @agent.system_prompt
-    def get_review_specification(ctx: RunContext[ReviewInput]) -> str:
-        return (
-            f"The list of review rules is: {ctx.deps.review_rules}. \n\n "
-            f"The file content is: {ctx.deps.file_content}. \n\n "
-            f"The file path is: {ctx.deps.file_path}."
-        )
-
-    response = await agent.run("Complete the review with the specification provided.", deps=review_input)
-    return response.output
+    logfire.info(
+        "Split SQL file into statements.",
+        file_path=review_request.file_path,
+        statements=chunking.statements,
+        unchanged=chunking.unchanged,
+        repeated=chunking.repeated,
+        chunks=len(chunking.chunks),
+    )
+    output = await _review_chunks(
+        routing, SQL_REVIEWER_PROMPT, static_review.remaining_rules, review_request.file_path, chunking.chunks
+    )
+    return static_review.merge(repair_positions(output, review_request.file_content))
 
 
 async def markdown_docs_reviewer(ctx: RunContext, review_request: ReviewRequest):
@@ -105,30 +242,47 @@ async def markdown_docs_reviewer(ctx: RunContext, review_request: ReviewRequest)
             review_rules: The list of review rules to use when reviewing this function.
             file_path: The file path for the content you are asked to review. This must always be formatted as relative path.
             file_content: The file content that needs to be reviewed
+            change_type: The change type of the file in the diff, if known
+            repository_id: The ID of the repository the file belongs to
+            original_object_id: The object id of the file before the change, from the diff, if any
 
     """
     logfire.info("Starting Markdown docs reviewer agent.", file_path=review_request.file_path)
 
-    md_rules = await get_review_rules(language=ReviewRuleLanguage.MD)
+    base_content = await _base_content(review_request)
+    md_rules, trivial_change_note = await _review_rules(review_request, ReviewRuleLanguage.MD, base_content)
+    if trivial_change_note:
+        return trivial_change_note
 
-    review_input = ReviewInput(
-        reviewRules=md_rules, filePath=review_request.file_path, fileContent=review_request.file_content
-    )
+    routing = route_review(review_request, ReviewRuleLanguage.MD)
 
-    agent = Agent(
-        model=sub_agent_model,
-        deps_type=ReviewInput,
-        output_type=list[ReviewOutcomeItem] | None,
-        system_prompt=MD_REVIEWER_PROMPT,
-    )
+    # Only sections that changed are reviewed, and sections reviewed before are served from cache
+    sections = changed_sections(markdown_sections(review_request.file_content), base_content)
+    cache, rules_key = get_section_review_cache(), rules_digest(md_rules)
+    cached_items, to_review = [], []
+    for section in sections:
+        items = cache.get(section, rules_key, review_request.file_path)
+        if items is None:
+            to_review.append(section)
+        else:
+            cached_items.extend(items)
 
-    @agent.system_prompt
-    def get_review_specification(ctx: RunContext[ReviewInput]) -> str:
-        return (
-            f"The list of review rules is: {ctx.deps.review_rules}. \n\n "
-            f"The file content is: {ctx.deps.file_content}. \n\n "
-            f"The file path is: {ctx.deps.file_path}."
-        )
-
-    response = await agent.run("Complete the review with the specification provided.", deps=review_input)
-    return response.output
+    chunks = section_chunks(to_review, review_request.file_content, get_azure_devops_settings().REVIEW_CHUNK_MAX_TOKENS)
+    logfire.info(
+        "Split Markdown file into sections.",
+        file_path=review_request.file_path,
+        changed=len(sections),
+        cached=len(sections) - len(to_review),
+        chunks=len(chunks),
+    )
+    output = await _review_chunks(routing, MD_REVIEWER_PROMPT, md_rules, review_request.file_path, chunks)
+    output = repair_positions(output, review_request.file_content)
+    # A review that stopped at the violation cap is incomplete, caching it would hide the sections it didn't get to
+    capped = any(
+        item.review_comment is not None and item.review_comment.rule_level == ReviewRuleSeverity.DECLINED
+        for item in output or []
+    )
+    if not capped:
+        for section in to_review:
+            cache.put(section, rules_key, output or [])
+    return merge_reviews([cached_items, output])
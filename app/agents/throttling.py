@@ -0,0 +1,194 @@
+"""
+Adaptive concurrency control for requests to the model provider.
+
+A fixed concurrency limit is either too low, leaving provider quota unused, or too high, getting us throttled. The limit
+here adapts AIMD-style, like TCP congestion control: every healthy response raises it a little, and a throttled response
+(429, or 529 when the provider is overloaded) or a p95 latency well above normal cuts it by a fraction. Latency is
+measured per output token, since a long review takes long because of its size and not because the provider is slow.
+
+The limit applies to individual model requests rather than to whole agent runs. The coordinator's run lasts as long as
+the sub-agents it calls, so a coordinator holding a slot while its sub-agents wait for one could deadlock the process
+once the limit drops low enough. Per-request slots still cover every agent: they all use the models in models.py.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any
+
+import logfire
+from pydantic_ai import ModelHTTPError, RunContext
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from app.auth import get_azure_devops_settings
+
+# 529 is what Anthropic answers when it is overloaded
+THROTTLING_STATUS_CODES = {429, 529}
+
+_concurrency_limit = logfire.metric_gauge(
+    "llm.concurrency_limit", unit="{request}", description="Current adaptive limit on concurrent model requests."
+)
+_throttled_requests = logfire.metric_counter(
+    "llm.throttled", unit="{request}", description="Model requests the provider refused with a throttling status."
+)
+
+# The time to the first token is paid by every response, so shorter responses count as this many tokens
+MIN_LATENCY_TOKENS = 100
+
+
+@dataclass
+class RequestSize:
+    """Filled in by the holder of a slot once the response is in, for its latency to be judged by its size."""
+
+    output_tokens: int = 0
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit with additive increase on healthy responses and multiplicative decrease on throttling."""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        backoff_ratio: float = 0.7,
+        latency_tolerance: float = 2.0,
+        latency_window: int = 20,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._limit = float(initial_limit)
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._baseline_latency: float | None = None
+        self._last_decrease_at = float("-inf")
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        """The number of requests currently allowed to run concurrently."""
+        return max(self.min_limit, int(self._limit))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[RequestSize]:
+        """Hold one concurrency slot for the duration of a model request, and learn from how that request went."""
+        await self._acquire()
+        started_at = time.monotonic()
+        size = RequestSize()
+        try:
+            yield size
+        except ModelHTTPError as e:
+            if e.status_code in THROTTLING_STATUS_CODES:
+                _throttled_requests.add(1)
+                self._decrease(started_at, reason=f"status {e.status_code}")
+            raise
+        else:
+            self._on_success(started_at, time.monotonic() - started_at, size.output_tokens)
+        finally:
+            self.in_flight -= 1
+            self._wake_waiters()
+
+    def _on_success(self, started_at: float, latency: float, output_tokens: int = 0) -> None:
+        latency /= max(output_tokens, MIN_LATENCY_TOKENS)
+        self._latencies.append(latency)
+        # The baseline follows the typical latency slowly, so a sustained rise stands out against it for a while
+        self._baseline_latency = (
+            latency if self._baseline_latency is None else 0.95 * self._baseline_latency + 0.05 * latency
+        )
+
+        if len(self._latencies) == self._latencies.maxlen and self.p95_latency() > (
+            self.latency_tolerance * self._baseline_latency
+        ):
+            self._decrease(started_at, reason="p95 latency")
+        else:
+            # Roughly +1 for every limit's worth of healthy responses
+            self._set_limit(self._limit + 1 / self.limit)
+
+    def p95_latency(self) -> float:
+        """The 95th percentile latency per output token of the most recent requests."""
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else 0.0
+
+    def _decrease(self, started_at: float, reason: str) -> None:
+        # Requests that were already underway when we last backed off reflect the old limit, don't punish twice for them
+        if started_at < self._last_decrease_at:
+            return
+        self._last_decrease_at = time.monotonic()
+        self._latencies.clear()
+        self._set_limit(self._limit * self.backoff_ratio)
+        logfire.warning("Backing off on model requests.", reason=reason, limit=self.limit)
+
+    def _set_limit(self, limit: float) -> None:
+        self._limit = min(float(self.max_limit), max(float(self.min_limit), limit))
+        _concurrency_limit.set(self.limit)
+        self._wake_waiters()
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we got cancelled, pass it on
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+@lru_cache(maxsize=1)
+def get_llm_concurrency_limiter() -> AdaptiveConcurrencyLimiter:
+    """Instantiate the process-wide model request limiter or return the existing one."""
+    settings = get_azure_devops_settings()
+    return AdaptiveConcurrencyLimiter(
+        initial_limit=settings.LLM_CONCURRENCY_INITIAL,
+        min_limit=settings.LLM_CONCURRENCY_MIN,
+        max_limit=settings.LLM_CONCURRENCY_MAX,
+    )
+
+
+class ConcurrencyLimitedModel(WrapperModel):
+    """Model that takes a slot from the shared adaptive limiter for every request it makes."""
+
+    async def request(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        async with get_llm_concurrency_limiter().slot() as size:
+            response = await super().request(*args, **kwargs)
+            size.output_tokens = response.usage.output_tokens
+            return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        async with get_llm_concurrency_limiter().slot() as size:
+            async with super().request_stream(
+                messages, model_settings, model_request_parameters, run_context
+            ) as response_stream:
+                yield response_stream
+                size.output_tokens = response_stream.usage().output_tokens
@@ -0,0 +1,172 @@
+"""
+Tokens-per-minute budget for requests to the model provider, shared by every agent and review.
+
+The provider limits input and output tokens per minute. Sending a request when the budget is spent just earns a 429, so
+each request reserves its estimated tokens up front and waits until the budget allows it. Once the response is in, the
+reservation is settled against the usage the provider reported: an overestimate is refunded, an underestimate is
+charged on top.
+
+The budget lives in the token buckets of app/rate_limiting.py. With the sqlite backend it is shared between processes.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import logfire
+import pydantic_core
+from pydantic_ai import RunContext
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import RequestUsage
+
+from app.auth import get_azure_devops_settings
+from app.rate_limiting import TokenBucketBackend, get_token_bucket_backend
+
+# The usual rule of thumb for English text and code. Errs on the high side for code, which is what we want here.
+CHARS_PER_TOKEN = 4
+
+_budget_wait = logfire.metric_histogram(
+    "llm.token_budget_wait", unit="s", description="Time a model request waited for tokens-per-minute budget."
+)
+
+
+def estimate_input_tokens(messages: Sequence[ModelMessage], model_request_parameters: ModelRequestParameters) -> int:
+    """Rough token count of everything sent in a request: the messages, instructions and tool definitions."""
+    chars = 0
+    for message in messages:
+        chars += len(getattr(message, "instructions", None) or "")
+        for part in message.parts:
+            content = getattr(part, "content", None) or getattr(part, "args", None)
+            chars += len(content) if isinstance(content, str) else len(pydantic_core.to_json(content))
+    for tool in model_request_parameters.function_tools + model_request_parameters.output_tools:
+        chars += len(tool.name) + len(tool.description or "") + len(pydantic_core.to_json(tool.parameters_json_schema))
+    return chars // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class TokenReservation:
+    """Tokens taken from the budget for one request, to be settled once its actual usage is known."""
+
+    bucket: str
+    input_tokens: int
+    output_tokens: int
+
+
+class TokenBudget:
+    """Separate input and output token buckets per model, refilled at the per-minute limits."""
+
+    def __init__(self, backend: TokenBucketBackend, input_tokens_per_minute: int, output_tokens_per_minute: int):
+        self.backend = backend
+        self.input_tokens_per_minute = input_tokens_per_minute
+        self.output_tokens_per_minute = output_tokens_per_minute
+
+    async def _take(self, key: str, tokens: int, per_minute: int) -> None:
+        # A request larger than a full minute of budget would never fit, it gets the whole bucket instead
+        tokens = min(tokens, per_minute)
+        while (wait_seconds := await self.backend.acquire(key, tokens, rate=per_minute / 60, capacity=per_minute)) > 0:
+            _budget_wait.record(wait_seconds)
+            await asyncio.sleep(wait_seconds)
+
+    async def reserve(self, bucket: str, input_tokens: int, output_tokens: int) -> TokenReservation:
+        """Wait until the budget allows the estimated tokens, then take them."""
+        await self._take(f"tpm:{bucket}:input", input_tokens, self.input_tokens_per_minute)
+        await self._take(f"tpm:{bucket}:output", output_tokens, self.output_tokens_per_minute)
+        return TokenReservation(bucket=bucket, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    async def settle(self, reservation: TokenReservation, usage: RequestUsage | None) -> None:
+        """Correct the reservation to the actual usage. Without usage, e.g. when the request failed, it's refunded."""
+        actual_input = usage.input_tokens if usage else 0
+        actual_output = usage.output_tokens if usage else 0
+        for direction, reserved, actual, per_minute in [
+            ("input", reservation.input_tokens, actual_input, self.input_tokens_per_minute),
+            ("output", reservation.output_tokens, actual_output, self.output_tokens_per_minute),
+        ]:
+            if actual != reserved:
+                await self.backend.acquire(
+                    f"tpm:{reservation.bucket}:{direction}",
+                    actual - reserved,
+                    rate=per_minute / 60,
+                    capacity=per_minute,
+                    force=True,
+                )
+
+
+@lru_cache(maxsize=1)
+def get_token_budget() -> TokenBudget | None:
+    """Instantiate the shared token budget or return the existing one. None when no limits are configured."""
+    settings = get_azure_devops_settings()
+    if not settings.LLM_INPUT_TOKENS_PER_MINUTE or not settings.LLM_OUTPUT_TOKENS_PER_MINUTE:
+        return None
+    return TokenBudget(
+        backend=get_token_bucket_backend(),
+        input_tokens_per_minute=settings.LLM_INPUT_TOKENS_PER_MINUTE,
+        output_tokens_per_minute=settings.LLM_OUTPUT_TOKENS_PER_MINUTE,
+    )
+
+
+class TokenBudgetedModel(WrapperModel):
+    """Model that reserves tokens-per-minute budget before every request and settles it after."""
+
+    async def _reserve(
+        self,
+        budget: TokenBudget,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> TokenReservation:
+        max_tokens = (model_settings or {}).get("max_tokens") or get_azure_devops_settings().LLM_OUTPUT_TOKENS_ESTIMATE
+        return await budget.reserve(
+            self.model_name, estimate_input_tokens(messages, model_request_parameters), max_tokens
+        )
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        budget = get_token_budget()
+        if budget is None:
+            return await super().request(messages, model_settings, model_request_parameters)
+
+        reservation = await self._reserve(budget, messages, model_settings, model_request_parameters)
+        usage = None
+        try:
+            response = await super().request(messages, model_settings, model_request_parameters)
+            usage = response.usage
+            return response
+        finally:
+            await budget.settle(reservation, usage)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        budget = get_token_budget()
+        if budget is None:
+            async with super().request_stream(
+                messages, model_settings, model_request_parameters, run_context
+            ) as response_stream:
+                yield response_stream
+            return
+
+        reservation = await self._reserve(budget, messages, model_settings, model_request_parameters)
+        response_stream = None
+        try:
+            async with super().request_stream(
+                messages, model_settings, model_request_parameters, run_context
+            ) as response_stream:
+                yield response_stream
+        finally:
+            # Also when the stream is aborted, e.g. at the violation cap: the tokens generated until then are billed
+            await budget.settle(reservation, response_stream.usage() if response_stream is not None else None)
@@ -0,0 +1,96 @@
+"""
+Static pre-checks for review rules that can be detected mechanically.
+
+Rules like "no print statements" or "no SELECT *" don't need a model to judge them: a syntax tree or token stream
+finds every violation, exactly and in microseconds. Those rules are checked here before a file goes to its reviewer
+agent, and only the rules, or the parts of rules, that need judgment are sent along with it. The findings become review outcome items with
+the same shape as the agent's, so the coordinator can't tell them apart.
+
+Which rules are checked statically is decided by the checks that exist, see PYTHON_CHECKS and SQL_CHECKS. A check that
+covers only some of the code smells of its rule is listed in PYTHON_PARTIAL_CHECKS or SQL_PARTIAL_CHECKS, and the rule
+stays with the reviewer without those smells. A rule that is removed from the rules files is no longer checked,
+statically or otherwise.
+"""
+
+from dataclasses import dataclass
+
+from app.analysis.findings import Finding
+from app.analysis.python_checks import PYTHON_CHECKS, PYTHON_PARTIAL_CHECKS, check_python
+from app.analysis.sql_checks import SQL_CHECKS, SQL_PARTIAL_CHECKS, check_sql
+from app.models.review_models import ReviewComment, ReviewOutcomeItem, ReviewRule, ReviewRuleLanguage
+from app.prompts.core import STATICALLY_CHECKED_NOTE
+
+STATIC_RULE_IDS: dict[ReviewRuleLanguage, frozenset[str]] = {
+    ReviewRuleLanguage.PYTHON: frozenset(PYTHON_CHECKS),
+    ReviewRuleLanguage.SQL: frozenset(SQL_CHECKS),
+}
+PARTIAL_CHECKS: dict[str, frozenset[str]] = {**PYTHON_PARTIAL_CHECKS, **SQL_PARTIAL_CHECKS}
+
+
+@dataclass
+class StaticReview:
+    items: list[ReviewOutcomeItem]
+    remaining_rules: list[ReviewRule]
+
+    def merge(self, reviewer_items: list[ReviewOutcomeItem] | None) -> list[ReviewOutcomeItem] | None:
+        """Combine the static findings with the reviewer's, keeping the reviewer's convention of None for no issues."""
+        return [*self.items, *(reviewer_items or [])] or None
+
+
+def _outcome_item(file_path: str, finding: Finding, rule: ReviewRule) -> ReviewOutcomeItem:
+    return ReviewOutcomeItem(
+        filePath=file_path,
+        startLine=finding.start_line,
+        startOffset=finding.start_offset,
+        endLine=finding.end_line,
+        endOffset=finding.end_offset,
+        reviewComment=ReviewComment(
+            ruleLevel=rule.severity,
+            ruleTitle=rule.title,
+            ruleId=rule.id,
+            problemDescription=finding.problem_description,
+            expectedFix=finding.expected_fix,
+        ),
+    )
+
+
+def _reviewer_rule(rule: ReviewRule) -> ReviewRule | None:
+    """What's left of a statically checked rule for the reviewer, None if the checks cover all of it."""
+    covered = PARTIAL_CHECKS.get(rule.id)
+    if covered is None:
+        return None
+    checked = [smell for smell in rule.code_smells if smell in covered]
+    if not checked:
+        return rule
+    note = STATICALLY_CHECKED_NOTE.format(code_smells="; ".join(checked))
+    return rule.model_copy(
+        update={
+            "code_smells": [smell for smell in rule.code_smells if smell not in covered],
+            "rule_instructions": f"{rule.rule_instructions} {note}" if rule.rule_instructions else note,
+        }
+    )
+
+
+def run_static_checks(
+    language: ReviewRuleLanguage, file_path: str, file_content: str, rules: list[ReviewRule]
+) -> StaticReview:
+    """Check the rules that can be checked statically, and return the findings and the rules left for the reviewer."""
+    rules_by_id = {rule.id: rule for rule in rules}
+    rule_ids = STATIC_RULE_IDS.get(language, frozenset()) & rules_by_id.keys()
+
+    if language == ReviewRuleLanguage.PYTHON:
+        findings = check_python(file_content, rule_ids)
+    elif language == ReviewRuleLanguage.SQL:
+        findings = check_sql(file_content, rule_ids)
+    else:
+        findings = []
+
+    # Content that doesn't parse gets the full review
+    if findings is None:
+        return StaticReview(items=[], remaining_rules=rules)
+
+    remaining_rules = [rule if rule.id not in rule_ids else _reviewer_rule(rule) for rule in rules]
+    return StaticReview(
+        items=[_outcome_item(file_path, finding, rules_by_id[finding.rule_id]) for finding in findings],
+        remaining_rules=[rule for rule in remaining_rules if rule is not None],
+    )
@@ -0,0 +1,249 @@
+"""
+Splits large files into chunks that are reviewed separately and concurrently.
+
+A large file reviewed in one go is slow, and the review tends to hit the cap on the number of violations before it
+reaches the bottom of the file. Chunks are cut at boundaries that keep related code together, and each one carries the
+context it needs to be understood on its own: for Python that's the module header with the imports.
+
+Line numbers in a review of a chunk refer to the chunk. Chunk.to_original_line maps them back to the file.
+"""
+
+import ast
+from dataclasses import dataclass
+
+from app.agents.token_budget import CHARS_PER_TOKEN
+from app.analysis.sql_checks import Token, TokenKind, tokenize
+from app.models.review_models import ReviewOutcomeItem, ReviewRuleSeverity
+
+
+@dataclass
+class Chunk:
+    """
+    Part of a file to review. line_numbers holds the line in the file of every line in the chunk.
+
+    A chunk may start with context_lines lines of context, like the imports of a Python module, that are there to
+    understand the rest and are reviewed in another chunk.
+    """
+
+    content: str
+    line_numbers: list[int]
+    context_lines: int = 0
+    is_excerpt: bool = True
+
+    def to_original_line(self, line: int) -> int:
+        """Map a line number in the chunk to the line number in the file."""
+        return self.line_numbers[min(max(line, 1), len(self.line_numbers)) - 1]
+
+    def describe(self) -> str | None:
+        """Tells the reviewer which part of the file it is looking at. None for a chunk that is the whole file."""
+        if not self.is_excerpt:
+            return None
+        description = f"This is an excerpt of a larger file, made up of lines {_line_ranges(self.line_numbers)}."
+        if self.context_lines:
+            description += (
+                f" Its first {self.context_lines} lines are the file's header, included for context only and reviewed "
+                f"separately: don't comment on them."
+            )
+        return description + " Report line numbers within the excerpt as it is given to you."
+
+
+def _line_ranges(line_numbers: list[int]) -> str:
+    ranges: list[list[int]] = []
+    for line in line_numbers:
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return ", ".join(f"{first}-{last}" if first != last else str(first) for first, last in ranges)
+
+
+def estimate_tokens(lines: list[str]) -> int:
+    return sum(len(line) for line in lines) // CHARS_PER_TOKEN
+
+
+def _pack(spans: list[tuple[int, int]], lines: list[str], max_tokens: int) -> list[list[tuple[int, int]]]:
+    """Group consecutive spans of (first line, last line) so each group stays within max_tokens, where possible."""
+    groups: list[list[tuple[int, int]]] = [[]]
+    used = 0
+    for first, last in spans:
+        size = estimate_tokens(lines[first - 1 : last])
+        if groups[-1] and used + size > max_tokens:
+            groups.append([])
+            used = 0
+        groups[-1].append((first, last))
+        used += size
+    return groups
+
+
+def whole_file(source: str) -> list[Chunk]:
+    line_count = max(1, len(source.splitlines()))
+    return [Chunk(content=source, line_numbers=list(range(1, line_count + 1)), is_excerpt=False)]
+
+
+def chunk_python(source: str, max_tokens: int) -> list[Chunk]:
+    """
+    Split Python source at top-level function and class definitions into chunks of at most max_tokens, where possible.
+
+    Everything before the first definition is the header, which is repeated at the start of every chunk but the first.
+    Code between two definitions stays with the one before it. A definition larger than max_tokens gets a chunk of its
+    own. Sources that fit within max_tokens, or don't parse, are returned whole.
+    """
+    lines = source.splitlines(keepends=True)
+    if estimate_tokens(lines) <= max_tokens:
+        return whole_file(source)
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return whole_file(source)
+
+    starts = [
+        min([node.lineno, *(decorator.lineno for decorator in node.decorator_list)])
+        for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+    if len(starts) < 2:
+        return whole_file(source)
+
+    header_lines = starts[0] - 1
+    header = lines[:header_lines]
+    # Each unit is a definition with the code that follows it, up to the next definition: (first line, last line)
+    units = [(start, end - 1) for start, end in zip(starts, [*starts[1:], len(lines) + 1])]
+
+    groups = _pack(units, lines, max(max_tokens - estimate_tokens(header), 0))
+
+    chunks = []
+    for index, group in enumerate(groups):
+        first_line, last_line = group[0][0], group[-1][1]
+        body = "".join(lines[first_line - 1 : last_line])
+        # The first chunk simply starts at the top of the file, so its header isn't context but reviewed as part of it
+        chunks.append(
+            Chunk(
+                content="".join(header) + body,
+                line_numbers=[*range(1, header_lines + 1), *range(first_line, last_line + 1)],
+                context_lines=header_lines if index else 0,
+            )
+        )
+    return chunks
+
+
+def map_to_file(chunk: Chunk, item: ReviewOutcomeItem) -> ReviewOutcomeItem:
+    """The outcome item with its line numbers mapped from the chunk back to the file."""
+    return item.model_copy(
+        update={
+            "start_line": chunk.to_original_line(item.start_line) if item.start_line else None,
+            "end_line": chunk.to_original_line(item.end_line) if item.end_line else None,
+        }
+    )
+
+
+def merge_reviews(reviews: list[list[ReviewOutcomeItem] | None]) -> list[ReviewOutcomeItem] | None:
+    """
+    Merge the reviews of the chunks of one file, already mapped to the file's line numbers.
+
+    Findings on the same lines for the same rule are kept once, since overlapping context can make chunks report the
+    same violation. Only one DECLINED item is kept, at the end.
+    """
+    merged: dict[tuple, ReviewOutcomeItem] = {}
+    declined = None
+    for items in reviews:
+        for item in items or []:
+            comment = item.review_comment
+            if comment is not None and comment.rule_level == ReviewRuleSeverity.DECLINED:
+                declined = declined or item
+                continue
+            rule = (comment.rule_id or comment.problem_description) if comment is not None else None
+            merged.setdefault((rule, item.start_line, item.end_line), item)
+
+    result = sorted(merged.values(), key=lambda item: (item.start_line or 0, item.start_offset or 0))
+    if declined is not None:
+        result.append(declined)
+    return result or None
+
+
+@dataclass
+class SqlStatementSpan:
+    """The lines of one or more SQL statements, with the comments and blank lines before them."""
+
+    first_line: int
+    last_line: int
+    text: str
+    shape: str
+
+
+@dataclass
+class SqlChunking:
+    chunks: list[Chunk]
+    statements: int
+    unchanged: int
+    repeated: int
+
+
+def sql_statement_spans(source: str) -> list[SqlStatementSpan]:
+    """
+    Split SQL into spans of whole lines, one per statement.
+
+    Statements that share a line share a span. The text of a span leaves out comments and normalizes whitespace, so it
+    compares equal across formatting changes. Its shape also replaces literals, so a hundred INSERTs of different rows
+    share the same shape.
+    """
+    statements: list[list[Token]] = [[]]
+    for token in tokenize(source):
+        if token.kind == TokenKind.COMMENT:
+            continue
+        statements[-1].append(token)
+        if token.text == ";" and token.depth == 0:
+            statements.append([])
+
+    spans: list[SqlStatementSpan] = []
+    for tokens in statements:
+        if not tokens:
+            continue
+        text = " ".join(token.text for token in tokens)
+        shape = " ".join("?" if token.kind in (TokenKind.STRING, TokenKind.NUMBER) else token.upper for token in tokens)
+        if spans and tokens[0].line <= spans[-1].last_line:
+            previous = spans[-1]
+            previous.last_line = tokens[-1].line
+            previous.text, previous.shape = f"{previous.text} {text}", f"{previous.shape} {shape}"
+        else:
+            first_line = spans[-1].last_line + 1 if spans else 1
+            spans.append(SqlStatementSpan(first_line, tokens[-1].line, text, shape))
+
+    # Trailing comments and blank lines stay with the last statement
+    if spans:
+        spans[-1].last_line = max(spans[-1].last_line, len(source.splitlines()))
+    return spans
+
+
+def chunk_sql(source: str, max_tokens: int, base_source: str | None = None) -> SqlChunking:
+    """
+    Split SQL into chunks of whole statements, leaving out the statements that don't need a review.
+
+    Left out are statements that are also in base_source, the version of the file before the change, and statements
+    with the same shape as one before them: reviewing one of those covers the others. What remains is packed into
+    chunks of at most max_tokens where possible. When nothing was left out and the file fits, it's returned whole.
+    """
+    spans = sql_statement_spans(source)
+    base_texts = {span.text for span in sql_statement_spans(base_source)} if base_source is not None else set()
+
+    kept, shapes, unchanged, repeated = [], set(), 0, 0
+    for span in spans:
+        if span.text in base_texts:
+            unchanged += 1
+        elif span.shape in shapes:
+            repeated += 1
+        else:
+            shapes.add(span.shape)
+            kept.append(span)
+
+    lines = source.splitlines(keepends=True)
+    if not unchanged and not repeated and estimate_tokens(lines) <= max_tokens:
+        return SqlChunking(whole_file(source), len(spans), 0, 0)
+
+    chunks = []
+    for group in _pack([(span.first_line, span.last_line) for span in kept], lines, max_tokens):
+        if not group:
+            continue
+        line_numbers = [line for first, last in group for line in range(first, last + 1)]
+        content = "".join(lines[line - 1] for line in line_numbers)
+        chunks.append(Chunk(content=content, line_numbers=line_numbers))
+    return SqlChunking(chunks, len(spans), unchanged, repeated)
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Finding:
+    """A rule violation found by a static check. Lines and offsets start at 1, offsets count characters."""
+
+    rule_id: str
+    start_line: int
+    start_offset: int
+    end_line: int
+    end_offset: int
+    problem_description: str
+    expected_fix: str
@@ -0,0 +1,185 @@
+"""
+Section-aware review of Markdown documents.
+
+A typo fix in a forty page document shouldn't cost a review of all forty pages. Documents are split into sections at
+their headings, and only the sections that differ from the previous version of the document are reviewed. Each is
+sent along with the headings above it, so the reviewer knows where in the document it is.
+
+The outcome of every reviewed section is cached on a hash of its heading path, its text and the rules it was reviewed
+with. A section that comes by again, in another pull request or after a rebase, isn't reviewed a second time. Line
+numbers are cached relative to the section, so moving a section around in the document doesn't invalidate it.
+"""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+
+from app.analysis.chunking import Chunk, estimate_tokens, whole_file
+from app.auth import get_azure_devops_settings
+from app.models.review_models import ReviewOutcomeItem, ReviewRule
+
+_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+
+@dataclass
+class MarkdownSection:
+    """Lines first_line to last_line of a document: a heading and the text up to the next heading."""
+
+    first_line: int
+    last_line: int
+    # The lines and titles of the headings above this section, outermost first
+    heading_lines: list[int]
+    heading_path: list[str]
+    text: str
+
+    @cached_property
+    def digest(self) -> str:
+        return hashlib.sha256(json.dumps([self.heading_path, self.text]).encode("utf-8")).hexdigest()
+
+
+def markdown_sections(source: str) -> list[MarkdownSection]:
+    """
+    Split a document into sections at its ATX headings (# Title), ignoring lines in fenced code blocks.
+
+    Text before the first heading is a section of its own, with an empty heading path.
+    """
+    lines = source.splitlines(keepends=True)
+    starts: list[tuple[int, int, str]] = []  # (line, level, title)
+    fence = None
+    for number, line in enumerate(lines, start=1):
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            continue
+        heading = _HEADING.match(line.rstrip("\n")) if fence is None else None
+        if heading:
+            starts.append((number, len(heading.group(1)), (heading.group(2) or "").strip()))
+
+    if not starts or starts[0][0] > 1:
+        starts.insert(0, (1, 0, ""))
+
+    sections = []
+    ancestors: list[tuple[int, int, str]] = []
+    for index, (first_line, level, title) in enumerate(starts):
+        last_line = starts[index + 1][0] - 1 if index + 1 < len(starts) else len(lines)
+        while ancestors and ancestors[-1][1] >= level:
+            ancestors.pop()
+        sections.append(
+            MarkdownSection(
+                first_line=first_line,
+                last_line=max(first_line, last_line),
+                heading_lines=[ancestor[0] for ancestor in ancestors],
+                heading_path=[*(ancestor[2] for ancestor in ancestors), title],
+                text="".join(lines[first_line - 1 : last_line]),
+            )
+        )
+        if level:
+            ancestors.append((first_line, level, title))
+    return sections
+
+
+def changed_sections(sections: list[MarkdownSection], base_source: str | None) -> list[MarkdownSection]:
+    """The sections that aren't in the previous version of the document. All of them, when there's no such version."""
+    if base_source is None:
+        return sections
+    base_digests = {section.digest for section in markdown_sections(base_source)}
+    return [section for section in sections if section.digest not in base_digests]
+
+
+def section_chunks(sections: list[MarkdownSection], source: str, max_tokens: int) -> list[Chunk]:
+    """
+    Pack sections into chunks of at most max_tokens where possible, keeping document order.
+
+    Every chunk starts with the headings above its first section that aren't part of the chunk itself.
+    """
+    lines = source.splitlines(keepends=True)
+    if sections and sum(section.last_line - section.first_line + 1 for section in sections) == len(lines):
+        if estimate_tokens(lines) <= max_tokens:
+            return whole_file(source)
+
+    groups: list[list[MarkdownSection]] = []
+    used = 0
+    for section in sections:
+        size = estimate_tokens(lines[section.first_line - 1 : section.last_line])
+        adjacent = groups and groups[-1][-1].last_line + 1 == section.first_line
+        if not groups or not adjacent or used + size > max_tokens:
+            groups.append([])
+            used = 0
+        groups[-1].append(section)
+        used += size
+
+    chunks = []
+    for group in groups:
+        context = group[0].heading_lines
+        body = [line for section in group for line in range(section.first_line, section.last_line + 1)]
+        line_numbers = [*context, *body]
+        chunks.append(
+            Chunk(
+                content="".join(lines[line - 1] for line in line_numbers),
+                line_numbers=line_numbers,
+                context_lines=len(context),
+            )
+        )
+    return chunks
+
+
+def rules_digest(rules: list[ReviewRule]) -> str:
+    """Identifies a set of rules, so cached reviews are invalidated when the rules change."""
+    return hashlib.sha256(json.dumps([rule.model_dump(mode="json") for rule in rules]).encode("utf-8")).hexdigest()
+
+
+class SectionReviewCache:
+    """LRU of review outcomes per section and rule set, with line numbers relative to the section."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], list[ReviewOutcomeItem]] = OrderedDict()
+
+    def get(self, section: MarkdownSection, rules_key: str, file_path: str) -> list[ReviewOutcomeItem] | None:
+        """
+        The cached outcome of the section with file line numbers, or None if it wasn't reviewed before.
+
+        The same section can come by in another file, so the items are given the path of the file it's in now.
+        """
+        key = (section.digest, rules_key)
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return [
+            _shift_lines(item, section.first_line - 1).model_copy(update={"file_path": file_path})
+            for item in self._entries[key]
+        ]
+
+    def put(self, section: MarkdownSection, rules_key: str, items: list[ReviewOutcomeItem]) -> None:
+        """Remember the outcome of a section. Items carry file line numbers, only those within the section are kept."""
+        self._entries[(section.digest, rules_key)] = [
+            _shift_lines(item, 1 - section.first_line)
+            for item in items
+            if item.start_line and section.first_line <= item.start_line <= section.last_line
+        ]
+        self._entries.move_to_end((section.digest, rules_key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _shift_lines(item: ReviewOutcomeItem, delta: int) -> ReviewOutcomeItem:
+    return item.model_copy(
+        update={
+            "start_line": item.start_line + delta if item.start_line else None,
+            "end_line": item.end_line + delta if item.end_line else None,
+        }
+    )
+
+
+@lru_cache(maxsize=1)
+def get_section_review_cache() -> SectionReviewCache:
+    """Instantiate the process-wide section review cache or return the existing one."""
+    return SectionReviewCache(max_entries=get_azure_devops_settings().MARKDOWN_SECTION_CACHE_MAX_ENTRIES)
@@ -0,0 +1,132 @@
+"""
+Checks and repairs the positions of review comments against the file they're about.
+
+Line numbers and offsets come from a model, and a model miscounts: a line past the end of the file, an offset past the
+end of its line, or an end before the start. Azure DevOps refuses threads like that with a 400, which costs a POST and
+a retry by the coordinator. The line index of a file is computed once, after which every position is checked and
+repaired in constant time: clamped into the file, ordered, and widened to whole words so a comment doesn't start or
+end halfway through a name.
+
+Offsets are 1-based. An end offset points just past the last character of the span, so the end of a line is its length
+plus one.
+"""
+
+from dataclasses import dataclass
+
+import logfire
+
+from app.models.review_models import ReviewOutcomeItem
+
+_repaired_positions = logfire.metric_counter(
+    "reviews.positions_repaired", unit="{comment}", description="Number of comment positions repaired before posting."
+)
+
+
+def _is_word(character: str) -> bool:
+    return character.isalnum() or character == "_"
+
+
+@dataclass(frozen=True)
+class Span:
+    start_line: int
+    start_offset: int
+    end_line: int
+    end_offset: int
+
+
+class LineIndex:
+    """Where every line of a file starts and how long it is, for positions to be checked without scanning the file."""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.starts: list[int] = [0]
+        self.lengths: list[int] = []
+        for line in content.splitlines(keepends=True):
+            self.lengths.append(len(line.rstrip("\r\n")))
+            self.starts.append(self.starts[-1] + len(line))
+        if not self.lengths:
+            self.lengths.append(0)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.lengths)
+
+    def line_length(self, line: int) -> int:
+        return self.lengths[line - 1]
+
+    def clamp(self, line: int | None, offset: int | None) -> tuple[int, int]:
+        """The nearest position that exists in the file. A missing line is the first, a missing offset the start."""
+        line = min(max(line or 1, 1), self.line_count)
+        offset = min(max(offset or 1, 1), self.line_length(line) + 1)
+        return line, offset
+
+    def _splits_word(self, line: int, offset: int) -> bool:
+        """Whether the position lies between two characters of the same word."""
+        if not 1 < offset <= self.line_length(line):
+            return False
+        position = self.starts[line - 1] + offset - 1
+        return _is_word(self.content[position - 1]) and _is_word(self.content[position])
+
+    def _snap_start(self, line: int, offset: int) -> int:
+        while self._splits_word(line, offset):
+            offset -= 1
+        return offset
+
+    def _snap_end(self, line: int, offset: int) -> int:
+        while self._splits_word(line, offset):
+            offset += 1
+        return offset
+
+    def repair(
+        self, start_line: int | None, start_offset: int | None, end_line: int | None, end_offset: int | None
+    ) -> Span:
+        """A valid span as close as possible to the given one, widened to word boundaries."""
+        start_line, start_offset = self.clamp(start_line, start_offset)
+        missing_end = end_offset is None
+        end_line, end_offset = self.clamp(end_line or start_line, end_offset)
+        if missing_end:
+            # A missing end covers the rest of the line
+            end_offset = self.line_length(end_line) + 1
+        if (end_line, end_offset) < (start_line, start_offset):
+            start_line, start_offset, end_line, end_offset = end_line, end_offset, start_line, start_offset
+        if (end_line, end_offset) == (start_line, start_offset):
+            # An empty span can't be anchored to, take the rest of the line instead
+            end_offset = self.line_length(end_line) + 1
+        return Span(
+            start_line, self._snap_start(start_line, start_offset), end_line, self._snap_end(end_line, end_offset)
+        )
+
+    def repair_item(self, item: ReviewOutcomeItem) -> ReviewOutcomeItem:
+        """
+        The item itself if its position is valid, otherwise a copy with the repaired position.
+
+        An item without a full position isn't anchored to a span, it's left as it is.
+        """
+        start_line, start_offset, end_line, end_offset = (
+            item.start_line,
+            item.start_offset,
+            item.end_line,
+            item.end_offset,
+        )
+        if start_line is None or start_offset is None or end_line is None or end_offset is None:
+            return item
+        span = self.repair(start_line, start_offset, end_line, end_offset)
+        if span == Span(start_line, start_offset, end_line, end_offset):
+            return item
+        _repaired_positions.add(1)
+        return item.model_copy(
+            update={
+                "start_line": span.start_line,
+                "start_offset": span.start_offset,
+                "end_line": span.end_line,
+                "end_offset": span.end_offset,
+            }
+        )
+
+
+def repair_positions(items: list[ReviewOutcomeItem] | None, content: str) -> list[ReviewOutcomeItem] | None:
+    """The items with their positions repaired against the content they were found in."""
+    if not items:
+        return items
+    line_index = LineIndex(content)
+    return [line_index.repair_item(item) for item in items]
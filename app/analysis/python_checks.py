@@ -0,0 +1,252 @@
+"""
+Python rules that can be checked exactly with a walk over the syntax tree.
+
+The messages follow the reviewer prompt: they name the problem and the type of fix, not the exact fix.
+"""
+
+import ast
+import re
+from collections.abc import Collection, Iterator
+
+from app.analysis.findings import Finding
+
+_SECRET_NAME = re.compile(
+    r"(?:^|_)(password|passwd|pwd|secret|token|api_?key|access_?key|private_?key|client_secret)$", re.IGNORECASE
+)
+_SECRET_VALUE = re.compile(
+    r"AKIA[0-9A-Z]{16}"  # AWS access key id
+    r"|gh[pousr]_[A-Za-z0-9]{36}"  # GitHub token
+    r"|sk-[A-Za-z0-9_-]{20,}"  # OpenAI and Anthropic style API keys
+    r"|xox[abprs]-[A-Za-z0-9-]{10,}"  # Slack token
+    r"|-----BEGIN [A-Z ]*PRIVATE KEY-----"
+)
+_MIN_SECRET_LENGTH = 8
+
+FunctionNode = ast.FunctionDef | ast.AsyncFunctionDef
+
+
+class _Positions:
+    """Converts the UTF-8 byte columns of the ast module to 1-based character offsets."""
+
+    def __init__(self, source: str):
+        self.lines = source.splitlines()
+
+    def offset(self, line: int, byte_column: int) -> int:
+        text = self.lines[line - 1] if line <= len(self.lines) else ""
+        return len(text.encode("utf-8")[:byte_column].decode("utf-8", errors="ignore")) + 1
+
+    def line_end(self, line: int) -> int:
+        text = self.lines[line - 1] if line <= len(self.lines) else ""
+        return len(text) + 1
+
+    def finding(self, rule_id: str, node: ast.expr | ast.stmt, problem_description: str, expected_fix: str) -> Finding:
+        end_line = node.end_lineno or node.lineno
+        return Finding(
+            rule_id=rule_id,
+            start_line=node.lineno,
+            start_offset=self.offset(node.lineno, node.col_offset),
+            end_line=end_line,
+            end_offset=self.offset(end_line, node.end_col_offset or node.col_offset),
+            problem_description=problem_description,
+            expected_fix=expected_fix,
+        )
+
+    def header_finding(self, rule_id: str, node: FunctionNode | ast.ClassDef, problem: str, fix: str) -> Finding:
+        """Anchored to the def or class line only, not to the whole body."""
+        return Finding(
+            rule_id=rule_id,
+            start_line=node.lineno,
+            start_offset=self.offset(node.lineno, node.col_offset),
+            end_line=node.lineno,
+            end_offset=self.line_end(node.lineno),
+            problem_description=problem,
+            expected_fix=fix,
+        )
+
+
+def _check_print(tree: ast.Module, positions: _Positions) -> Iterator[Finding]:
+    """PY001, raised once per file as the rule instructs."""
+    calls = [
+        node
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "print"
+    ]
+    if not calls:
+        return
+    calls.sort(key=lambda node: (node.lineno, node.col_offset))
+    total = f" It's called {len(calls)} times in this file in total." if len(calls) > 1 else ""
+    yield positions.finding(
+        "PY001",
+        calls[0],
+        f"print() is used for runtime output instead of a logger.{total}",
+        "Replace the print calls with calls to a structured logger at a fitting log level.",
+    )
+
+
+def _definitions(tree: ast.Module) -> list[tuple[FunctionNode | ast.ClassDef, bool]]:
+    """All functions and classes, nested ones included, in source order and with whether each is a method."""
+    methods = {
+        id(child)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.ClassDef)
+        for child in node.body
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    definitions = [
+        (node, id(node) in methods)
+        for node in ast.walk(tree)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+    return sorted(definitions, key=lambda definition: (definition[0].lineno, definition[0].col_offset))
+
+
+def _is_static(node: FunctionNode) -> bool:
+    return any(isinstance(decorator, ast.Name) and decorator.id == "staticmethod" for decorator in node.decorator_list)
+
+
+def _check_annotations(tree: ast.Module, positions: _Positions) -> Iterator[Finding]:
+    """PY002, for the parameters and return values of functions and methods."""
+    for node, is_method in _definitions(tree):
+        if isinstance(node, ast.ClassDef):
+            continue
+        arguments = node.args
+        parameters = [*arguments.posonlyargs, *arguments.args, *arguments.kwonlyargs]
+        if is_method and not _is_static(node) and parameters:
+            parameters = parameters[1:]
+        parameters += [parameter for parameter in (arguments.vararg, arguments.kwarg) if parameter is not None]
+
+        missing = [parameter.arg for parameter in parameters if parameter.annotation is None]
+        missing_return = node.returns is None and node.name != "__init__"
+        if not missing and not missing_return:
+            continue
+
+        parts = []
+        if missing:
+            parts.append(f"parameters {', '.join(missing)}")
+        if missing_return:
+            parts.append("the return value")
+        yield positions.header_finding(
+            "PY002",
+            node,
+            f"Function {node.name} has no type annotation for {' and '.join(parts)}.",
+            "Add type hints to the function signature.",
+        )
+
+
+def _check_docstrings(tree: ast.Module, positions: _Positions) -> Iterator[Finding]:
+    """PY004, for all functions, classes and methods, private and nested ones included."""
+    for node, _ in _definitions(tree):
+        if ast.get_docstring(node) is not None:
+            continue
+        kind = "Class" if isinstance(node, ast.ClassDef) else "Function"
+        yield positions.header_finding(
+            "PY004",
+            node,
+            f"{kind} {node.name} has no docstring.",
+            "Add a PEP 257 docstring that describes the behavior, inputs and outputs.",
+        )
+
+
+def _secret_targets(node: ast.AST) -> Iterator[tuple[str, ast.expr]]:
+    """Pairs of a name and the value assigned to it, from assignments, keyword arguments, defaults and dict literals."""
+    if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        for target in targets:
+            if isinstance(target, ast.Name):
+                yield target.id, node.value
+            elif isinstance(target, ast.Attribute):
+                yield target.attr, node.value
+    elif isinstance(node, ast.keyword) and node.arg is not None:
+        yield node.arg, node.value
+    elif isinstance(node, ast.Dict):
+        for key, value in zip(node.keys, node.values):
+            if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                yield key.value, value
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        arguments = node.args
+        positional = [*arguments.posonlyargs, *arguments.args]
+        for parameter, default in zip(positional[len(positional) - len(arguments.defaults) :], arguments.defaults):
+            yield parameter.arg, default
+        for parameter, default in zip(arguments.kwonlyargs, arguments.kw_defaults):
+            if default is not None:
+                yield parameter.arg, default
+
+
+def _looks_like_secret(value: ast.expr) -> bool:
+    if not isinstance(value, ast.Constant) or not isinstance(value.value, str):
+        return False
+    text = value.value
+    return len(text) >= _MIN_SECRET_LENGTH and not any(character.isspace() for character in text)
+
+
+def _check_secrets(tree: ast.Module, positions: _Positions) -> Iterator[Finding]:
+    """PY012: string literals assigned to secret-like names, and literals that match a known credential format."""
+    flagged: set[int] = set()
+    for node in ast.walk(tree):
+        for name, value in _secret_targets(node):
+            if _SECRET_NAME.search(name) and _looks_like_secret(value) and id(value) not in flagged:
+                flagged.add(id(value))
+                yield positions.finding(
+                    "PY012",
+                    value,
+                    f"A credential is hardcoded as the value of {name}.",
+                    "Load the value from an environment variable or a secret manager.",
+                )
+        if (
+            isinstance(node, ast.Constant)
+            and isinstance(node.value, str)
+            and id(node) not in flagged
+            and _SECRET_VALUE.search(node.value)
+        ):
+            flagged.add(id(node))
+            yield positions.finding(
+                "PY012",
+                node,
+                "A string literal in this file has the format of an API key, token or private key.",
+                "Load the value from an environment variable or a secret manager, and rotate the credential.",
+            )
+
+
+def _check_wildcard_imports(tree: ast.Module, positions: _Positions) -> Iterator[Finding]:
+    """PY013."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            yield positions.finding(
+                "PY013",
+                node,
+                f"Everything is imported from {node.module or 'a relative module'} with a wildcard.",
+                "Import the names that are used explicitly.",
+            )
+
+
+PYTHON_CHECKS = {
+    "PY001": _check_print,
+    "PY002": _check_annotations,
+    "PY004": _check_docstrings,
+    "PY012": _check_secrets,
+    "PY013": _check_wildcard_imports,
+}
+
+# The code smells that the checks cover, for the rules they only cover in part. The other smells of those rules are
+# left for the reviewer. Rules that aren't listed here are covered in full.
+PYTHON_PARTIAL_CHECKS = {
+    "PY002": frozenset({"Missing type hints on function parameters or return values"}),
+    "PY004": frozenset({"Functions or classes without docstrings where they should be"}),
+    # Secrets are found by name and format, which misses too many of them for a critical rule to leave to the check
+    "PY012": frozenset(),
+}
+
+
+def check_python(source: str, rule_ids: Collection[str]) -> list[Finding] | None:
+    """Run the checks of the given rules. Returns None when the source doesn't parse, leaving it to the reviewer."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    positions = _Positions(source)
+    findings = []
+    for rule_id, check in PYTHON_CHECKS.items():
+        if rule_id in rule_ids:
+            findings.extend(check(tree, positions))
+    return findings
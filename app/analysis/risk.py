@@ -0,0 +1,141 @@
+"""
+Ranks the changed files of a pull request by risk, so the riskiest files are reviewed first.
+
+A large pull request doesn't always get reviewed in full: the coordinator runs out of turns or time, or the batch window
+closes. Which files are left over was up to the order the coordinator happened to pick. The score is computed without
+any model call, from signals that are at hand or one cheap read away:
+
+- the path: authentication, SQL and infrastructure code breaks more than docs and tests do
+- the language: the reviewers know Python and SQL best
+- the size of the change, from the blob cache, when both versions were seen before
+- the churn: how often the file was changed recently on the target branch. Files that keep changing keep breaking.
+
+Scores only ever decide the order. Every file is still offered for review.
+"""
+
+import asyncio
+import re
+from collections import Counter
+from pathlib import PurePosixPath
+
+import logfire
+
+from app.auth import get_azure_devops_settings
+from app.mcp.blob_cache import get_blob_cache
+from app.mcp.operations import get_commit_count
+from app.models.azure_devops.lean_models import ChangedFile, DiffSummary
+
+# Scored on the whole path, so a folder name counts as much as a file name. The highest matching weight applies.
+_PATH_WEIGHTS = [
+    (re.compile(r"auth|login|passw|secret|token|crypt|permission|security|session|oauth|credential", re.I), 40),
+    (re.compile(r"\.sql$|migration|schema|database|/db/", re.I), 30),
+    (re.compile(r"terraform|\.tf$|\.bicep$|docker|k8s|kubernetes|helm|pipeline|\.github/workflows|infra", re.I), 30),
+    (re.compile(r"config|settings|\.ya?ml$|\.toml$|\.ini$|\.env", re.I), 15),
+]
+# Tests and docs break nothing in production
+_LOW_RISK_PATH = re.compile(r"(^|/)(tests?|docs?)/|(^|/)test_[^/]*$|_test\.\w+$|\.md$|\.txt$", re.I)
+
+_LANGUAGE_WEIGHTS = {".py": 15, ".sql": 15, ".md": 5}
+_CHANGE_TYPE_WEIGHTS = {"add": 10, "edit": 10, "rename": 5}
+
+MAX_SIZE_SCORE = 15
+# A change this many lines large scores the maximum for its size
+_LARGE_CHANGE_LINES = 200
+MAX_CHURN_SCORE = 20
+
+
+def changed_lines(content: str, base_content: str | None) -> int:
+    """The number of lines added or removed, counted by line content. An added file counts all its lines."""
+    lines, base_lines = Counter(content.splitlines()), Counter((base_content or "").splitlines())
+    return sum(((lines - base_lines) + (base_lines - lines)).values())
+
+
+def risk_score(change: ChangedFile, changed_line_count: int | None = None, churn: float | None = None) -> int:
+    """
+    The risk of a changed file, higher is riskier.
+
+    Args:
+        change: The file as listed in the diff
+        changed_line_count: Lines added or removed, None if unknown
+        churn: Recent commits to the file relative to the most that were counted, from 0 to 1. None if unknown.
+    """
+    path = change.path
+    score = max((weight for pattern, weight in _PATH_WEIGHTS if pattern.search(path)), default=0)
+    if _LOW_RISK_PATH.search(path):
+        score -= 15
+    score += _LANGUAGE_WEIGHTS.get(PurePosixPath(path).suffix.lower(), 0)
+    score += next((weight for kind, weight in _CHANGE_TYPE_WEIGHTS.items() if kind in change.change_type.lower()), 0)
+    # Unknown signals score half, so they neither push a file to the front nor to the back
+    if changed_line_count is None:
+        score += MAX_SIZE_SCORE // 2
+    else:
+        score += round(min(changed_line_count / _LARGE_CHANGE_LINES, 1) * MAX_SIZE_SCORE)
+    score += MAX_CHURN_SCORE // 2 if churn is None else round(min(churn, 1) * MAX_CHURN_SCORE)
+    return max(score, 0)
+
+
+def _cached_changed_lines(change: ChangedFile) -> int | None:
+    blob_cache = get_blob_cache()
+    content = blob_cache.get(change.object_id) if change.object_id else None
+    if content is None:
+        return None
+    if not change.original_object_id:
+        return changed_lines(content, None) if "add" in change.change_type.lower() else None
+    base_content = blob_cache.get(change.original_object_id)
+    return None if base_content is None else changed_lines(content, base_content)
+
+
+def _has_history(change: ChangedFile) -> bool:
+    # An added file has no history on the target branch, and a deleted file isn't reviewed
+    return not any(kind in change.change_type.lower() for kind in ("add", "delete"))
+
+
+async def _riskiest_churn(
+    repository_id: str, base_version: str, changes: list[ChangedFile], line_counts: list[int | None]
+) -> list[float | None]:
+    """
+    The churn of the riskiest files by their other signals. None for files without history.
+
+    Files that aren't looked up, or whose lookup fails, count as rarely changed. Scoring them as unknown instead would
+    put them ahead of the files that were looked up and found to be rarely changed.
+    """
+    settings = get_azure_devops_settings()
+    max_commits = settings.RISK_CHURN_MAX_COMMITS
+    if max_commits <= 0:
+        return [None] * len(changes)
+    churn: list[float | None] = [0.0 if _has_history(change) else None for change in changes]
+
+    # Every lookup is a request, so a large pull request only gets them for the files that could end up first
+    order = sorted(range(len(changes)), key=lambda index: -risk_score(changes[index], line_counts[index]))
+    looked_up = [index for index in order if _has_history(changes[index])][: settings.RISK_CHURN_MAX_FILES]
+    semaphore = asyncio.Semaphore(settings.RISK_CHURN_CONCURRENCY)
+
+    async def lookup(index: int) -> None:
+        change = changes[index]
+        async with semaphore:
+            try:
+                churn[index] = (
+                    await get_commit_count(repository_id, change.path, base_version, max_commits) / max_commits
+                )
+            except Exception as e:
+                # E.g. a renamed file, whose path doesn't exist on the target branch yet
+                logfire.warning("Couldn't retrieve the churn of a file.", file_path=change.path, error=str(e))
+
+    await asyncio.gather(*(lookup(index) for index in looked_up))
+    return churn
+
+
+async def rank_changes(repository_id: str, base_version: str, diffs: DiffSummary) -> DiffSummary:
+    """The diff with its changes in descending order of risk."""
+    line_counts = [_cached_changed_lines(change) for change in diffs.changes]
+    churn = await _riskiest_churn(repository_id, base_version, diffs.changes, line_counts)
+    scores = [
+        risk_score(change, line_count, file_churn)
+        for change, line_count, file_churn in zip(diffs.changes, line_counts, churn)
+    ]
+    # Sorting is stable, so files with the same score stay in the order of the diff
+    order = sorted(range(len(scores)), key=lambda index: -scores[index])
+    logfire.info(
+        "Ranked changed files by risk.", ranking={change.path: score for change, score in zip(diffs.changes, scores)}
+    )
+    return diffs.model_copy(update={"changes": [diffs.changes[index] for index in order]})
@@ -0,0 +1,209 @@
+"""
+SQL rules that can be checked exactly on a token stream.
+
+SQL dialects differ too much for a full parser, but the checks here only need to tell keywords, identifiers, literals
+and comments apart, and to know the parenthesis depth. A small tokenizer that understands quoting and comments is
+enough for that, and it doesn't trip over dialect specific syntax it doesn't know.
+"""
+
+import re
+from collections.abc import Collection, Iterator
+from dataclasses import dataclass
+from enum import Enum
+
+from app.analysis.findings import Finding
+
+
+class TokenKind(str, Enum):
+    WORD = "word"
+    QUOTED_IDENTIFIER = "quoted_identifier"
+    STRING = "string"
+    NUMBER = "number"
+    COMMENT = "comment"
+    PUNCTUATION = "punctuation"
+
+
+@dataclass
+class Token:
+    kind: TokenKind
+    text: str
+    line: int
+    offset: int
+    depth: int
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper()
+
+    @property
+    def end_offset(self) -> int:
+        return self.offset + len(self.text)
+
+
+_TOKEN_PATTERN = re.compile(
+    r"(?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))"
+    r"|(?P<string>'(?:[^']|'')*(?:'|\Z))"
+    r"|(?P<quoted_identifier>\"(?:[^\"]|\"\")*(?:\"|\Z)|\[[^\]]*(?:\]|\Z)|`[^`]*(?:`|\Z))"
+    r"|(?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)"
+    r"|(?P<word>[A-Za-z_@#][A-Za-z0-9_@#$]*)"
+    r"|(?P<space>\s+)"
+    r"|(?P<punctuation>.)",
+    re.DOTALL,
+)
+
+KEYWORDS = frozenset(
+    """
+    ALL AND AS ASC BETWEEN BY CASE CREATE CROSS DELETE DESC DISTINCT DROP ELSE END EXCEPT EXISTS FROM FULL GROUP HAVING
+    IN INNER INSERT INTERSECT INTO IS JOIN LEFT LIKE LIMIT NOT NULL ON OR ORDER OUTER OVER PARTITION RIGHT SELECT SET
+    TABLE THEN UNION UPDATE USING VALUES VIEW WHEN WHERE WITH
+    """.split()
+)
+# Where the part of a query that could hold the ON clause of a join ends
+_JOIN_CLAUSE_END = frozenset(
+    "JOIN INNER LEFT RIGHT FULL CROSS NATURAL WHERE GROUP ORDER HAVING LIMIT UNION EXCEPT INTERSECT WINDOW".split()
+)
+_CAMEL_CASE = re.compile(r"[a-z][A-Z]")
+
+
+def tokenize(sql: str) -> list[Token]:
+    """Split SQL into tokens with their 1-based line and character offset, and their parenthesis depth."""
+    tokens = []
+    line, line_start, depth = 1, 0, 0
+    for match in _TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        text = match.group()
+        if kind != "space":
+            if text == ")":
+                depth = max(0, depth - 1)
+            tokens.append(Token(TokenKind(kind), text, line, match.start() - line_start + 1, depth))
+            if text == "(":
+                depth += 1
+        newlines = text.count("\n")
+        if newlines:
+            line += newlines
+            line_start = match.start() + text.rindex("\n") + 1
+    return tokens
+
+
+def split_statements(tokens: list[Token]) -> list[list[Token]]:
+    """Group tokens into statements on the semicolons between them. Comments are left out."""
+    statements: list[list[Token]] = [[]]
+    for token in tokens:
+        if token.kind == TokenKind.COMMENT:
+            continue
+        if token.text == ";" and token.depth == 0:
+            statements.append([])
+        else:
+            statements[-1].append(token)
+    return [statement for statement in statements if statement]
+
+
+def _finding(rule_id: str, start: Token, end: Token, problem_description: str, expected_fix: str) -> Finding:
+    return Finding(
+        rule_id=rule_id,
+        start_line=start.line,
+        start_offset=start.offset,
+        end_line=end.line,
+        end_offset=end.end_offset,
+        problem_description=problem_description,
+        expected_fix=expected_fix,
+    )
+
+
+def _check_select_star(statements: list[list[Token]]) -> Iterator[Finding]:
+    """SQL002: a * in a select list, qualified or not. COUNT(*) and multiplication are fine."""
+    for statement in statements:
+        for index in range(1, len(statement)):
+            previous, token = statement[index - 1], statement[index]
+            if token.text == "*" and (previous.upper in ("SELECT", "DISTINCT", ",") or previous.text == "."):
+                start = statement[index - 2] if previous.text == "." and index >= 2 else token
+                yield _finding(
+                    "SQL002",
+                    start,
+                    token,
+                    "All columns are selected with *.",
+                    "List the columns that are needed explicitly.",
+                )
+
+
+def _check_cartesian_joins(statements: list[list[Token]]) -> Iterator[Finding]:
+    """SQL003: a JOIN that isn't followed by an ON or USING clause at the same depth, CROSS JOIN included."""
+    for statement in statements:
+        for index, token in enumerate(statement):
+            if token.upper != "JOIN":
+                continue
+            previous = statement[index - 1].upper if index else ""
+            following = statement[index + 1 :]
+            if previous == "NATURAL" or (following and following[0].upper == "LATERAL"):
+                continue
+
+            has_condition = False
+            for candidate in following:
+                if candidate.depth < token.depth:
+                    break
+                if candidate.depth == token.depth and candidate.kind == TokenKind.WORD:
+                    if candidate.upper in ("ON", "USING"):
+                        has_condition = True
+                        break
+                    if candidate.upper in _JOIN_CLAUSE_END:
+                        break
+            if not has_condition:
+                start = (
+                    statement[index - 1] if previous in ("CROSS", "INNER", "LEFT", "RIGHT", "FULL", "OUTER") else token
+                )
+                yield _finding(
+                    "SQL003",
+                    start,
+                    token,
+                    "This join has no join condition, so it produces the cartesian product of both sides.",
+                    "Add a join condition, or make sure the cartesian product is truly required.",
+                )
+
+
+def _check_capitalization(statements: list[list[Token]]) -> Iterator[Finding]:
+    """SQL006, raised once per kind of violation so a file written in lowercase doesn't get a comment per keyword."""
+    words = [token for statement in statements for token in statement if token.kind == TokenKind.WORD]
+    lowercase = [token for token in words if token.upper in KEYWORDS and token.text != token.upper]
+    if lowercase:
+        more = f" {len(lowercase)} keywords in this file aren't capitalized in total." if len(lowercase) > 1 else ""
+        yield _finding(
+            "SQL006",
+            lowercase[0],
+            lowercase[0],
+            f"The keyword {lowercase[0].text} isn't capitalized.{more}",
+            "Capitalize the SQL keywords throughout the file.",
+        )
+
+    camel_case = [token for token in words if token.upper not in KEYWORDS and _CAMEL_CASE.search(token.text)]
+    if camel_case:
+        names = ", ".join(dict.fromkeys(token.text for token in camel_case))
+        yield _finding(
+            "SQL006",
+            camel_case[0],
+            camel_case[0],
+            f"These identifiers aren't in snake_case: {names}.",
+            "Rename the identifiers to snake_case.",
+        )
+
+
+SQL_CHECKS = {
+    "SQL002": _check_select_star,
+    "SQL003": _check_cartesian_joins,
+    "SQL006": _check_capitalization,
+}
+
+# The code smells that the checks cover, for the rules they only cover in part, like PYTHON_PARTIAL_CHECKS
+SQL_PARTIAL_CHECKS = {
+    "SQL002": frozenset({"Use of SELECT * in queries"}),
+    "SQL003": frozenset({"JOIN without ON clause"}),
+}
+
+
+def check_sql(source: str, rule_ids: Collection[str]) -> list[Finding]:
+    """Run the checks of the given rules."""
+    statements = split_statements(tokenize(source))
+    findings = []
+    for rule_id, check in SQL_CHECKS.items():
+        if rule_id in rule_ids:
+            findings.extend(check(statements))
+    return findings
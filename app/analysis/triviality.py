@@ -0,0 +1,118 @@
+"""
+Recognizes changes that need little or no review: renames, and edits to whitespace, comments or formatting only.
+
+A file that was only moved, or had its whitespace changed, gets the same findings it got when it was last reviewed, and
+those were posted then. A change to comments or formatting only can still violate the rules about comments and layout,
+so it's reviewed against those rules alone, see rules_for_change. Comparing the file with its previous version is
+cheap, so it's done before any model is called. Python versions are compared by their syntax tree and SQL versions by
+their tokens, which makes formatter output compare equal to the original. Docstrings are part of the syntax tree, so a
+docstring edit is still reviewed in full.
+"""
+
+import ast
+import io
+import tokenize as python_tokenize
+from enum import Enum
+
+from app.analysis.sql_checks import TokenKind, tokenize as sql_tokenize
+from app.models.review_models import ReviewRule, ReviewRuleLanguage
+
+_PYTHON_LAYOUT_TOKENS = {
+    python_tokenize.COMMENT,
+    python_tokenize.NL,
+    python_tokenize.NEWLINE,
+    python_tokenize.INDENT,
+    python_tokenize.DEDENT,
+    python_tokenize.ENCODING,
+    python_tokenize.ENDMARKER,
+}
+
+
+class TrivialChange(str, Enum):
+    RENAME = "renamed without edits"
+    WHITESPACE = "whitespace only"
+    COMMENTS = "comments only"
+    FORMATTING = "formatting only"
+
+
+# Changes that can't violate any rule, they aren't reviewed at all
+SKIPPED_CHANGES = frozenset({TrivialChange.RENAME, TrivialChange.WHITESPACE})
+# The rules about comments and layout, which a change of that kind alone can still violate
+RULES_FOR_CHANGE = {
+    TrivialChange.COMMENTS: frozenset({"PY011"}),
+    TrivialChange.FORMATTING: frozenset({"PY008", "SQL011"}),
+}
+
+
+def _significant_lines(source: str) -> list[str]:
+    """The lines of the source without trailing whitespace, line endings and blank lines."""
+    return [line.rstrip() for line in source.splitlines() if line.strip()]
+
+
+def _line_endings_normalized(source: str) -> str:
+    return source.replace("\r\n", "\n").rstrip("\n")
+
+
+def _python_code_tokens(source: str) -> list[str] | None:
+    try:
+        tokens = python_tokenize.generate_tokens(io.StringIO(source).readline)
+        return [token.string for token in tokens if token.type not in _PYTHON_LAYOUT_TOKENS]
+    except (python_tokenize.TokenError, SyntaxError):
+        return None
+
+
+def _classify_python(source: str, base_source: str) -> TrivialChange | None:
+    try:
+        if ast.dump(ast.parse(source)) != ast.dump(ast.parse(base_source)):
+            return None
+    except (SyntaxError, ValueError):
+        return None
+    if _significant_lines(source) == _significant_lines(base_source):
+        return TrivialChange.WHITESPACE
+    code_tokens = _python_code_tokens(source)
+    if code_tokens is not None and code_tokens == _python_code_tokens(base_source):
+        return TrivialChange.COMMENTS
+    # Same syntax tree, different code tokens: quotes, parentheses or line breaks were changed by a formatter
+    return TrivialChange.FORMATTING
+
+
+def _classify_sql(source: str, base_source: str) -> TrivialChange | None:
+    tokens, base_tokens = sql_tokenize(source), sql_tokenize(base_source)
+
+    def code(token_list):
+        return [token.text for token in token_list if token.kind != TokenKind.COMMENT]
+
+    def comments(token_list):
+        return [token.text for token in token_list if token.kind == TokenKind.COMMENT]
+
+    # Keywords are compared as written, since rules may be about their case
+    if code(tokens) != code(base_tokens):
+        return None
+    if _significant_lines(source) == _significant_lines(base_source):
+        return TrivialChange.WHITESPACE
+    return TrivialChange.FORMATTING if comments(tokens) == comments(base_tokens) else TrivialChange.COMMENTS
+
+
+def classify_change(language: ReviewRuleLanguage, source: str, base_source: str | None) -> TrivialChange | None:
+    """How the change from base_source to source is trivial, or None if it needs a review."""
+    if base_source is None:
+        return None
+    if source == base_source:
+        return TrivialChange.RENAME
+    # Blank lines and trailing spaces can be significant, in a Markdown paragraph or a string literal, so anything
+    # beyond line endings is only ignored where the syntax tree or tokens show it doesn't matter
+    if _line_endings_normalized(source) == _line_endings_normalized(base_source):
+        return TrivialChange.WHITESPACE
+    if language == ReviewRuleLanguage.PYTHON:
+        return _classify_python(source, base_source)
+    if language == ReviewRuleLanguage.SQL:
+        return _classify_sql(source, base_source)
+    return None
+
+
+def rules_for_change(rules: list[ReviewRule], change: TrivialChange | None) -> list[ReviewRule]:
+    """The rules a change can violate: all of them, unless the change is trivial."""
+    if change is None:
+        return rules
+    rule_ids = RULES_FOR_CHANGE.get(change, frozenset())
+    return [rule for rule in rules if rule.id in rule_ids]
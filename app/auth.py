@@ -2,12 +2,17 @@
 Azure DevOps authentication and configuration management.
 """
 
+import hashlib
+import hmac
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
 from functools import lru_cache
-from typing import Optional
+from typing import Any, Literal, Optional
 from urllib.parse import urljoin
 
+import jwt
 import logfire
 from azure.core.credentials import AccessToken
 from azure.identity import EnvironmentCredential
@@ -29,6 +34,134 @@ class AzureDevOpsSettings(BaseSettings):
     AGENT_API_KEY: str = Field(default="", description="API key to authenticate the LLM Agent.")
     LOGFIRE_DEPLOYMENT_ENV: str = Field(default="", description="Deployment environment for observability.")
     JWT_SECRET_STRING: str = Field(default="", description="Secret key for JWT encoding.")
+    BLOB_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024, description="Memory budget in bytes for cached file contents, keyed by git object id."
+    )
+    BLOB_CACHE_DIR: str = Field(
+        default="", description="Directory for the compressed on-disk tier of the blob cache. Disabled when empty."
+    )
+    HTTP_CACHE_MAX_ENTRIES: int = Field(
+        default=256, description="Maximum number of Azure DevOps responses kept for conditional (ETag) requests."
+    )
+    HTTP_CACHE_TTL_SECONDS: float = Field(
+        default=600.0, description="How long a cached Azure DevOps response may be revalidated before refetching it."
+    )
+    JWT_CACHE_MAX_ENTRIES: int = Field(default=1024, description="Maximum number of verified JWTs kept in memory.")
+    JWT_CACHE_TTL_SECONDS: float = Field(
+        default=300.0, description="How long a verified JWT is trusted without verifying it again. Never beyond exp."
+    )
+    ERROR_SUMMARY_WITH_LLM: bool = Field(
+        default=False, description="Let an LLM write the summary in the error comment instead of the fixed template."
+    )
+    RATE_LIMIT_BACKEND: Literal["memory", "sqlite"] = Field(
+        default="memory", description="Where rate limit buckets live. Use sqlite to share them between workers."
+    )
+    RATE_LIMIT_SQLITE_PATH: str = Field(
+        default="rate_limits.sqlite3", description="Database file for the sqlite rate limit backend."
+    )
+    RATE_LIMIT_CHEAP_PER_MINUTE: int = Field(
+        default=60, description="Requests per minute per client for cheap endpoints, like token validation."
+    )
+    RATE_LIMIT_REVIEWS_PER_MINUTE: int = Field(
+        default=5, description="Review triggers per minute per client, unless overridden in RATE_LIMIT_REVIEW_QUOTAS."
+    )
+    RATE_LIMIT_REVIEW_QUOTAS: dict[str, int] = Field(
+        default_factory=dict, description="Review triggers per minute for specific clients, keyed by JWT sub."
+    )
+    REVIEW_MAX_IN_FLIGHT: int = Field(default=4, description="Maximum number of reviews running at the same time.")
+    REVIEW_MAX_QUEUED: int = Field(
+        default=16, description="Maximum number of reviews waiting for a turn. Beyond this new reviews are refused."
+    )
+    LLM_CONCURRENCY_INITIAL: int = Field(
+        default=8, description="Concurrent model requests allowed at startup, adapted to provider feedback after that."
+    )
+    LLM_CONCURRENCY_MIN: int = Field(default=1, description="Lower bound of the adaptive model request concurrency.")
+    LLM_CONCURRENCY_MAX: int = Field(default=64, description="Upper bound of the adaptive model request concurrency.")
+    LLM_INPUT_TOKENS_PER_MINUTE: int = Field(
+        default=0, description="Input tokens per minute per model allowed by the provider. No budget when 0."
+    )
+    LLM_OUTPUT_TOKENS_PER_MINUTE: int = Field(
+        default=0, description="Output tokens per minute per model allowed by the provider. No budget when 0."
+    )
+    LLM_OUTPUT_TOKENS_ESTIMATE: int = Field(
+        default=2048, description="Output tokens reserved for a model request that doesn't set max_tokens."
+    )
+    ROUTING_FAST_MAX_LINES: int = Field(default=60, description="Files up to this many lines may go to the fast model.")
+    ROUTING_FAST_MAX_COMPLEXITY: int = Field(
+        default=12, description="Files with up to this many branching constructs may go to the fast model."
+    )
+    ROUTING_FAST_MAX_DOC_LINES: int = Field(
+        default=400, description="Documentation files up to this many lines go to the fast model."
+    )
+    ROUTING_FAST_CONCURRENCY: int = Field(default=8, description="Maximum concurrent reviews on the fast model.")
+    ROUTING_STRONG_CONCURRENCY: int = Field(default=4, description="Maximum concurrent reviews on the strong model.")
+    REVIEW_CHUNK_MAX_TOKENS: int = Field(
+        default=6000, description="Files larger than this are split into chunks that are reviewed concurrently."
+    )
+    MARKDOWN_SECTION_CACHE_MAX_ENTRIES: int = Field(
+        default=2048, description="Maximum number of reviewed Markdown sections whose outcome is remembered."
+    )
+    SKIP_TRIVIAL_CHANGES: bool = Field(
+        default=True, description="Skip files that were only renamed, or changed in whitespace, comments or formatting."
+    )
+    SMALL_FILE_MAX_TOKENS: int = Field(
+        default=800, description="Files up to this size are reviewed together with other small files of their language."
+    )
+    SMALL_FILE_BATCH_MAX_TOKENS: int = Field(
+        default=4000, description="Maximum size of the files reviewed together in one sub-agent call."
+    )
+    SMALL_FILE_BATCH_MAX_FILES: int = Field(
+        default=8, description="Maximum number of files reviewed together in one sub-agent call."
+    )
+    SMALL_FILE_BATCH_WINDOW_SECONDS: float = Field(
+        default=0.05, description="How long a small file waits for others to be reviewed together with."
+    )
+    RISK_CHURN_MAX_COMMITS: int = Field(
+        default=20,
+        description="Recent commits counted per file for its churn when ranking files by risk. 0 skips the lookups.",
+    )
+    RISK_CHURN_MAX_FILES: int = Field(
+        default=50, description="Only the riskiest files by their other signals get their churn looked up."
+    )
+    RISK_CHURN_CONCURRENCY: int = Field(default=4, description="Maximum concurrent churn lookups when ranking files.")
+    MODEL_POOL_FAST: list[str] = Field(
+        default=["anthropic:claude-haiku-4-5"],
+        description="Models for the fast tier and the coordinator as provider:model, tried in order.",
+    )
+    MODEL_POOL_STRONG: list[str] = Field(
+        default=["anthropic:claude-sonnet-4-5"],
+        description="Models for the strong tier as provider:model, tried in order.",
+    )
+    MODEL_REQUEST_TIMEOUT_SECONDS: float = Field(
+        default=180.0, description="Time a model gets to answer a request before the next model in the pool is tried."
+    )
+    LLM_HTTP_MAX_CONNECTIONS: int = Field(default=32, description="Connections to the model providers in total.")
+    LLM_HTTP_INTERACTIVE_CONNECTIONS: int = Field(
+        default=8, description="Connections kept apart for the coordinator and fast tier, out of the total."
+    )
+    LLM_HTTP_KEEPALIVE_SECONDS: float = Field(default=60.0, description="How long idle provider connections are kept.")
+    LLM_HTTP2: bool = Field(
+        default=False, description="Use HTTP/2 for model providers. Needs the h2 package, e.g. from httpx[http2]."
+    )
+    LLM_HTTP_CONNECT_TIMEOUT_SECONDS: float = Field(default=10.0, description="Timeout to connect to a model provider.")
+    LLM_HTTP_READ_TIMEOUT_SECONDS: float = Field(
+        default=300.0, description="Timeout between bytes received from a model provider, long generations included."
+    )
+    MODEL_HEDGING: bool = Field(
+        default=False,
+        description="Also send a request to the next model in the pool when the first is slower than p95.",
+    )
+    BATCH_BACKEND: Literal["anthropic", "local"] = Field(
+        default="anthropic", description="Message batches API for deferred reviews, or 'local' to run them in-process."
+    )
+    BATCH_MODEL: str = Field(default="claude-sonnet-4-5", description="Model for deferred reviews.")
+    BATCH_MAX_TOKENS: int = Field(default=8192, description="Maximum output tokens per file in a deferred review.")
+    BATCH_POLL_INTERVAL_SECONDS: float = Field(
+        default=60.0, description="How often to check whether a deferred review batch has ended."
+    )
+    DEFER_DRAFT_REVIEWS: bool = Field(
+        default=True, description="Review draft pull requests in deferred mode rather than interactively."
+    )
 
     model_config = SettingsConfigDict(env_prefix="PR_APP_", env_file=".env", extra="ignore")
 
@@ -50,6 +183,73 @@ class CachedToken:
         return time.time() >= (self.token.expires_on - (buffer_minutes * 60))
 
 
+class TokenVerificationCache:
+    """Bounded cache of verified JWT claims, keyed by a digest of the token and the secret it was verified with.
+
+    An entry is trusted for at most ttl_seconds and never beyond the token's own exp claim, so an expired token always
+    ends up at jwt.decode again and is rejected there.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    @staticmethod
+    def digest(token: str, secret_key: str) -> bytes:
+        """Keyed digest, so neither raw tokens nor a secret-independent fingerprint of them are kept in memory."""
+        return hmac.new(secret_key.encode(), token.encode(), hashlib.sha256).digest()
+
+    def get(self, key: bytes) -> dict[str, Any] | None:
+        """Return the verified claims for a token digest, unless missing or past their expiry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, key: bytes, claims: dict[str, Any]) -> None:
+        """Store verified claims, evicting the least recently used entries beyond max_entries."""
+        expires_at = time.time() + self.ttl_seconds
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+@lru_cache(maxsize=1)
+def get_token_verification_cache() -> TokenVerificationCache:
+    """Instantiate the process-wide JWT verification cache or return the existing one."""
+    settings = get_azure_devops_settings()
+    return TokenVerificationCache(
+        max_entries=settings.JWT_CACHE_MAX_ENTRIES, ttl_seconds=settings.JWT_CACHE_TTL_SECONDS
+    )
+
+
+def verify_token(token: str, secret_key: str) -> dict[str, Any]:
+    """
+    Verify an HS256 JWT and return its claims. The signature is checked once per token per process, after that the
+    claims come from the verification cache until the entry expires.
+
+    Raises:
+        jwt.InvalidTokenError: Or one of its subclasses like jwt.ExpiredSignatureError, if the token isn't valid
+    """
+    cache = get_token_verification_cache()
+    key = cache.digest(token, secret_key)
+
+    claims = cache.get(key)
+    if claims is None:
+        claims = jwt.decode(token, secret_key, algorithms=["HS256"])
+        cache.put(key, claims)
+    return claims
+
+
 class AzureDevOpsAuth:
     """Azure DevOps authentication handler using service principal."""
 
@@ -4,30 +4,46 @@ FastAPI dependencies are very powerful but sometimes a little confusing.
 Worth reading up on via https://fastapi.tiangolo.com/tutorial/dependencies/.
 """
 
-from typing import Annotated
+import hashlib
+import math
+from typing import Annotated, Any
 
 import jwt
-from fastapi import HTTPException, Request
+import logfire
+from fastapi import HTTPException, Request, Depends, Response
 from fastapi.params import Header
-from fastapi_throttle import RateLimiter
 
-from app.auth import get_azure_devops_settings
+from app.admission import get_review_admission
+from app.auth import get_azure_devops_settings, verify_token
+from app.rate_limiting import get_token_bucket_backend
 
 
-async def validate_authorization_header(authorization: Annotated[str, Header()]) -> str:
+def _verify_authorization_header(authorization: str) -> dict[str, Any]:
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Authorization bearer token required")
     try:
         secret_key = get_azure_devops_settings().JWT_SECRET_STRING
         token = authorization.removeprefix("Bearer ").strip()
-        _ = jwt.decode(token, secret_key, algorithms=["HS256"])  # Don't need to return it, just need to know it's valid
-        return authorization
+        return verify_token(token, secret_key)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+async def get_token_claims(authorization: Annotated[str, Header()]) -> dict[str, Any]:
+    """The decoded claims of a valid bearer token. FastAPI resolves this once per request, whoever depends on it."""
+    return _verify_authorization_header(authorization)
+
+
+TokenClaims = Annotated[dict[str, Any], Depends(get_token_claims)]
+
+
+async def reserve_review_slot() -> None:
+    """Reserve a place for the review this request starts, or refuse it with a 503 if too many are in progress."""
+    get_review_admission().reserve()
+
+
 def _extract_auth_header(request: Request) -> str:
     auth = request.headers.get("Authorization")
     if auth:
@@ -36,4 +52,59 @@ def _extract_auth_header(request: Request) -> str:
         return "unknown"
 
 
-limiter = RateLimiter(times=5, seconds=60, key_func=_extract_auth_header, add_headers=True)
+def _rate_limit_client_key(request: Request) -> str:
+    """Identify the client by the sub claim of its token, so all of a client's tokens and workers share one quota."""
+    token = _extract_auth_header(request)
+    try:
+        claims = verify_token(token, get_azure_devops_settings().JWT_SECRET_STRING)
+        if claims.get("sub"):
+            return f"sub:{claims['sub']}"
+    except jwt.PyJWTError:
+        pass
+    # Invalid tokens are still limited, by a fingerprint of the token, since validating tokens is exactly what gets abused
+    return f"token:{hashlib.sha256(token.encode()).hexdigest()[:16]}"
+
+
+class RateLimiter:
+    """
+    Per-client token bucket rate limit, stored in the configured backend so that every worker draws from the same bucket.
+
+    The scope separates the buckets of cheap and expensive endpoints: validating a token shouldn't use up a client's
+    review triggers, nor the other way around.
+    """
+
+    def __init__(self, scope: str, times: int, seconds: float, quotas: dict[str, int] | None = None):
+        self.scope = scope
+        self.times = times
+        self.seconds = seconds
+        self.quotas = quotas or {}
+
+    async def __call__(self, request: Request, response: Response) -> None:
+        client_key = _rate_limit_client_key(request)
+        times = (
+            self.quotas.get(client_key.removeprefix("sub:"), self.times)
+            if client_key.startswith("sub:")
+            else self.times
+        )
+
+        retry_after = await get_token_bucket_backend().acquire(
+            f"{self.scope}:{client_key}", cost=1, rate=times / self.seconds, capacity=times
+        )
+        if retry_after > 0:
+            logfire.info("Rate limit exceeded.", scope=self.scope, client=client_key, retry_after=retry_after)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after)), "X-RateLimit-Limit": str(times)},
+            )
+        response.headers["X-RateLimit-Limit"] = str(times)
+
+
+_settings = get_azure_devops_settings()
+cheap_limiter = RateLimiter(scope="cheap", times=_settings.RATE_LIMIT_CHEAP_PER_MINUTE, seconds=60)
+review_limiter = RateLimiter(
+    scope="reviews",
+    times=_settings.RATE_LIMIT_REVIEWS_PER_MINUTE,
+    seconds=60,
+    quotas=_settings.RATE_LIMIT_REVIEW_QUOTAS,
+)
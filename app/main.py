@@ -1,17 +1,33 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from .agents.http_client import close_llm_http_clients
 from .mcp.azure_devops_server import azure_devops_mcp_app
+from .mcp.operations import AZDO_REST_CLIENT
 from app.observability.observability import setup_logfire
 from .routers import webhooks, pull_requests
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """The mounted MCP app needs its own lifespan to run. The shared HTTP clients close on shutdown."""
+    try:
+        async with azure_devops_mcp_app.lifespan(app):
+            yield
+    finally:
+        await close_llm_http_clients()
+        await AZDO_REST_CLIENT.aclose()
+
+
 # Good to extend later to include https://fastapi.tiangolo.com/tutorial/metadata/
 app = FastAPI(
     title="Azure DevOps PRBot",
     description="A FastAPI application to process PR webhooks from Azure Devops.",
     version="0.0.1",  # Would need to make dynamic, but not important now
-    lifespan=azure_devops_mcp_app.lifespan,
+    lifespan=lifespan,
 )
 
 setup_logfire(app)
@@ -1,5 +1,5 @@
 """
-This class is used only by the MCP tools and not by other parts of the app.
+This class is used by the MCP tools and by the plain operations in app/mcp/operations.py, not by other parts of the app.
 
 Choosing not to unit test this class now: Would lead to a lot of mocks. In an enterprise setting I'd go for it because
 of the higher impact of even small issues.
@@ -7,13 +7,56 @@ of the higher impact of even small issues.
 The self.auth methods are bespoke and more vulnerable to issues, so they are tested.
 """
 
-from typing import Any
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
 
 import httpx
 import logfire
 from fastapi import HTTPException
+from pydantic import BaseModel
 
-from app.auth import get_azure_devops_auth, AzureDevOpsAuth
+from app.auth import get_azure_devops_auth, AzureDevOpsAuth, get_azure_devops_settings
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@dataclass
+class CachedResponse:
+    etag: str | None
+    last_modified: str | None
+    model: BaseModel
+    stored_at: float = field(default_factory=time.monotonic)
+
+
+class ConditionalResponseCache:
+    """LRU of validated response models and their validators (ETag/Last-Modified), bounded in entries and age."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        """Return the entry for key, unless there is none or it has outlived the TTL."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> None:
+        """Store or refresh an entry, evicting the least recently used ones beyond max_entries."""
+        entry.stored_at = time.monotonic()
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
 
 
 class AzureDevOpsClient:
@@ -23,6 +66,23 @@ class AzureDevOpsClient:
         self.auth: AzureDevOpsAuth = get_azure_devops_auth()
         self.timeout = 30.0  # No reason yet to make dynamic
         self.api_version = "7.1"  # No reason yet to make dynamic
+        settings = get_azure_devops_settings()
+        self.response_cache = ConditionalResponseCache(
+            max_entries=settings.HTTP_CACHE_MAX_ENTRIES, ttl_seconds=settings.HTTP_CACHE_TTL_SECONDS
+        )
+        self._http_client: httpx.AsyncClient | None = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """One client for all requests, so connections are reused. Opened again after it was closed."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(timeout=self.timeout)
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Close the HTTP client, if it was opened. Called when the app shuts down."""
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
 
     async def make_get_request(self, endpoint: str, extra_params: dict | None = None) -> dict[str, Any]:
         """
@@ -38,39 +98,92 @@ class AzureDevOpsClient:
         Raises:
             HTTPException: Standardized HTTP exceptions for various 40X and 50X error codes
         """
+        response = await self._send_get_request(endpoint, extra_params)
+        return self._parse_body(response)
+
+    async def get_model(self, endpoint: str, model_type: type[M], extra_params: dict | None = None) -> M:
+        """
+        Make a conditional GET request and return the validated response model.
+
+        If an earlier response for the same endpoint and params carried an ETag or Last-Modified header, the request is
+        sent with If-None-Match/If-Modified-Since. A 304 response is then served from the cached, already-validated
+        model, which saves both the response bytes and the validation.
+
+        Args:
+            endpoint: The API endpoint (e.g., "git/repositories")
+            model_type: The Pydantic model to validate the json response with
+            extra_params: additional query parameters to provide to the API endpoint (e,g.,"baseVersion")
+
+        Returns:
+            M: The validated response model
+
+        Raises:
+            HTTPException: Standardized HTTP exceptions for various 40X and 50X error codes
+        """
+        cache_key = (endpoint, model_type.__name__, tuple(sorted((extra_params or {}).items())))
+        cached = self.response_cache.get(cache_key)
+
+        conditional_headers = {}
+        if cached is not None:
+            if cached.etag:
+                conditional_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                conditional_headers["If-Modified-Since"] = cached.last_modified
+
+        response = await self._send_get_request(endpoint, extra_params, conditional_headers)
+        if response.status_code == 304 and cached is not None:
+            logfire.info(f"Serving {endpoint} from the conditional response cache")
+            self.response_cache.put(cache_key, cached)  # A 304 revalidates the entry, so its TTL starts over
+            return cached.model  # type: ignore[return-value]
+
+        model = model_type.model_validate(self._parse_body(response))
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag or last_modified:
+            self.response_cache.put(cache_key, CachedResponse(etag=etag, last_modified=last_modified, model=model))
+        return model
+
+    async def _send_get_request(
+        self, endpoint: str, extra_params: dict | None = None, extra_headers: dict[str, str] | None = None
+    ) -> httpx.Response:
+        """Send a GET request and translate any failure into a standardized HTTPException. Passes 304s through."""
         url = self.auth.build_api_url(endpoint)
-        headers: dict[str, str] = self.auth.get_auth_headers()
+        headers: dict[str, str] = {**self.auth.get_auth_headers(), **(extra_headers or {})}
         default_params = {"api-version": self.api_version}
         params = {**default_params, **extra_params} if extra_params else default_params
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                logfire.info(
-                    f"GET request made by MCP to {endpoint}", url=url, header_keys=headers.keys(), query_params=params
-                )
-                response = await client.get(url, headers=headers, params=params)
+        client = self.http_client
+        try:
+            logfire.info(
+                f"GET request made by MCP to {endpoint}", url=url, header_keys=headers.keys(), query_params=params
+            )
+            response = await client.get(url, headers=headers, params=params)
+            if response.status_code != 304:
                 response.raise_for_status()
-
-                content_type = response.headers.get("content-type", "")
-                if "application/json" in content_type:
-                    return response.json()
-                else:
-                    return {"content": response.text}
-
-            except httpx.HTTPStatusError as e:
-                error_detail = f"Azure DevOps API error ({endpoint}): {e.response.status_code}"
-                if e.response.status_code == 404:
-                    error_detail = f"{endpoint} not found"
-                elif e.response.status_code == 401:
-                    error_detail = "Authentication failed - check service principal credentials"
-                elif e.response.status_code == 403:
-                    error_detail = "Access denied - check service principal permissions"
-
-                raise HTTPException(status_code=e.response.status_code, detail=error_detail)
-            except httpx.TimeoutException:
-                raise HTTPException(status_code=504, detail=f"Azure DevOps API timeout for {endpoint}")
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error with {endpoint}: {str(e)}")
+            return response
+
+        except httpx.HTTPStatusError as e:
+            error_detail = f"Azure DevOps API error ({endpoint}): {e.response.status_code}"
+            if e.response.status_code == 404:
+                error_detail = f"{endpoint} not found"
+            elif e.response.status_code == 401:
+                error_detail = "Authentication failed - check service principal credentials"
+            elif e.response.status_code == 403:
+                error_detail = "Access denied - check service principal permissions"
+
+            raise HTTPException(status_code=e.response.status_code, detail=error_detail)
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail=f"Azure DevOps API timeout for {endpoint}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error with {endpoint}: {str(e)}")
+
+    @staticmethod
+    def _parse_body(response: httpx.Response) -> dict[str, Any]:
+        content_type = response.headers.get("content-type", "")
+        if "application/json" in content_type:
+            return response.json()
+        else:
+            return {"content": response.text}
 
     async def make_post_request(self, endpoint: str, body: dict | None = None) -> dict[str, Any]:
         """
@@ -91,37 +204,37 @@ class AzureDevOpsClient:
         headers["Content-Type"] = "application/json"
         params = {"api-version": self.api_version}
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                logfire.info(
-                    f"POST request made by MCP to {endpoint}",
-                    url=url,
-                    header_keys=headers.keys(),
-                    query_params=params,
-                    body=body,
-                )
-                response = await client.post(url, headers=headers, params=params, json=body)
-                response.raise_for_status()
-
-                content_type = response.headers.get("content-type", "")
-                if "application/json" in content_type:
-                    return response.json()
-                else:
-                    return {"content": response.text}
-
-            except httpx.HTTPStatusError as e:
-                error_detail = f"Azure DevOps API error ({endpoint}): {e.response.status_code}"
-                print(f"Error response: {e.response.text}")
-                if e.response.status_code == 404:
-                    error_detail = f"{endpoint} not found"
-                elif e.response.status_code == 401:
-                    error_detail = "Authentication failed - check service principal credentials"
-                elif e.response.status_code == 403:
-                    error_detail = "Access denied - check service principal permissions"
-
-                raise HTTPException(status_code=e.response.status_code, detail=error_detail)
-
-            except httpx.TimeoutException:
-                raise HTTPException(status_code=504, detail=f"Azure DevOps API timeout for {endpoint}")
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error with {endpoint}: {str(e)}")
+        client = self.http_client
+        try:
+            logfire.info(
+                f"POST request made by MCP to {endpoint}",
+                url=url,
+                header_keys=headers.keys(),
+                query_params=params,
+                body=body,
+            )
+            response = await client.post(url, headers=headers, params=params, json=body)
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "")
+            if "application/json" in content_type:
+                return response.json()
+            else:
+                return {"content": response.text}
+
+        except httpx.HTTPStatusError as e:
+            error_detail = f"Azure DevOps API error ({endpoint}): {e.response.status_code}"
+            print(f"Error response: {e.response.text}")
+            if e.response.status_code == 404:
+                error_detail = f"{endpoint} not found"
+            elif e.response.status_code == 401:
+                error_detail = "Authentication failed - check service principal credentials"
+            elif e.response.status_code == 403:
+                error_detail = "Access denied - check service principal permissions"
+
+            raise HTTPException(status_code=e.response.status_code, detail=error_detail)
+
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail=f"Azure DevOps API timeout for {endpoint}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error with {endpoint}: {str(e)}")
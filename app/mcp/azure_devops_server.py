@@ -1,29 +1,37 @@
 """
 Note that these MCP tools purposefully contain very little logic of their own.
-They just call the underlying APIs with strict input & output model validation. Note that the LLM will make use of
-the docstrings as well as the metadata in the Pydantic models, so it was worth taking extra effort detailing that out.
+They just call the underlying APIs (through app/mcp/operations.py) with strict input & output model validation.
+Note that the LLM will make use of the docstrings as well as the metadata in the Pydantic models, so it was worth taking
+extra effort detailing that out.
 
 The amount of incorrect MCP tool calls made by the coordinator agent notably decreased after adding extra descriptions
 to Pydantic models and more inline return specification in the docstrings here.
 
+The tools return the lean models from app/models/azure_devops/lean_models.py rather than the full API models. Every byte
+returned here ends up in the coordinator's context, on every turn that follows.
+
 
 """
 
 from fastmcp import FastMCP
 
-from app.mcp import AzureDevOpsClient
-from app.models.azure_devops.base_models import GitRepositoryListResponse
-from app.models.azure_devops.comment_thread_models import Comment, CommentThreadContext, GitPullRequestCommentThread
-from app.models.azure_devops.enums import GitVersionType, CommentThreadStatus
-from app.models.azure_devops.git_models import GitCommitDiffs, GitItem
-from app.models.azure_devops.pull_request_models import GitPullRequest
+from app.analysis.risk import rank_changes
+from app.mcp import operations
+from app.models.azure_devops.comment_thread_models import Comment, CommentThreadContext
+from app.models.azure_devops.enums import GitVersionType
+from app.models.azure_devops.lean_models import (
+    CommentThreadSummary,
+    DiffSummary,
+    FileContent,
+    PullRequestSummary,
+    RepositoryList,
+)
 
 AZDO_MCP = FastMCP("Azure DevOps Tools")
-AZDO_REST_CLIENT = AzureDevOpsClient()
 
 
 @AZDO_MCP.tool
-async def repo_get_pull_request_by_id(pull_request_id: int) -> GitPullRequest:
+async def repo_get_pull_request_by_id(pull_request_id: int) -> PullRequestSummary:
     """
     Get information about a pull request by its ID from Azure DevOps.
 
@@ -31,47 +39,37 @@ async def repo_get_pull_request_by_id(pull_request_id: int) -> GitPullRequest:
         pull_request_id: The ID of the pull request to retrieve
 
     Returns:
-        GitPullRequest. Complete pull request model with fields from the Azure DevOps API, i.e.:
-        - pullRequestId, status, title, description
-        - source and target branch ref information
-        - createdBy, creationDate, sourceRefName, targetRefName
-        - repository, reviewers, commits, mergeStatus
-        - completion options, labels, and other metadata
+        PullRequestSummary. The pull request fields needed for a review:
+        - pull_request_id, title, status, is_draft
+        - repository_id, repository_name
+        - source_ref_name, target_ref_name: source and target branch refs
 
     Raises:
         HTTPException: If the Azure DevOps API GET request fails
     """
-    endpoint = f"git/pullrequests/{pull_request_id}"
-
-    body = await AZDO_REST_CLIENT.make_get_request(endpoint)
-    return GitPullRequest.model_validate(body)
+    pull_request = await operations.get_pull_request(pull_request_id)
+    return PullRequestSummary.from_pull_request(pull_request)
 
 
 @AZDO_MCP.tool
-async def list_repos() -> GitRepositoryListResponse:
+async def list_repos() -> RepositoryList:
     """
     List all repositories from the authenticated Azure DevOps project.
     The make_get_request() method is already authenticated against the Azure DevOps Project.
 
     Returns:
-        GitRepositoryListResponse. Complete list of GitRepository model objects with fields from the Azure DevOps API, i.e.:
-        - count: Total number of repositories
-        - value: List of GitRepository objects with fields like:
-          - id, name, url, defaultBranch, size
-          - project information, remoteUrl, webUrl
-          - repository state and maintenance flags
+        RepositoryList. The repositories in the project, each with:
+        - id, name, default_branch
 
     Raises:
         HTTPException: If the Azure DevOps API GET request fails
     """
-    endpoint = "git/repositories"
-
-    body = await AZDO_REST_CLIENT.make_get_request(endpoint)
-    return GitRepositoryListResponse.model_validate(body)
+    repositories = await operations.list_repositories()
+    return RepositoryList.from_response(repositories)
 
 
 @AZDO_MCP.tool
-async def get_diffs(repository_id: str, base_version: str, target_version: str) -> GitCommitDiffs:
+async def get_diffs(repository_id: str, base_version: str, target_version: str) -> DiffSummary:
     """
     Get diffs between two versions in a Git repository.
 
@@ -81,31 +79,30 @@ async def get_diffs(repository_id: str, base_version: str, target_version: str)
         target_version: Target version (branch name)
 
     Returns:
-        GitCommitDiffs. Differences between the versions containing:
-        - aheadCount, behindCount: Commit count differences
-        - changeCounts: Summary of change types (Add, Edit, Delete, etc.)
-        - changes: Detailed list of file changes following the GitChangesChange model with change types and items
-        - commonCommit: Common ancestor commit ID
-        - baseCommit, targetCommit: Optional commit identifiers
+        DiffSummary. Differences between the versions containing:
+        - base_commit, target_commit: Optional commit identifiers
+        - all_changes_included: Whether the list of changes is complete
+        - changes: The changed files (folders are left out), the riskiest first, each with:
+          - path, change_type (add, edit, delete, rename, ...)
+          - object_id: Git object ID of the file in the target version
+          - original_object_id: Git object ID of the file in the base version, for edited files
 
     Raises:
         HTTPException: If the Azure DevOps API GET request fails
     """
-    endpoint = f"git/repositories/{repository_id}/diffs/commits"
-    params = {
-        # "api-version": AZDO_REST_CLIENT.api_version,
-        "baseVersion": base_version,
-        "targetVersion": target_version,
-    }
-
-    body = await AZDO_REST_CLIENT.make_get_request(endpoint, params)
-    return GitCommitDiffs.model_validate(body)
+    diffs = await operations.get_diffs(repository_id, base_version, target_version)
+    return await rank_changes(repository_id, base_version, DiffSummary.from_diffs(diffs))
 
 
 @AZDO_MCP.tool
 async def get_item(
-    repository_id: str, path: str, version: str, version_type: GitVersionType, include_content: bool = True
-) -> GitItem:
+    repository_id: str,
+    path: str,
+    version: str,
+    version_type: GitVersionType,
+    include_content: bool = True,
+    object_id: str | None = None,
+) -> FileContent:
     """
     Get a single item (file or folder) from a Git repository.
 
@@ -115,33 +112,20 @@ async def get_item(
         version: Version specifier (commit SHA, branch name, or tag)
         version_type: Version type (commit, branch, tag)
         include_content: Whether to include file content in the response (default: True)
+        object_id: The object_id of the item as listed in the diffs. Always provide it when you have it, it allows the
+            content to be served from cache.
 
     Returns:
-        GitItem. Item information containing:
-        - objectId: Git object identifier
-        - gitObjectType: Object type (blob, tree, commit)
-        - commitId: Commit SHA where this item exists
+        FileContent. Item information containing:
         - path: Item path
-        - content: File content (if includeContent=true and item is a file)
-        - url: API resource URL
-        - isFolder: Whether the item is a folder
-        - size: Size of the item in bytes
+        - object_id: Git object identifier
+        - content: File content (if include_content=true and item is a file)
 
     Raises:
         HTTPException: If the Azure DevOps API GET request fails
     """
-    endpoint = f"git/repositories/{repository_id}/items"
-    params = {
-        "path": path,
-        "versionDescriptor.version": version,
-        "versionDescriptor.versionType": version_type.value,
-        "includeContent": str(include_content).lower(),
-    }
-
-    body = await AZDO_REST_CLIENT.make_get_request(endpoint, params)
-    retrieved_item = GitItem.model_validate(body)
-
-    return retrieved_item
+    item = await operations.get_item(repository_id, path, version, version_type, include_content, object_id)
+    return FileContent.from_item(item)
 
 
 # Left PR context and status in the code but commented out for now. A future extension would almost certainly need them!
@@ -153,7 +137,7 @@ async def create_pull_request_thread(
     thread_context: CommentThreadContext | None = None,
     # pull_request_thread_context: GitPullRequestCommentThreadContext | None = None
     # status: CommentThreadStatus | None = None,
-) -> GitPullRequestCommentThread:
+) -> CommentThreadSummary:
     """
     Create a new comment thread on a pull request.
 
@@ -170,35 +154,16 @@ async def create_pull_request_thread(
                    Relevant Fields: changeTrackingId, iterationContext, trackingCriteria
 
     Returns:
-        GitPullRequestCommentThread: Created comment thread with populated fields including:
+        CommentThreadSummary: Confirmation of the created comment thread:
         - id: Thread identifier
-        - publishedDate, lastUpdatedDate: Timestamp information
-        - comments: List of comments in the thread
-        # - status: Thread status
-        - threadContext: File location context (if applicable)
-        - pullRequestThreadContext: Iteration context (if applicable)
+        - file_path: File the thread is anchored to (if applicable)
 
     Raises:
         HTTPException: If the Azure DevOps API POST request fails
     """
-    endpoint = f"git/repositories/{repository_id}/pullrequests/{pull_request_id}/threads"
-
-    request_body = {
-        "comments": [comment.model_dump(by_alias=True, exclude_none=True) for comment in comments],
-        "status": CommentThreadStatus.ACTIVE.value,
-    }
-
-    # if status is not None:
-    #     request_body["status"] = status.value
-
-    if thread_context is not None:
-        request_body["threadContext"] = thread_context.model_dump(by_alias=True, exclude_none=True)
-
-    # if pull_request_thread_context is not None:
-    #     request_body["pullRequestThreadContext"] = pull_request_thread_context.model_dump(by_alias=True, exclude_none=True)
-
-    body = await AZDO_REST_CLIENT.make_post_request(endpoint, request_body)
-    return GitPullRequestCommentThread.model_validate(body)
+    # Status and pull_request_thread_context would be passed on here once the tool exposes them.
+    thread = await operations.create_thread(repository_id, pull_request_id, comments, thread_context)
+    return CommentThreadSummary.from_thread(thread)
 
 
 azure_devops_mcp_app = AZDO_MCP.http_app(path="/azure-devops")
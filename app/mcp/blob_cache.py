@@ -0,0 +1,113 @@
+"""
+Process-wide cache of file contents keyed by git object id.
+
+Git blobs are content-addressed and therefore immutable, so a cached blob never needs invalidating. The same blob
+tends to come by again and again: shared config files, vendored code, files touched by stacked or rebased PRs.
+
+The in-memory tier is an LRU bounded by the total size of the contents it holds. The optional on-disk tier keeps
+zlib-compressed blobs around across restarts and in between workers sharing a volume.
+"""
+
+import os
+import re
+import tempfile
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+import logfire
+
+from app.auth import get_azure_devops_settings
+
+# SHA-1 object ids, with room for SHA-256 repositories. Doubles as protection against path traversal on disk.
+_OBJECT_ID_PATTERN = re.compile(r"^[0-9a-f]{40}([0-9a-f]{24})?$")
+
+
+class BlobContentCache:
+    """Byte-size-bounded LRU of blob contents with an optional compressed on-disk tier."""
+
+    def __init__(self, max_bytes: int, disk_dir: Path | None = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self.current_bytes = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, object_id: str) -> str | None:
+        """Return the content of a blob, or None if we haven't seen it before."""
+        object_id = object_id.lower()
+        if object_id in self._entries:
+            self._entries.move_to_end(object_id)
+            return self._entries[object_id]
+
+        content = self._read_from_disk(object_id)
+        if content is not None:
+            self._store_in_memory(object_id, content)
+        return content
+
+    def put(self, object_id: str, content: str) -> None:
+        """Remember the content of a blob. Ids that don't look like a git object id are ignored."""
+        object_id = object_id.lower()
+        if not _OBJECT_ID_PATTERN.match(object_id):
+            return
+
+        self._store_in_memory(object_id, content)
+        self._write_to_disk(object_id, content)
+
+    def _store_in_memory(self, object_id: str, content: str) -> None:
+        size = len(content.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        if object_id in self._entries:
+            self._entries.move_to_end(object_id)
+            return
+
+        self._entries[object_id] = content
+        self._sizes[object_id] = size
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            evicted_id, _ = self._entries.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(evicted_id)
+
+    def _disk_path(self, object_id: str) -> Path | None:
+        if self.disk_dir is None or not _OBJECT_ID_PATTERN.match(object_id):
+            return None
+        # Fan out like git does, to keep directory listings manageable
+        return self.disk_dir.joinpath(object_id[:2], object_id[2:])
+
+    def _read_from_disk(self, object_id: str) -> str | None:
+        path = self._disk_path(object_id)
+        if path is None or not path.exists():
+            return None
+        try:
+            return zlib.decompress(path.read_bytes()).decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            logfire.warning("Ignoring unreadable blob cache entry.", object_id=object_id, error=str(e))
+            return None
+
+    def _write_to_disk(self, object_id: str, content: str) -> None:
+        path = self._disk_path(object_id)
+        if path is None or path.exists():
+            return
+        try:
+            path.parent.mkdir(exist_ok=True)
+            # Write-then-rename, so concurrent workers never read a half-written blob
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp_file:
+                tmp_file.write(zlib.compress(content.encode("utf-8")))
+            os.replace(tmp_file.name, path)
+        except OSError as e:
+            logfire.warning("Failed to write blob cache entry to disk.", object_id=object_id, error=str(e))
+
+
+@lru_cache(maxsize=1)
+def get_blob_cache() -> BlobContentCache:
+    """Instantiate the process-wide blob cache or return the existing one."""
+    settings = get_azure_devops_settings()
+    disk_dir = Path(settings.BLOB_CACHE_DIR) if settings.BLOB_CACHE_DIR else None
+    return BlobContentCache(max_bytes=settings.BLOB_CACHE_MAX_BYTES, disk_dir=disk_dir)
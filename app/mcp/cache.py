@@ -0,0 +1,104 @@
+"""
+Request-scoped read-through cache for Azure DevOps reads.
+
+A single review tends to fetch the same pull request, repository list or item more than once. Every review opens a
+scope with its own cache. Reads made within that scope are memoized on endpoint and params, and identical reads that
+are in flight at the same time share one REST call (single-flight). The cache is dropped when the scope closes, so
+nothing outlives the review that produced it.
+
+The coordinator reaches the MCP tools over HTTP, which means the scope can't travel along in a context variable.
+The review id is therefore also sent as a header on every MCP call and looked up again on the server side.
+"""
+
+import asyncio
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+import logfire
+from fastmcp.server.dependencies import get_http_headers
+
+from app.analysis.positions import LineIndex
+
+T = TypeVar("T")
+
+REVIEW_ID_HEADER = "X-Review-Id"
+
+_current_review_id: ContextVar[str | None] = ContextVar("current_review_id", default=None)
+_review_caches: dict[str, "ReviewReadCache"] = {}
+
+
+class ReviewReadCache:
+    """Memoizes awaitable reads by key and deduplicates identical reads that are in flight concurrently."""
+
+    def __init__(self):
+        self._entries: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        # Of every file read in this review, by path, for create_thread to repair comment positions with. A path read
+        # at two different versions maps to None, since it's unknown which version a comment is about.
+        self.line_indexes: dict[str, LineIndex | None] = {}
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        """Return the cached result for key, or run fetch once and share its result with every concurrent caller."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = asyncio.ensure_future(fetch())
+            entry.add_done_callback(lambda done: self._forget_failure(key, done))
+            self._entries[key] = entry
+        else:
+            self.hits += 1
+
+        # Shielded so a caller that gets cancelled doesn't cancel the read for everybody else waiting on it.
+        return await asyncio.shield(entry)
+
+    def remember_lines(self, path: str, content: str) -> None:
+        """Index the lines of a file that was read, see app/analysis/positions.py."""
+        path = "/" + path.lstrip("/")
+        if path not in self.line_indexes:
+            self.line_indexes[path] = LineIndex(content)
+            return
+        line_index = self.line_indexes[path]
+        if line_index is not None and line_index.content != content:
+            self.line_indexes[path] = None
+
+    def _forget_failure(self, key: Hashable, entry: asyncio.Future) -> None:
+        """Errors aren't cached: the next caller gets to try again."""
+        if (entry.cancelled() or entry.exception() is not None) and self._entries.get(key) is entry:
+            del self._entries[key]
+
+
+@asynccontextmanager
+async def review_cache_scope() -> AsyncIterator[str]:
+    """Open a cache for the duration of one review. Yields the review id to pass along in the REVIEW_ID_HEADER."""
+    review_id = uuid.uuid4().hex
+    cache = ReviewReadCache()
+    _review_caches[review_id] = cache
+    token = _current_review_id.set(review_id)
+    try:
+        yield review_id
+    finally:
+        _current_review_id.reset(token)
+        _review_caches.pop(review_id, None)
+        logfire.info("Discarded review read cache.", review_id=review_id, hits=cache.hits, misses=cache.misses)
+
+
+def get_active_review_cache() -> ReviewReadCache | None:
+    """Find the cache of the review we're running in, either in-process or via the header of the MCP call."""
+    review_id = _current_review_id.get() or get_http_headers().get(REVIEW_ID_HEADER.lower())
+    if review_id is None:
+        return None
+    return _review_caches.get(review_id)
+
+
+async def cached_read(endpoint: str, params: dict[str, Any] | None, fetch: Callable[[], Awaitable[T]]) -> T:
+    """Read through the active review cache, keyed on endpoint and params. Outside a review this just calls fetch."""
+    cache = get_active_review_cache()
+    if cache is None:
+        return await fetch()
+
+    key = (endpoint, tuple(sorted((params or {}).items())))
+    return await cache.get_or_fetch(key, fetch)
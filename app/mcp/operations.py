@@ -0,0 +1,185 @@
+"""
+Plain async functions around the Azure DevOps REST API, returning validated models.
+
+The MCP tools delegate to these, but they are equally usable from code paths that should not pay for an LLM round-trip
+and an MCP loopback call, like posting the error comment when a review fails.
+
+Reads go through the per-review cache in app/mcp/cache.py, writes never do.
+"""
+
+from app.mcp import AzureDevOpsClient
+from app.mcp.blob_cache import get_blob_cache
+from app.mcp.cache import cached_read, get_active_review_cache
+from app.models.azure_devops.base_models import GitRepositoryListResponse
+from app.models.azure_devops.comment_thread_models import (
+    Comment,
+    CommentPosition,
+    CommentThreadContext,
+    GitPullRequestCommentThread,
+)
+from app.models.azure_devops.enums import CommentThreadStatus, GitVersionType
+from app.models.azure_devops.git_models import GitCommitDiffs, GitItem
+from app.models.azure_devops.pull_request_models import GitPullRequest
+
+AZDO_REST_CLIENT = AzureDevOpsClient()
+
+
+async def get_pull_request(pull_request_id: int) -> GitPullRequest:
+    """Retrieve a pull request by its ID."""
+    endpoint = f"git/pullrequests/{pull_request_id}"
+
+    async def fetch() -> GitPullRequest:
+        return await AZDO_REST_CLIENT.get_model(endpoint, GitPullRequest)
+
+    return await cached_read(endpoint, None, fetch)
+
+
+async def list_repositories() -> GitRepositoryListResponse:
+    """List all repositories in the project."""
+    endpoint = "git/repositories"
+
+    async def fetch() -> GitRepositoryListResponse:
+        return await AZDO_REST_CLIENT.get_model(endpoint, GitRepositoryListResponse)
+
+    return await cached_read(endpoint, None, fetch)
+
+
+async def get_diffs(repository_id: str, base_version: str, target_version: str) -> GitCommitDiffs:
+    """Retrieve the diffs between two versions of a repository."""
+    endpoint = f"git/repositories/{repository_id}/diffs/commits"
+    params = {"baseVersion": base_version, "targetVersion": target_version}
+
+    async def fetch() -> GitCommitDiffs:
+        body = await AZDO_REST_CLIENT.make_get_request(endpoint, params)
+        return GitCommitDiffs.model_validate(body)
+
+    return await cached_read(endpoint, params, fetch)
+
+
+async def get_item(
+    repository_id: str,
+    path: str,
+    version: str,
+    version_type: GitVersionType,
+    include_content: bool = True,
+    object_id: str | None = None,
+) -> GitItem:
+    """
+    Retrieve a single item (file or folder) at a given version.
+
+    When the object id of the item is already known, e.g. from a diff, its content can be served from the blob cache
+    without calling the items API at all.
+    """
+    blob_cache = get_blob_cache()
+    if include_content and object_id:
+        content = blob_cache.get(object_id)
+        if content is not None:
+            _remember_lines(path, content)
+            return GitItem(
+                objectId=object_id,
+                gitObjectType="blob",
+                path=path,
+                content=content,
+                isFolder=False,
+                size=len(content.encode("utf-8")),
+            )
+
+    endpoint = f"git/repositories/{repository_id}/items"
+    params = {
+        "path": path,
+        "versionDescriptor.version": version,
+        "versionDescriptor.versionType": version_type.value,
+        "includeContent": str(include_content).lower(),
+    }
+
+    async def fetch() -> GitItem:
+        body = await AZDO_REST_CLIENT.make_get_request(endpoint, params)
+        return GitItem.model_validate(body)
+
+    item = await cached_read(endpoint, params, fetch)
+    if item.object_id and item.content is not None and not item.is_folder:
+        blob_cache.put(item.object_id, item.content)
+        _remember_lines(path, item.content)
+    return item
+
+
+def _remember_lines(path: str, content: str) -> None:
+    cache = get_active_review_cache()
+    if cache is not None:
+        cache.remember_lines(path, content)
+
+
+def _repaired_context(thread_context: CommentThreadContext) -> CommentThreadContext:
+    """
+    The thread context with its position in the file made valid, if the file was read during the review.
+
+    Azure DevOps answers a position outside the file with a 400, so a miscounted line would cost a retry.
+    """
+    cache = get_active_review_cache()
+    line_index = cache.line_indexes.get(thread_context.file_path) if cache is not None else None
+    start, end = thread_context.right_file_start, thread_context.right_file_end
+    if line_index is None or start is None:
+        return thread_context
+    span = line_index.repair(start.line, start.offset, end.line if end else None, end.offset if end else None)
+    return thread_context.model_copy(
+        update={
+            "right_file_start": CommentPosition(line=span.start_line, offset=span.start_offset),
+            "right_file_end": CommentPosition(line=span.end_line, offset=span.end_offset),
+        }
+    )
+
+
+async def get_commit_count(repository_id: str, path: str, version: str, top: int) -> int:
+    """Count the commits that touched a file on a branch, up to top of them."""
+    endpoint = f"git/repositories/{repository_id}/commits"
+    params = {
+        "searchCriteria.itemPath": path,
+        "searchCriteria.itemVersion.version": version,
+        "searchCriteria.$top": top,
+    }
+
+    async def fetch() -> int:
+        body = await AZDO_REST_CLIENT.make_get_request(endpoint, params)
+        return len(body.get("value", []))
+
+    return await cached_read(endpoint, params, fetch)
+
+
+async def get_blob_content(repository_id: str, object_id: str) -> str:
+    """Retrieve the content of a file by its git object id, e.g. the version of a file before a change."""
+    blob_cache = get_blob_cache()
+    content = blob_cache.get(object_id)
+    if content is not None:
+        return content
+
+    endpoint = f"git/repositories/{repository_id}/blobs/{object_id}"
+    params = {"$format": "text"}
+
+    async def fetch() -> str:
+        body = await AZDO_REST_CLIENT.make_get_request(endpoint, params)
+        return body["content"]
+
+    content = await cached_read(endpoint, params, fetch)
+    blob_cache.put(object_id, content)
+    return content
+
+
+async def create_thread(
+    repository_id: str,
+    pull_request_id: int,
+    comments: list[Comment],
+    thread_context: CommentThreadContext | None = None,
+) -> GitPullRequestCommentThread:
+    """Create an active comment thread on a pull request, optionally anchored to a position in a file."""
+    endpoint = f"git/repositories/{repository_id}/pullrequests/{pull_request_id}/threads"
+
+    request_body = {
+        "comments": [comment.model_dump(by_alias=True, exclude_none=True) for comment in comments],
+        "status": CommentThreadStatus.ACTIVE.value,
+    }
+
+    if thread_context is not None:
+        request_body["threadContext"] = _repaired_context(thread_context).model_dump(by_alias=True, exclude_none=True)
+
+    body = await AZDO_REST_CLIENT.make_post_request(endpoint, request_body)
+    return GitPullRequestCommentThread.model_validate(body)
@@ -189,6 +189,9 @@ class GitItem(BaseModel):
     url: Optional[str] = Field(default=None, description="URL to retrieve the item.")
     # Additional fields for Items Get API
     object_id: Optional[str] = Field(default=None, alias="objectId", description="ID of the Git object.")
+    original_object_id: Optional[str] = Field(
+        default=None, alias="originalObjectId", description="ID of the Git object in the base version of a diff."
+    )
     content: Optional[str] = Field(default=None, description="Content of the item.")
     is_folder: Optional[bool] = Field(default=None, alias="isFolder", description="True if the item is a folder.")
     size: Optional[int] = Field(default=None, description="Size of the item in bytes.")
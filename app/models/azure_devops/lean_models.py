@@ -0,0 +1,139 @@
+"""
+Lean projections of the Azure DevOps models, returned by the MCP tools.
+
+Whatever an MCP tool returns is serialized into the coordinator's context and paid for on every following turn. The full
+models mirror the REST API including identities, links and completion options, none of which the review workflow needs.
+These models keep only what the workflow does use. They are built from the full models rather than validated from API
+responses, which is why they don't carry camelCase aliases.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from .base_models import GitRepositoryListResponse
+from .comment_thread_models import GitPullRequestCommentThread
+from .git_models import GitCommitDiffs, GitItem
+from .pull_request_models import GitPullRequest
+
+
+class PullRequestSummary(BaseModel):
+    """The parts of a pull request needed to review it."""
+
+    pull_request_id: int = Field(description="Unique ID of the pull request.")
+    title: str = Field(description="Title of the pull request.")
+    status: str = Field(description="Current status of the pull request.")
+    is_draft: Optional[bool] = Field(default=None, description="True if the pull request is a draft.")
+    repository_id: str = Field(description="ID of the repository the pull request belongs to.")
+    repository_name: str = Field(description="Name of the repository the pull request belongs to.")
+    source_ref_name: str = Field(description="Source branch of the pull request, e.g. refs/heads/feature/x.")
+    target_ref_name: str = Field(description="Target branch of the pull request, e.g. refs/heads/main.")
+
+    @classmethod
+    def from_pull_request(cls, pull_request: GitPullRequest) -> "PullRequestSummary":
+        """Project a full pull request onto its summary."""
+        return cls(
+            pull_request_id=pull_request.pull_request_id,
+            title=pull_request.title,
+            status=str(pull_request.status),
+            is_draft=pull_request.is_draft,
+            repository_id=str(pull_request.repository.id),
+            repository_name=pull_request.repository.name,
+            source_ref_name=pull_request.source_ref_name,
+            target_ref_name=pull_request.target_ref_name,
+        )
+
+
+class RepositorySummary(BaseModel):
+    """The identifying parts of a repository."""
+
+    id: str = Field(description="The repository ID.")
+    name: str = Field(description="The name of the repository.")
+    default_branch: Optional[str] = Field(default=None, description="The default branch of the repository.")
+
+
+class RepositoryList(BaseModel):
+    """List of repositories in the project."""
+
+    repositories: List[RepositorySummary] = Field(description="The repositories in the project.")
+
+    @classmethod
+    def from_response(cls, response: GitRepositoryListResponse) -> "RepositoryList":
+        """Project a full repository list response onto its summary."""
+        return cls(
+            repositories=[
+                RepositorySummary(id=str(repository.id), name=repository.name, default_branch=repository.default_branch)
+                for repository in response.value
+            ]
+        )
+
+
+class ChangedFile(BaseModel):
+    """A file changed between two versions."""
+
+    path: str = Field(description="Path of the file in the repository.")
+    change_type: str = Field(description="Type of change made to the file, e.g. add, edit, delete, rename.")
+    object_id: Optional[str] = Field(default=None, description="Git object ID of the file in the target version.")
+    original_object_id: Optional[str] = Field(
+        default=None, description="Git object ID of the file in the base version, for edited files."
+    )
+
+
+class DiffSummary(BaseModel):
+    """The files changed between two versions. Folders are left out."""
+
+    base_commit: Optional[str] = Field(default=None, description="The base commit ID.")
+    target_commit: Optional[str] = Field(default=None, description="The target commit ID.")
+    all_changes_included: Optional[bool] = Field(
+        default=None, description="True if all changes are included in this response."
+    )
+    changes: List[ChangedFile] = Field(description="The changed files.")
+
+    @classmethod
+    def from_diffs(cls, diffs: GitCommitDiffs) -> "DiffSummary":
+        """Project full commit diffs onto the changed files."""
+        changes = [
+            ChangedFile(
+                path=change.item.path,
+                change_type=str(change.change_type),
+                object_id=change.item.object_id,
+                original_object_id=change.item.original_object_id,
+            )
+            for change in diffs.changes
+            if change.item is not None
+            and change.item.path is not None
+            and not change.item.is_folder
+            and change.item.git_object_type != "tree"
+        ]
+        return cls(
+            base_commit=diffs.base_commit,
+            target_commit=diffs.target_commit,
+            all_changes_included=diffs.all_changes_included,
+            changes=changes,
+        )
+
+
+class FileContent(BaseModel):
+    """The content of a file at a given version."""
+
+    path: Optional[str] = Field(default=None, description="Path of the file in the repository.")
+    object_id: Optional[str] = Field(default=None, description="Git object ID of the file.")
+    content: Optional[str] = Field(default=None, description="Content of the file.")
+
+    @classmethod
+    def from_item(cls, item: GitItem) -> "FileContent":
+        """Project a full git item onto its content."""
+        return cls(path=item.path, object_id=item.object_id, content=item.content)
+
+
+class CommentThreadSummary(BaseModel):
+    """Confirmation of a created comment thread."""
+
+    id: Optional[int] = Field(default=None, description="The comment thread id.")
+    file_path: Optional[str] = Field(default=None, description="The file the thread is anchored to, if any.")
+
+    @classmethod
+    def from_thread(cls, thread: GitPullRequestCommentThread) -> "CommentThreadSummary":
+        """Project a full comment thread onto its confirmation."""
+        file_path = thread.thread_context.file_path if thread.thread_context else None
+        return cls(id=thread.id, file_path=file_path)
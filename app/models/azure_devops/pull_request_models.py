@@ -193,3 +193,23 @@ class AzureDevOpsWebhookEvent(BaseModel):
         populate_by_name=True,
         use_enum_values=True,
     )
+
+
+class WebhookResourceRef(BaseModel):
+    """The part of the webhook resource needed to route an event, the pull request ID."""
+
+    pull_request_id: int = Field(alias="pullRequestId", description="Unique ID of the pull request.")
+
+
+class WebhookEventEnvelope(BaseModel):
+    """Just enough of an Azure DevOps webhook event to route and deduplicate it.
+
+    Validating the full AzureDevOpsWebhookEvent means validating the entire pull request resource tree, including
+    identities, commits and links, on the request path. This envelope leaves all of that to the background worker.
+    """
+
+    id: UUID = Field(description="Unique ID of the webhook event.")
+    event_type: str = Field(alias="eventType", description="Type of event that triggered the webhook.")
+    resource: WebhookResourceRef = Field(description="Pull request resource associated with the event.")
+
+    model_config = ConfigDict(populate_by_name=True)
@@ -57,9 +57,82 @@ class ReviewOutcomeItem(BaseModel):
     review_comment: Optional[ReviewComment] = Field(default=None, alias="reviewComment", description="Review comment.")
 
 
+class CompactFinding(BaseModel):
+    """
+    A rule violation as the reviewers write it: short keys, and of the rule only its id.
+
+    Output tokens are the most expensive and slowest part of a review. The rule's title and severity and the file path
+    are known already, expand fills them in to make the full ReviewOutcomeItem.
+    """
+
+    rule_id: str = Field(
+        alias="r",
+        description='Id of the violated rule, "GENERIC" for a generic comment or "DECLINED" to stop reviewing.',
+    )
+    start_line: int = Field(ge=1, alias="sl", description="Start line number of the violation.")
+    start_offset: int = Field(ge=1, alias="so", description="Start offset of the violation.")
+    end_line: int = Field(ge=1, alias="el", description="End line number of the violation.")
+    end_offset: int = Field(ge=1, alias="eo", description="End offset of the violation.")
+    problem_description: str = Field(alias="p", max_length=400, description="What is wrong with the code")
+    expected_fix: Optional[str] = Field(
+        default=None, alias="x", max_length=400, description="What type of fix is expected"
+    )
+
+    def expand(self, file_path: str, rules_by_id: dict[str, ReviewRule]) -> ReviewOutcomeItem:
+        """The full outcome item, with the rule's title and severity from the rules the file was reviewed with."""
+        rule = rules_by_id.get(self.rule_id)
+        if self.rule_id == ReviewRuleSeverity.DECLINED.name:
+            rule_level = ReviewRuleSeverity.DECLINED
+        elif rule is None:
+            # Includes ids the reviewer made up, which can't be attributed to a rule
+            rule_level = ReviewRuleSeverity.GENERIC
+        else:
+            rule_level = rule.severity
+        return ReviewOutcomeItem(
+            filePath=file_path,
+            startLine=self.start_line,
+            startOffset=self.start_offset,
+            endLine=self.end_line,
+            endOffset=self.end_offset,
+            reviewComment=ReviewComment(
+                ruleLevel=rule_level,
+                ruleTitle=rule.title if rule else None,
+                ruleId=rule.id if rule else None,
+                problemDescription=self.problem_description,
+                expectedFix=self.expected_fix,
+            ),
+        )
+
+    @staticmethod
+    def expand_all(
+        findings: list["CompactFinding"] | None, file_path: str, rules: list[ReviewRule]
+    ) -> list[ReviewOutcomeItem] | None:
+        """Expand the reviewer's findings for a file, keeping its convention of None for no issues."""
+        rules_by_id = {rule.id: rule for rule in rules}
+        return [finding.expand(file_path, rules_by_id) for finding in findings or []] or None
+
+
+class FileReviewOutcome(BaseModel):
+    file_path: str = Field(alias="f", description="File path of the reviewed file, exactly as it was given.")
+    findings: Optional[list[CompactFinding]] = Field(
+        default=None, alias="o", description="Rule violations in the file, or null if it has no issues."
+    )
+
+
 class ReviewRequest(BaseModel):
     file_path: str = Field(alias="filePath", description="File path relative to the root of the repository.")
     file_content: str = Field(alias="fileContent", description="File content to be reviewed.")
+    change_type: Optional[str] = Field(
+        default=None, alias="changeType", description="Change type of the file from the diff, e.g. add or edit."
+    )
+    repository_id: Optional[str] = Field(
+        default=None, alias="repositoryId", description="ID of the repository the file belongs to."
+    )
+    original_object_id: Optional[str] = Field(
+        default=None,
+        alias="originalObjectId",
+        description="Git object ID of the file before the change, from the diff. Absent for added files.",
+    )
 
 
 class ReviewInput(BaseModel):
@@ -68,3 +141,12 @@ class ReviewInput(BaseModel):
     )
     file_path: str = Field(alias="filePath", description="File path relative to the root of the repository.")
     file_content: str = Field(alias="fileContent", description="File content to be reviewed.")
+    excerpt: Optional[str] = Field(
+        default=None, description="Which part of the file file_content is, when it isn't the whole file."
+    )
+
+
+class DeferredReviewRequest(BaseModel):
+    pull_request_ids: list[int] = Field(
+        alias="pullRequestIds", min_length=1, description="The pull requests to review together in one batch."
+    )
@@ -0,0 +1,41 @@
+"""
+Comment templates for reviews that are posted without the coordinator agent, like deferred reviews.
+
+They render the same format the coordinator is instructed to use in PR_REVIEWER_PROMPT, so comments look alike no matter
+which path produced them.
+"""
+
+RULE_COMMENT_TEMPLATE = """**{rule_level}** - {rule_title} (`{rule_id}`) <br>
+{problem_description} <br>
+{expected_fix} <br>"""
+
+GENERIC_COMMENT_TEMPLATE = """**GENERIC COMMENT** - (`no rule id`) <br>
+{problem_description} <br>
+{expected_fix} <br>"""
+
+DECLINED_COMMENT_TEMPLATE = """**DECLINING TO REVIEW FURTHER** - (`no rule id`) <br>
+<br>
+This file has too many issues and would lead to an overload on the review bot's process.
+Evaluate the contents of this file against the provided rules, address any issues, and bring it for a new review."""
+
+SUMMARY_COMMENT_TEMPLATE = """**Review Bot Summary**
+{summary} <br><br>
+
+| File | Severity level | Amount of issues |
+|------|----------------|------------------|
+{rows}
+
+<br>
+<sup>Remember: I'm just a bot. My comments are intended to support the review process by catching obvious issues. You should still perform a PR review yourself.</sup>"""
+
+SUMMARY_ROW_TEMPLATE = "| {file_path} | {level} | {count} |"
+
+DEFERRED_SUMMARY = "This pull request was reviewed in deferred mode, file by file, using the review rules."
+
+NO_ISSUES_SUMMARY = "No issues were found in the files that were reviewed."
+
+FAILED_FILES_NOTE = "These files could not be reviewed: {file_paths}."
+
+TRIVIAL_FILES_NOTE = "These files were not reviewed because their changes are trivial: {file_paths}."
+
+NOTHING_TO_REVIEW_NOTE = "None of the changed files could be reviewed, there is no reviewer for their file types."
@@ -12,13 +12,18 @@ WORKFLOW:
    - Use `baseVersion = target branch` (omit `refs/heads`)
    - Use `targetVersion = source branch` (omit `refs/heads`)
 
-3. For each file in the diff:
+3. For each file in the diff (call the tools for several files at once where you can, small files are then reviewed together):
+   Go through the files in the order the diff lists them. The riskiest files come first, so if you can't review every
+   file, the ones left over are the least risky. Mention the files you didn't get to in the summary.
    a. Identify the file type.
-   b. Use the `get_item` tool to retrieve the file's content.
+   b. Use the `get_item` tool to retrieve the file's content. Pass the file's `object_id` from the diff along.
    c. Delegate the review to the appropriate sub-agent via its `reviewer` tool e.g., `python_code_reviewer`, `markdown_docs_reviewer`.
+      Pass the file's `change_type` and `original_object_id` from the diff along, and the repository id.
    d. Receive review results from the sub-agent and create a comment thread using the `create_comment_thread` tool.
       - Adhere strictly to the COMMENT FORMAT section below.
       - Use `thread_context` with `file_start` and `file_end` to flag the exact line in the code which is problematic.
+   e. If the sub-agent answers that it didn't review the file because the change is trivial, e.g. a rename or a
+      formatting change, don't create comment threads for that file. Mention it in the summary instead.
 
 4. After all files are reviewed, post a summary comment using the `create_pull_request_thread` tool.
    - This comment must be created without `thread_context` parameter.
@@ -67,17 +72,32 @@ If you are leaving a comment based on a rule with ruleLevel "declined":
 """
 
 
-GENERIC_COMMENT_PROMPT = """
+TRIVIAL_CHANGE_NOTE = "Didn't review {file_path}: the change is trivial ({kind})."
+
+# Added to a rule whose code smells are partly checked statically, see app/analysis
+STATICALLY_CHECKED_NOTE = "These code smells of the rule are checked separately, don't report them: {code_smells}."
+
+
+# Reviews are also cut off in code at this number of violations, see TierPools.run_capped
+MAX_VIOLATIONS_PER_FILE = 15
+
+CAPPED_REVIEW_DESCRIPTION = (
+    f"Stopped reviewing this file after {MAX_VIOLATIONS_PER_FILE} rule violations, because it has too many issues."
+)
+
+
+GENERIC_COMMENT_PROMPT = f"""
 RULES:
 1. Do not invent issues. Only comment when a rule is clearly violated. Only following existing rules.
 2. Think about context: In context of the rest of the code, is the violation really a problem? If no, do not comment.
 3. Do not skip any rules, unless a rule is unclear.
 4. Evaluate in order of severity level. Start with critical, then error, then warning.
 5. Avoid duplication.
-6. Be generous with the start_offset and end_offset parameters. Try to cut off at logical points like whitespaces, line breaks or the end of variable names. Avoid cutting off halfway through some syntax. If you are not certain, simply set it to the full width of the line.
-7. If you have identified more than 15 review rule violations you must stop reviewing that file's contents and continue with the next file.
-    a. If this occurs, you must also comment with severity DECLINED that you have stopped reviewing the file's contents because it has too many issues.
- This must be a comment with severity DECLINED that comments that the file has too many issues. Then you must continue with the next file.
+6. Be generous with the start and end offsets (so and eo). Try to cut off at logical points like whitespaces, line breaks or the end of variable names. Avoid cutting off halfway through some syntax. If you are not certain, simply set it to the full width of the line.
+7. If you have identified more than {MAX_VIOLATIONS_PER_FILE} review rule violations you must stop reviewing that file's contents and continue with the next file.
+    a. If this occurs, you must also add a finding with rule id DECLINED that says you have stopped reviewing the file's contents because it has too many issues.
+ This must be a finding with rule id DECLINED that comments that the file has too many issues. Then you must continue with the next file.
+8. Report each finding with the id of the rule it violates. Use the rule id GENERIC for a comment that isn't about one of the rules.
 
 TONE GUIDANCE:
 - Do not sugercoat your comments, but avoid sarcasm or condescension
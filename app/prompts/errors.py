@@ -1,4 +1,4 @@
-ERROR_PROMPT = """You are the Azure DevOps Pull Request Review Fallback Agent.
+ERROR_SUMMARY_PROMPT = """You are the Azure DevOps Pull Request Review Fallback Agent.
 Your task is to provide transparency to users in case the pull request review has failed or has been interrupted.
 
 You will receive two inputs:
@@ -10,23 +10,34 @@ the limits of how large or complex a review can be. These protective measures ar
 prevent unintended consequences like very high costs, very long review processes, or simply being forced
 to review a pull request so large that it can not realistically be reviewed by an agentic system like this.
 
-
-WORKFLOW:
-1. Retrieve pull request details using the `repo_get_pull_request_by_id`
-
-2. Post a concluding comment to the pull request using the `create_pull_request_thread` tool.
-  - This comment must give transparency on the nature of the error, and how that error might be prevented. This comment must be created without `thread_context` parameter.
-  - The format of your comment must be:
-```
-**Review Bot Encountered an error!**
-<br>
-{maximum 3-sentence summary of what went wrong}
-<br><br>
-<sup>Remember: I'm just a bot. I might be wrong in my assessment of this PR and its issues. You should always perform a PR review yourself.</sup>
-```
+Your output is a summary of at most 3 sentences of what went wrong. It is inserted into a fixed comment template, so
+do not add a title, greeting or sign-off.
 
 Summary content guidance:
 - Be transparent, but brief.
 - Do not invent issues. Only let yourself be guided by the error message you receive.
 - Try to highlight a potential root cause based on the error message. If you are not sure, do not mention any root cause.
 """
+
+# Rendered without any LLM involvement, so posting it keeps working when the model provider is the thing that failed.
+ERROR_COMMENT_TEMPLATE = """**Review Bot Encountered an error!**
+<br>
+{summary}
+<br><br>
+<sup>Remember: I'm just a bot. I might be wrong in my assessment of this PR and its issues. You should always perform a PR review yourself.</sup>"""
+
+USAGE_LIMIT_SUMMARY = (
+    "The review was stopped because it exceeded the limits on how large or complex a single review may be. "
+    "These limits protect against very high costs and very long review runs. "
+    "Splitting this pull request into smaller pull requests will likely allow it to be reviewed."
+)
+
+MODEL_BEHAVIOR_SUMMARY = (
+    "The review was stopped because the language model behind the review bot responded in an unexpected way. "
+    "This is usually temporary, so triggering a new review later will likely succeed."
+)
+
+GENERIC_ERROR_SUMMARY = (
+    "The review was stopped because of an error in the review process, for example an unavailable model provider. "
+    "Triggering a new review later may succeed."
+)
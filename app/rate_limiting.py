@@ -0,0 +1,115 @@
+"""
+Token bucket storage for rate limiting, pluggable so the buckets can be shared between workers and nodes.
+
+Counters kept in process memory multiply the effective limit by the number of uvicorn workers and replicas, and reset on
+every deploy. Every backend implements the same single operation, so swapping the in-memory backend for the SQLite one
+(shared between the workers on a node through a file) or for a network store like Redis doesn't change any callers.
+"""
+
+import asyncio
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+
+from app.auth import get_azure_devops_settings
+
+
+class TokenBucketBackend(ABC):
+    """Storage for named token buckets that refill continuously at a fixed rate up to their capacity."""
+
+    @abstractmethod
+    async def acquire(self, key: str, cost: float, rate: float, capacity: float, force: bool = False) -> float:
+        """
+        Take cost tokens from the bucket named key.
+
+        Args:
+            key: Name of the bucket, e.g. "reviews:client-name"
+            cost: Number of tokens to take. A negative cost returns tokens to the bucket
+            rate: Tokens added to the bucket per second
+            capacity: Maximum number of tokens in the bucket, which is also its starting level
+            force: Take the tokens even if that leaves the bucket below zero. Used to settle costs after the fact
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds to wait until enough tokens are available
+        """
+
+
+def _refill_and_take(
+    tokens: float, updated_at: float, now: float, cost: float, rate: float, capacity: float, force: bool
+) -> tuple[float, float]:
+    """Shared bucket arithmetic. Returns the new token level and the seconds to wait (0 if the tokens were taken)."""
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    if force or tokens >= cost:
+        return min(capacity, tokens - cost), 0.0
+    return tokens, (cost - tokens) / rate if rate > 0 else float("inf")
+
+
+class InMemoryTokenBucketBackend(TokenBucketBackend):
+    """Buckets in process memory. Only correct when a single worker serves all traffic."""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def acquire(self, key: str, cost: float, rate: float, capacity: float, force: bool = False) -> float:
+        """See TokenBucketBackend.acquire."""
+        now = time.time()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens, wait_seconds = _refill_and_take(tokens, updated_at, now, cost, rate, capacity, force)
+        self._buckets[key] = (tokens, now)
+        return wait_seconds
+
+
+class SQLiteTokenBucketBackend(TokenBucketBackend):
+    """Buckets in a SQLite file, shared by every process that points at the same file.
+
+    Each acquire runs in its own IMMEDIATE transaction, which takes the database write lock up front, so concurrent
+    workers can't both read the same token level and both spend it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets (key TEXT PRIMARY KEY, tokens REAL, updated_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def _acquire_blocking(self, key: str, cost: float, rate: float, capacity: float, force: bool) -> float:
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = connection.execute("SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens, wait_seconds = _refill_and_take(tokens, updated_at, now, cost, rate, capacity, force)
+            connection.execute(
+                "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now)
+            )
+            connection.execute("COMMIT")
+            return wait_seconds
+        except Exception:
+            # BEGIN IMMEDIATE itself fails when the database stays locked, and then there's nothing to roll back
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    async def acquire(self, key: str, cost: float, rate: float, capacity: float, force: bool = False) -> float:
+        """See TokenBucketBackend.acquire. Runs in a thread, since waiting for the write lock blocks."""
+        return await asyncio.to_thread(self._acquire_blocking, key, cost, rate, capacity, force)
+
+
+@lru_cache(maxsize=1)
+def get_token_bucket_backend() -> TokenBucketBackend:
+    """Instantiate the configured token bucket backend or return the existing one."""
+    settings = get_azure_devops_settings()
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteTokenBucketBackend(Path(settings.RATE_LIMIT_SQLITE_PATH))
+    return InMemoryTokenBucketBackend()
@@ -3,37 +3,69 @@ from urllib.parse import urljoin
 import logfire
 from fastapi import APIRouter, Request, Depends, BackgroundTasks
 from pydantic_ai import Agent, RunContext, UsageLimits, UsageLimitExceeded, UnexpectedModelBehavior, AgentRunError
+from pydantic_ai.exceptions import FallbackExceptionGroup
 from pydantic_ai.mcp import MCPServerStreamableHTTP
 
+from app.admission import get_review_admission
+from app.agents.deferred import run_deferred_reviews
+from app.agents.fallback import post_review_error_comment
 from app.agents.models import coordinator_agent_model
 from app.agents.sub_agents import python_code_reviewer, sql_code_reviewer, markdown_docs_reviewer
-from app.dependencies import validate_authorization_header, limiter
-from app.models.agents import PullRequestAgentDeps, FallbackAgentDeps
+from app.dependencies import get_token_claims, reserve_review_slot, review_limiter
+from app.mcp.cache import REVIEW_ID_HEADER, review_cache_scope
+from app.models.agents import PullRequestAgentDeps
+from app.models.review_models import DeferredReviewRequest
 from app.prompts.core import PR_REVIEWER_PROMPT
-from app.prompts.errors import ERROR_PROMPT
 
 router = APIRouter(
     prefix="/pull-requests",
     tags=["pull_requests"],
-    dependencies=[Depends(validate_authorization_header), Depends(limiter)],
+    dependencies=[Depends(get_token_claims), Depends(review_limiter)],
 )
 
 
-@router.post("/{pull_request_id}/tmpwrap")
+@router.post("/{pull_request_id}/tmpwrap", dependencies=[Depends(reserve_review_slot)])
 async def tmpwrap(pull_request_id: int, request: Request, background_tasks: BackgroundTasks):
     background_tasks.add_task(review_created_pull_request, pull_request_id, request)
     return {"status": "success"}
 
 
+# Deferred reviews go through a provider's batch API: cheaper, but results may take hours. See app/agents/deferred.py.
+# They don't take a review slot, the batch runs outside of the interactive admission and concurrency limits.
+@router.post("/deferred", status_code=202)
+async def review_pull_requests_deferred(body: DeferredReviewRequest, background_tasks: BackgroundTasks):
+    """Review a backlog of pull requests together in one batch."""
+    background_tasks.add_task(run_deferred_reviews, body.pull_request_ids)
+    return {"status": "Accepted"}
+
+
+@router.post("/{pull_request_id}/deferred", status_code=202)
+async def review_pull_request_deferred(pull_request_id: int, background_tasks: BackgroundTasks):
+    """Review a single pull request in deferred mode."""
+    background_tasks.add_task(run_deferred_reviews, [pull_request_id])
+    return {"status": "Accepted"}
+
+
 # Currently defined this as route, but later we may conclude this can be a plain function
 # At least this way we have the router-wide dependency execution which is nice
-@router.post("/{pull_request_id}/created")
+@router.post("/{pull_request_id}/created", dependencies=[Depends(reserve_review_slot)])
 async def review_created_pull_request(pull_request_id: int, request: Request):
-    logfire.info("Starting PR Review", pull_request_id=pull_request_id)
+    # Waits here while the maximum number of reviews is already running, see app/admission.py
+    async with get_review_admission().running():
+        logfire.info("Starting PR Review", pull_request_id=pull_request_id)
+
+        # Everything read from Azure DevOps during this review, fallback included, is memoized until the review ends
+        async with review_cache_scope() as review_id:
+            return await _review_pull_request(pull_request_id, request, review_id)
+
 
+async def _review_pull_request(pull_request_id: int, request: Request, review_id: str):
     # We don't pre-define the MCP toolset but instantiate it live, so we can refer to the URL of the mounted FastMCP app
+    # The review id header lets the MCP tools find the read cache of this review
     base_url = f"{request.url.scheme}://{request.url.netloc}"
-    mcp_tool = MCPServerStreamableHTTP(url=urljoin(base_url, "/mcp/azure-devops"))
+    mcp_tool = MCPServerStreamableHTTP(
+        url=urljoin(base_url, "/mcp/azure-devops"), headers={REVIEW_ID_HEADER: review_id}
+    )
 
     # We instantiate the agent class here for the same reason, we want dynamic parts resolved at init time
     # If we later have a stand-alone MCP server ten we can pre-instantiate this and call it here like normal!
@@ -58,24 +90,10 @@ async def review_created_pull_request(pull_request_id: int, request: Request):
         )
         return {output.output}
 
-    except (UsageLimitExceeded, UnexpectedModelBehavior, AgentRunError) as e:
-        # Again, instantiate here to dynamically allow the MCP tool. We use it to post a PR comment about the error.
-        fallback_agent = Agent(
-            model=coordinator_agent_model, toolsets=[mcp_tool], deps_type=FallbackAgentDeps, system_prompt=ERROR_PROMPT
-        )
-
-        @fallback_agent.system_prompt
-        def add_the_error_message_and_pr_id(ctx: RunContext[FallbackAgentDeps]) -> str:
-            return (
-                f"The pull request id is {ctx.deps.pull_request_id}. \n The error message is: {ctx.deps.error_message}"
-            )
-
+    except (UsageLimitExceeded, UnexpectedModelBehavior, AgentRunError, FallbackExceptionGroup) as e:
+        # No second agent here: the error comment is templated and posted directly, see app/agents/fallback.py.
         logfire.error(
             f"Abandoning PR review for pull request with ID {pull_request_id} due to an error. Error message: {e}"
         )
-        output = await fallback_agent.run(
-            "Please handle the error that is provided to you.",
-            deps=FallbackAgentDeps(pull_request_id=pull_request_id, error_message=str(e)),
-            usage_limits=UsageLimits(output_tokens_limit=1000),
-        )
-        return {output.output}
+        comment = await post_review_error_comment(pull_request_id, e)
+        return {comment}
@@ -1,12 +1,18 @@
+from collections import OrderedDict
 from datetime import UTC, datetime, timedelta
 from typing import Annotated
+from uuid import UUID
 
 import jwt
+import logfire
 from fastapi import APIRouter, Request, HTTPException, Header, Depends, BackgroundTasks
+from pydantic import ValidationError
 
-from app.auth import get_azure_devops_settings
-from app.dependencies import validate_authorization_header, limiter
-from app.models.azure_devops.pull_request_models import AzureDevOpsWebhookEvent
+from app.admission import get_review_admission
+from app.agents.deferred import run_deferred_reviews
+from app.auth import get_azure_devops_settings, verify_token
+from app.dependencies import TokenClaims, cheap_limiter, review_limiter
+from app.models.azure_devops.pull_request_models import AzureDevOpsWebhookEvent, WebhookEventEnvelope
 from app.models.webhooks import ClientData, WebhookRegistrationResponse, TokenValidationResponse
 from app.routers import pull_requests
 from app.routers.pull_requests import review_created_pull_request
@@ -14,6 +20,20 @@ from app.routers.pull_requests import review_created_pull_request
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 router.include_router(pull_requests.router, prefix="/pull-requests", tags=["pull_requests"])
 
+# Azure DevOps retries deliveries it considers failed, so the same event can arrive more than once
+_RECENT_EVENT_IDS_LIMIT = 1024
+_recent_event_ids: OrderedDict[UUID, None] = OrderedDict()
+
+
+def _is_duplicate_event(event_id: UUID) -> bool:
+    """Remember the event id and report whether it was seen recently."""
+    if event_id in _recent_event_ids:
+        return True
+    _recent_event_ids[event_id] = None
+    if len(_recent_event_ids) > _RECENT_EVENT_IDS_LIMIT:
+        _recent_event_ids.popitem(last=False)
+    return False
+
 
 @router.post("/register", response_model=WebhookRegistrationResponse)
 async def register_webhook(data: ClientData, request: Request):
@@ -28,7 +48,7 @@ async def register_webhook(data: ClientData, request: Request):
     )
 
 
-@router.get("/validate", response_model=TokenValidationResponse, dependencies=[Depends(limiter)])
+@router.get("/validate", response_model=TokenValidationResponse, dependencies=[Depends(cheap_limiter)])
 async def validate_token(authorization: Annotated[str, Header()]):
     """Confirm if your token is valid in terms of correctness and expiry date.
     Use Authorization: Bearer <token> as the header"""
@@ -36,9 +56,8 @@ async def validate_token(authorization: Annotated[str, Header()]):
         raise HTTPException(status_code=401, detail="Authorization bearer token required")
     try:
         secret_key = get_azure_devops_settings().JWT_SECRET_STRING
-        print(f"secret key is {secret_key}")
         token = authorization.removeprefix("Bearer ").strip()
-        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
+        payload = verify_token(token, secret_key)
         return TokenValidationResponse(valid=True, expires_at=datetime.fromtimestamp(payload["exp"]), reason=None)
     except jwt.ExpiredSignatureError:
         return TokenValidationResponse(valid=False, expires_at=None, reason="Provided token was valid but is expired")
@@ -46,18 +65,48 @@ async def validate_token(authorization: Annotated[str, Header()]):
         return TokenValidationResponse(valid=False, expires_at=None, reason="Provided token was invalid")
 
 
-# We don't really need the auth param functionally, this way we force its presence & validity in the route.
-@router.post("/pull-request/created", dependencies=[Depends(limiter)])
+async def process_pull_request_event(raw_body: bytes, request: Request):
+    """Background part of the webhook: fully validate the event, then review the pull request it concerns."""
+    try:
+        event = AzureDevOpsWebhookEvent.model_validate_json(raw_body)
+    except ValidationError as e:
+        logfire.error("Dropping webhook event that failed full validation.", error=str(e))
+        get_review_admission().withdraw()
+        return
+
+    # Nobody is waiting on the review of a draft, so it goes through the cheaper batch API instead of taking a slot
+    if event.resource.is_draft and get_azure_devops_settings().DEFER_DRAFT_REVIEWS:
+        get_review_admission().withdraw()
+        logfire.info("Deferring review of draft pull request.", pull_request_id=event.resource.pull_request_id)
+        await run_deferred_reviews([event.resource.pull_request_id])
+        return
+
+    await review_created_pull_request(event.resource.pull_request_id, request)
+
+
+# We don't really need the claims functionally, this way we force presence & validity of the token in the route.
+# The body is read raw and only its envelope is validated, so the webhook can be acknowledged as fast as possible.
+@router.post("/pull-request/created", status_code=202, dependencies=[Depends(review_limiter)])
 async def create_pull_request(
-    pr_body: AzureDevOpsWebhookEvent,
     request: Request,
     background_tasks: BackgroundTasks,
-    authorization: Annotated[str, Depends(validate_authorization_header)],
+    claims: TokenClaims,
 ):
     """Webhook trigger of the PR comment review process. Only works when a full Azure DevOps webhook event is provided."""
-    if not pr_body.resource.pull_request_id:
+    raw_body = await request.body()
+    try:
+        envelope = WebhookEventEnvelope.model_validate_json(raw_body)
+    except ValidationError:
         raise HTTPException(status_code=422, detail="Invalid pull request body")
-    else:
-        background_tasks.add_task(review_created_pull_request, pr_body.resource.pull_request_id, request)
-        return {"status": "Accepted"}
-        # return await review_created_pull_request(pull_request_id=pr_body.resource.pull_request_id, request=request)
+
+    # Refuses with a 503 when saturated, Azure DevOps will deliver the event again later. Reserved before the duplicate
+    # check, so a refused event isn't remembered and its redelivery isn't mistaken for a duplicate.
+    admission = get_review_admission()
+    admission.reserve()
+    if _is_duplicate_event(envelope.id):
+        admission.withdraw()
+        logfire.info("Ignoring duplicate webhook event.", event_id=envelope.id)
+        return {"status": "Duplicate"}
+    logfire.info("Accepted webhook event.", event_id=envelope.id, client=claims.get("sub"))
+    background_tasks.add_task(process_pull_request_event, raw_body, request)
+    return {"status": "Accepted"}
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from pydantic_ai.models.test import TestModel
+
+from app.agents.batch import (
+    REVIEW_OUTPUT_TOOL,
+    AnthropicBatchBackend,
+    BatchReviewRequest,
+    BatchStatus,
+    LocalBatchBackend,
+)
+from tests.base import BaseTestCase
+
+FINDING = {"r": "PY001", "sl": 3, "so": 1, "el": 3, "eo": 20, "p": "print statement left in"}
+
+
+async def _entries(*entries):
+    for entry in entries:
+        yield entry
+
+
+def _tool_use_entry(custom_id: str, tool_input: dict) -> Mock:
+    block = Mock(type="tool_use", input=tool_input)
+    block.name = REVIEW_OUTPUT_TOOL
+    return Mock(custom_id=custom_id, result=Mock(type="succeeded", message=Mock(content=[block])))
+
+
+class TestLocalBatchBackend(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_batch_returns_output_per_custom_id(self):
+        backend = LocalBatchBackend(TestModel(custom_output_args={"items": [FINDING]}))
+        requests = [BatchReviewRequest(f"req-{n}", "You review code.", "Review it.") for n in range(2)]
+
+        batch_id = await backend.submit(requests)
+        while await backend.status(batch_id) != BatchStatus.ENDED:
+            await asyncio.sleep(0)
+        results = await backend.results(batch_id)
+
+        assert set(results) == {"req-0", "req-1"}
+        assert results["req-0"][0].problem_description == "print statement left in"
+
+
+class TestAnthropicBatchBackend(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_requests_force_the_review_output_tool(self):
+        client = Mock()
+        client.messages.batches.create = AsyncMock(return_value=Mock(id="msgbatch_1"))
+        backend = AnthropicBatchBackend(client, model_name="claude-sonnet-4-5", max_tokens=1024)
+
+        batch_id = await backend.submit([BatchReviewRequest("pr1-file0", "You review code.", "Review it.")])
+
+        assert batch_id == "msgbatch_1"
+        request = client.messages.batches.create.call_args.kwargs["requests"][0]
+        assert request["custom_id"] == "pr1-file0"
+        assert request["params"]["tool_choice"] == {"type": "tool", "name": REVIEW_OUTPUT_TOOL}
+        assert request["params"]["system"] == "You review code."
+
+    @pytest.mark.asyncio
+    async def test_results_leave_out_failed_and_invalid_requests(self):
+        client = Mock()
+        client.messages.batches.results = AsyncMock(
+            return_value=_entries(
+                _tool_use_entry("ok", {"items": [FINDING]}),
+                _tool_use_entry("clean", {"items": None}),
+                _tool_use_entry("invalid", {"items": [{"sl": 0}]}),
+                Mock(custom_id="errored", result=Mock(type="errored")),
+            )
+        )
+        backend = AnthropicBatchBackend(client, model_name="claude-sonnet-4-5", max_tokens=1024)
+
+        results = await backend.results("msgbatch_1")
+
+        assert set(results) == {"ok", "clean"}
+        assert results["clean"] is None
+        assert results["ok"][0].start_line == 3
@@ -0,0 +1,219 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.agents.batch import BatchReviewRequest, BatchStatus
+from app.agents.deferred import (
+    FileReviewJob,
+    collect_review_jobs,
+    post_review_results,
+    render_review_comment,
+    run_deferred_reviews,
+)
+from app.analysis import StaticReview
+from app.analysis.positions import LineIndex
+from app.analysis.triviality import TrivialChange
+from app.models.azure_devops.git_models import GitCommitDiffs
+from app.models.azure_devops.pull_request_models import GitPullRequest
+from app.models.review_models import CompactFinding, ReviewComment, ReviewOutcomeItem, ReviewRule
+from tests.base import BaseTestCase
+from tests.fixtures.azure_devops import load_fixture
+
+
+def _outcome_item(line: int, level: str = "warning") -> ReviewOutcomeItem:
+    return ReviewOutcomeItem.model_validate(
+        {
+            "filePath": "/billing/export.py",
+            "startLine": line,
+            "startOffset": 1,
+            "endLine": line,
+            "endOffset": 10,
+            "reviewComment": {
+                "ruleLevel": level,
+                "ruleTitle": "No print statements",
+                "ruleId": "PY001",
+                "problemDescription": "print statement left in",
+                "expectedFix": "Use logging.",
+            },
+        }
+    )
+
+
+PRINT_RULE = ReviewRule(
+    id="PY001", title="No print statements", description="", severity="warning", code_smells=["print("]
+)
+
+
+def _finding(line: int) -> CompactFinding:
+    return CompactFinding(r="PY001", sl=line, so=1, el=line, eo=10, p="print statement left in")
+
+
+@patch("app.analysis.risk.get_commit_count", new_callable=AsyncMock, return_value=0)
+@patch("app.agents.deferred.get_blob_content", new_callable=AsyncMock, return_value="print('bye')")
+@patch("app.agents.deferred.get_review_rules", new_callable=AsyncMock, return_value=[])
+@patch("app.agents.deferred.get_item", new_callable=AsyncMock)
+@patch("app.agents.deferred.get_diffs", new_callable=AsyncMock)
+@patch("app.agents.deferred.get_pull_request", new_callable=AsyncMock)
+class TestCollectReviewJobs(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_one_job_per_reviewable_file(
+        self, mock_get_pr, mock_get_diffs, mock_get_item, mock_rules, mock_blob, mock_commits
+    ):
+        mock_get_pr.return_value = GitPullRequest.model_validate(load_fixture("pull_request.json"))
+        mock_get_diffs.return_value = GitCommitDiffs.model_validate(load_fixture("diffs.json"))
+        mock_get_item.return_value = Mock(content="print('hi')")
+
+        jobs = await collect_review_jobs(221)
+
+        assert mock_get_diffs.call_args.args[1:] == ("main", "feature/billing-export")
+        paths = [job.file_path for job in jobs]
+        assert "/legacy/csv_render.py" not in paths
+        # SQL is the riskiest change in the pull request
+        assert paths[0] == "/sql/billing_views.sql"
+        assert {"/billing/export.py", "/docs/billing.md", "/sql/billing_views.sql"} <= set(paths)
+        assert all(job.request.custom_id.startswith("pr221-") for job in jobs)
+        assert len({job.request.custom_id for job in jobs}) == len(jobs)
+        assert "print('hi')" in jobs[0].request.system_prompt
+        assert all(job.trivial_change is None for job in jobs)
+
+    @pytest.mark.asyncio
+    async def test_trivial_change_gets_no_request(
+        self, mock_get_pr, mock_get_diffs, mock_get_item, mock_rules, mock_blob, mock_commits
+    ):
+        mock_get_pr.return_value = GitPullRequest.model_validate(load_fixture("pull_request.json"))
+        mock_get_diffs.return_value = GitCommitDiffs.model_validate(load_fixture("diffs.json"))
+        mock_get_item.return_value = Mock(content="print('bye')  # reformatted\n")
+
+        jobs = await collect_review_jobs(221)
+
+        upload = next(job for job in jobs if job.file_path == "/billing/upload.py")
+        assert upload.request is None
+        assert upload.trivial_change == TrivialChange.COMMENTS
+        added = next(job for job in jobs if job.file_path == "/billing/export.py")
+        assert added.request is not None
+
+    @pytest.mark.asyncio
+    async def test_comment_change_is_reviewed_against_comment_rules_only(
+        self, mock_get_pr, mock_get_diffs, mock_get_item, mock_rules, mock_blob, mock_commits
+    ):
+        mock_get_pr.return_value = GitPullRequest.model_validate(load_fixture("pull_request.json"))
+        mock_get_diffs.return_value = GitCommitDiffs.model_validate(load_fixture("diffs.json"))
+        mock_get_item.return_value = Mock(content="print('bye')  # reformatted\n")
+        comment_rule = ReviewRule(
+            id="PY011", title="Comments explain why", description="", severity="warning", code_smells=["# what"]
+        )
+        mock_rules.return_value = [PRINT_RULE, comment_rule]
+
+        jobs = await collect_review_jobs(221)
+
+        upload = next(job for job in jobs if job.file_path == "/billing/upload.py")
+        assert upload.trivial_change is None
+        assert "PY011" in upload.request.system_prompt
+        assert "PY001" not in upload.request.system_prompt
+
+
+class TestDeferredReviews(BaseTestCase):
+    def test_comment_renders_rule(self):
+        content = render_review_comment(_outcome_item(3, "error").review_comment)
+
+        assert content.startswith("**ERROR** - No print statements (`PY001`)")
+
+    def test_declined_comment_uses_template(self):
+        comment = ReviewComment.model_validate({"ruleLevel": "declined", "problemDescription": "Too many issues"})
+
+        assert render_review_comment(comment).startswith("**DECLINING TO REVIEW FURTHER**")
+
+    @pytest.mark.asyncio
+    @patch("app.agents.deferred.post_review_error_comment", new_callable=AsyncMock)
+    @patch("app.agents.deferred.create_thread", new_callable=AsyncMock)
+    @patch("app.agents.deferred.get_batch_backend")
+    @patch("app.agents.deferred.collect_review_jobs", new_callable=AsyncMock)
+    async def test_results_are_posted_with_summary(self, mock_collect, mock_backend, mock_create_thread, mock_error):
+        jobs = [
+            Mock(
+                pull_request_id=7,
+                repository_id="repo",
+                file_path=f"/f{n}.py",
+                static_review=StaticReview([], [PRINT_RULE]),
+                trivial_change=None,
+                line_index=LineIndex("".join(f"print({n})\n" for n in range(5))),
+            )
+            for n in range(2)
+        ]
+        jobs[0].request.custom_id, jobs[1].request.custom_id = "pr7-file0", "pr7-file1"
+        mock_collect.return_value = jobs
+        backend = mock_backend.return_value
+        backend.submit = AsyncMock(return_value="batch")
+        backend.status = AsyncMock(return_value=BatchStatus.ENDED)
+        backend.results = AsyncMock(return_value={"pr7-file0": [_finding(3), _finding(9)]})
+
+        await run_deferred_reviews([7])
+
+        threads = mock_create_thread.call_args_list
+        assert len(threads) == 3
+        assert threads[0].args[3].file_path == "/f0.py"
+        assert threads[0].args[3].right_file_start.line == 3
+        # Line 9 is past the end of the file
+        assert (threads[1].args[3].right_file_end.line, threads[1].args[3].right_file_end.offset) == (5, 9)
+        summary = threads[2].args[2][0].content
+        assert "| /f0.py | WARNING | 2 |" in summary
+        assert "/f1.py" in summary
+        mock_error.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.agents.deferred.post_review_error_comment", new_callable=AsyncMock)
+    @patch("app.agents.deferred.create_thread", new_callable=AsyncMock)
+    @patch("app.agents.deferred.get_batch_backend")
+    @patch("app.agents.deferred.collect_review_jobs", new_callable=AsyncMock)
+    async def test_failed_batch_posts_error_comment(self, mock_collect, mock_backend, mock_create_thread, mock_error):
+        mock_collect.return_value = [
+            Mock(pull_request_id=7, repository_id="repo", file_path="/f.py", trivial_change=None)
+        ]
+        mock_backend.return_value.submit = AsyncMock(side_effect=RuntimeError("batch quota exceeded"))
+
+        await run_deferred_reviews([7])
+
+        assert mock_error.call_args.args[0] == 7
+        mock_create_thread.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.agents.deferred.create_thread", new_callable=AsyncMock)
+    @patch("app.agents.deferred.get_batch_backend")
+    @patch("app.agents.deferred.collect_review_jobs", new_callable=AsyncMock)
+    async def test_only_trivial_changes_posts_summary_without_batch(
+        self, mock_collect, mock_backend, mock_create_thread
+    ):
+        mock_collect.return_value = [
+            FileReviewJob(7, "repo", "/f.py", None, StaticReview([], []), TrivialChange.FORMATTING),
+        ]
+
+        await run_deferred_reviews([7])
+
+        mock_backend.assert_not_called()
+        summary = mock_create_thread.call_args.args[2][0].content
+        assert "trivial: /f.py (formatting only)" in summary
+
+    @pytest.mark.asyncio
+    @patch("app.agents.deferred.get_pull_request", new_callable=AsyncMock)
+    @patch("app.agents.deferred.create_thread", new_callable=AsyncMock)
+    @patch("app.agents.deferred.get_batch_backend")
+    @patch("app.agents.deferred.collect_review_jobs", new_callable=AsyncMock, return_value=[])
+    async def test_nothing_to_review_posts_summary(self, mock_collect, mock_backend, mock_create_thread, mock_get_pr):
+        mock_get_pr.return_value = GitPullRequest.model_validate(load_fixture("pull_request.json"))
+
+        await run_deferred_reviews([221])
+
+        mock_backend.assert_not_called()
+        assert mock_create_thread.call_args.args[1] == 221
+        assert "no reviewer for their file types" in mock_create_thread.call_args.args[2][0].content
+
+    @pytest.mark.asyncio
+    @patch("app.agents.deferred.create_thread", new_callable=AsyncMock)
+    async def test_findings_beyond_the_cap_are_declined(self, mock_create_thread):
+        job = FileReviewJob(7, "repo", "/f.py", BatchReviewRequest("pr7-file0", "", ""), StaticReview([], [PRINT_RULE]))
+
+        await post_review_results([job], {"pr7-file0": [_finding(line) for line in range(1, 41)]})
+
+        comments = [call.args[2][0].content for call in mock_create_thread.call_args_list[:-1]]
+        assert len(comments) == 16
+        assert comments[-1].startswith("**DECLINING TO REVIEW FURTHER**")
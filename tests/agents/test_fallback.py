@@ -0,0 +1,60 @@
+from unittest.mock import AsyncMock, patch, Mock
+
+import pytest
+from pydantic_ai import UsageLimitExceeded, UnexpectedModelBehavior, AgentRunError
+
+from app.agents.fallback import post_review_error_comment, render_error_comment, summarize_error
+from app.prompts.errors import USAGE_LIMIT_SUMMARY, MODEL_BEHAVIOR_SUMMARY, GENERIC_ERROR_SUMMARY
+from tests.base import BaseTestCase
+
+
+class TestFallbackComment(BaseTestCase):
+    def test_summary_matches_error_type(self):
+        assert summarize_error(UsageLimitExceeded("too many tokens")) == USAGE_LIMIT_SUMMARY
+        assert summarize_error(UnexpectedModelBehavior("garbage")) == MODEL_BEHAVIOR_SUMMARY
+        assert summarize_error(AgentRunError("provider down")) == GENERIC_ERROR_SUMMARY
+
+    def test_rendered_comment_contains_summary(self):
+        comment = render_error_comment("Something broke.")
+
+        assert comment.startswith("**Review Bot Encountered an error!**")
+        assert "Something broke." in comment
+
+    @pytest.mark.asyncio
+    @patch("app.agents.fallback.get_azure_devops_settings")
+    @patch("app.agents.fallback.create_thread", new_callable=AsyncMock)
+    @patch("app.agents.fallback.get_pull_request", new_callable=AsyncMock)
+    async def test_comment_is_posted_without_llm(self, mock_get_pr, mock_create_thread, mock_settings):
+        mock_settings.return_value.ERROR_SUMMARY_WITH_LLM = False
+        mock_get_pr.return_value = Mock(repository=Mock(id="repo-id"))
+
+        with patch("app.agents.fallback._summarize_error_with_llm", new_callable=AsyncMock) as mock_llm:
+            content = await post_review_error_comment(12, UsageLimitExceeded("too many tokens"))
+            mock_llm.assert_not_called()
+
+        assert USAGE_LIMIT_SUMMARY in content
+        args = mock_create_thread.call_args.args
+        assert args[0] == "repo-id"
+        assert args[1] == 12
+        assert args[2][0].content == content
+
+    @pytest.mark.asyncio
+    @patch("app.agents.fallback.get_azure_devops_settings")
+    @patch("app.agents.fallback.create_thread", new_callable=AsyncMock)
+    @patch("app.agents.fallback.get_pull_request", new_callable=AsyncMock)
+    async def test_failed_llm_summary_falls_back_to_template(self, mock_get_pr, mock_create_thread, mock_settings):
+        mock_settings.return_value.ERROR_SUMMARY_WITH_LLM = True
+        mock_get_pr.return_value = Mock(repository=Mock(id="repo-id"))
+
+        with patch("app.agents.fallback._summarize_error_with_llm", new_callable=AsyncMock, return_value=None):
+            content = await post_review_error_comment(12, AgentRunError("provider down"))
+
+        assert GENERIC_ERROR_SUMMARY in content
+
+    @pytest.mark.asyncio
+    @patch("app.agents.fallback.get_azure_devops_settings")
+    @patch("app.agents.fallback.get_pull_request", new_callable=AsyncMock, side_effect=Exception("Azure DevOps down"))
+    async def test_posting_failure_is_swallowed(self, mock_get_pr, mock_settings):
+        mock_settings.return_value.ERROR_SUMMARY_WITH_LLM = False
+
+        assert await post_review_error_comment(12, AgentRunError("provider down")) is None
@@ -0,0 +1,142 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo
+
+from app.agents.file_batching import SmallFileBatcher
+from app.agents.routing import ModelTier, RoutingDecision
+from app.models.review_models import CompactFinding, ReviewRule, ReviewRuleSeverity
+from tests.agents.test_sub_agents import _reviewer_model
+from tests.base import BaseTestCase
+
+ROUTING = RoutingDecision(ModelTier.FAST, "test", line_count=1, complexity=0)
+
+
+PRINT_RULE = ReviewRule(
+    id="PY001", title="No print statements", description="", severity="warning", code_smells=["print("]
+)
+
+
+def _finding(line: int) -> dict:
+    return {"r": "PY001", "sl": line, "so": 1, "el": line, "eo": 5, "p": "print statement left in"}
+
+
+class TestSmallFileBatcher(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_concurrent_small_files_share_one_call(self):
+        calls = []
+
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            calls.append(messages)
+            outcomes = [
+                {"f": "a/__init__.py", "o": [_finding(2)]},
+                {"f": "/b/__init__.py", "o": None},
+            ]
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": outcomes})])
+
+        batcher = SmallFileBatcher(max_file_tokens=100, max_batch_tokens=1000, max_files=8, window_seconds=0.01)
+        review_alone = AsyncMock()
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            first, second = await asyncio.gather(
+                batcher.review(ROUTING, "prompt", [PRINT_RULE], "/a/__init__.py", "print(1)\n", review_alone),
+                batcher.review(ROUTING, "prompt", [PRINT_RULE], "/b/__init__.py", "x = 1\n", review_alone),
+            )
+
+        assert len(calls) == 1
+        assert "### File path: /a/__init__.py" in str(calls[0])
+        assert [(item.file_path, item.start_line) for item in first] == [("/a/__init__.py", 2)]
+        assert first[0].review_comment.rule_title == "No print statements"
+        assert second is None
+        review_alone.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_file_without_company_is_reviewed_alone(self):
+        batcher = SmallFileBatcher(max_file_tokens=100, max_batch_tokens=1000, max_files=8, window_seconds=0.01)
+        items = [CompactFinding.model_validate(_finding(1)).expand("/a.py", {})]
+
+        output = await batcher.review(ROUTING, "prompt", [], "/a.py", "print(1)\n", AsyncMock(return_value=items))
+
+        assert output == items
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_sent_without_waiting(self):
+        batcher = SmallFileBatcher(max_file_tokens=100, max_batch_tokens=1000, max_files=1, window_seconds=60)
+
+        output = await asyncio.wait_for(
+            batcher.review(ROUTING, "prompt", [], "/a.py", "x = 1\n", AsyncMock(return_value=None)), timeout=1
+        )
+
+        assert output is None
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_fails_every_file(self):
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            raise RuntimeError("provider down")
+
+        batcher = SmallFileBatcher(max_file_tokens=100, max_batch_tokens=1000, max_files=8, window_seconds=0.01)
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            results = await asyncio.gather(
+                batcher.review(ROUTING, "prompt", [], "/a.py", "x = 1\n", AsyncMock()),
+                batcher.review(ROUTING, "prompt", [], "/b.py", "y = 2\n", AsyncMock()),
+                return_exceptions=True,
+            )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_file_left_out_of_the_answer_is_reviewed_alone(self):
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            outcomes = [{"f": "/a.py", "o": None}]
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": outcomes})])
+
+        batcher = SmallFileBatcher(max_file_tokens=100, max_batch_tokens=1000, max_files=8, window_seconds=0.01)
+        items = [CompactFinding.model_validate(_finding(1)).expand("/b.py", {})]
+        review_a, review_b = AsyncMock(), AsyncMock(return_value=items)
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            first, second = await asyncio.gather(
+                batcher.review(ROUTING, "prompt", [], "/a.py", "x = 1\n", review_a),
+                batcher.review(ROUTING, "prompt", [], "/b.py", "print(1)\n", review_b),
+            )
+
+        assert first is None
+        assert second == items
+        review_a.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_hold_up_the_others(self):
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            outcomes = [{"f": "/a.py", "o": None}, {"f": "/b.py", "o": [_finding(1)]}]
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": outcomes})])
+
+        batcher = SmallFileBatcher(max_file_tokens=100, max_batch_tokens=1000, max_files=8, window_seconds=0.01)
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            cancelled = asyncio.create_task(batcher.review(ROUTING, "prompt", [], "/a.py", "x = 1\n", AsyncMock()))
+            other = asyncio.create_task(batcher.review(ROUTING, "prompt", [], "/b.py", "print(1)\n", AsyncMock()))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            output = await asyncio.wait_for(other, timeout=1)
+
+        assert [item.start_line for item in output] == [1]
+
+    @pytest.mark.asyncio
+    async def test_violation_cap_applies_per_file(self):
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            outcomes = [{"f": "/a.py", "o": [_finding(line) for line in range(1, 21)]}, {"f": "/b.py", "o": None}]
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": outcomes})])
+
+        batcher = SmallFileBatcher(max_file_tokens=100, max_batch_tokens=1000, max_files=8, window_seconds=0.01)
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            first, _ = await asyncio.gather(
+                batcher.review(ROUTING, "prompt", [PRINT_RULE], "/a.py", "print(1)\n", AsyncMock()),
+                batcher.review(ROUTING, "prompt", [PRINT_RULE], "/b.py", "x = 1\n", AsyncMock()),
+            )
+
+        assert len(first) == 16
+        assert first[-1].review_comment.rule_level == ReviewRuleSeverity.DECLINED
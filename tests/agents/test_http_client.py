@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.agents.http_client import (
+    HttpLane,
+    _observe_connections,
+    close_llm_http_clients,
+    current_anthropic_client,
+    get_llm_http_client,
+)
+from app.agents.models import coordinator_agent_model, sub_agent_model
+from tests.base import BaseTestCase
+
+
+class TestLlmHttpClient(BaseTestCase):
+    def test_lanes_have_separate_pools_that_add_up_to_the_total(self):
+        with patch("app.agents.http_client.get_azure_devops_settings") as mock_settings:
+            mock_settings.return_value.LLM_HTTP_MAX_CONNECTIONS = 20
+            mock_settings.return_value.LLM_HTTP_INTERACTIVE_CONNECTIONS = 5
+            mock_settings.return_value.LLM_HTTP_KEEPALIVE_SECONDS = 30.0
+            mock_settings.return_value.LLM_HTTP2 = False
+            mock_settings.return_value.LLM_HTTP_CONNECT_TIMEOUT_SECONDS = 5.0
+            mock_settings.return_value.LLM_HTTP_READ_TIMEOUT_SECONDS = 120.0
+            interactive = get_llm_http_client.__wrapped__(HttpLane.INTERACTIVE)
+            bulk = get_llm_http_client.__wrapped__(HttpLane.BULK)
+
+        assert interactive._transport._pool._max_connections == 5
+        assert bulk._transport._pool._max_connections == 15
+        assert bulk.timeout.read == 120.0
+
+    def test_http2_falls_back_when_h2_is_missing(self):
+        with patch("app.agents.http_client._http2_available", return_value=False):
+            client = get_llm_http_client.__wrapped__(HttpLane.BULK)
+
+        assert not client._transport._pool._http2
+
+    def test_providers_of_a_lane_share_one_client(self):
+        coordinator_client = coordinator_agent_model.wrapped.wrapped.models[0].client._client
+        sub_agent_client = sub_agent_model.wrapped.wrapped.models[0].client._client
+
+        assert coordinator_client is get_llm_http_client(HttpLane.INTERACTIVE)
+        assert sub_agent_client is get_llm_http_client(HttpLane.BULK)
+
+    def test_pool_metrics_are_reported_per_lane(self):
+        observations = list(_observe_connections(None))
+
+        assert {observation.attributes["lane"] for observation in observations} == {"interactive", "bulk"}
+
+    @pytest.mark.asyncio
+    async def test_clients_are_opened_again_after_closing(self):
+        model = coordinator_agent_model.wrapped.wrapped.models[0]
+        closed = get_llm_http_client(HttpLane.INTERACTIVE)
+
+        await close_llm_http_clients()
+
+        assert closed.is_closed
+        reopened = get_llm_http_client(HttpLane.INTERACTIVE)
+        assert not reopened.is_closed
+        # What the model does before every request
+        model.client = current_anthropic_client(model.client, model.lane)
+        assert model.client._client is reopened
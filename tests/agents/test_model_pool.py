@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from pydantic_ai import Agent, ModelHTTPError
+from pydantic_ai.exceptions import FallbackExceptionGroup
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from app.agents.model_pool import ModelPool
+from tests.base import BaseTestCase
+
+
+def _model(name: str, delay: float = 0.0, status_code: int | None = None, calls: list | None = None) -> FunctionModel:
+    """Stand-in for a provider that answers with its own name after a delay, or fails with an HTTP status."""
+
+    async def respond(messages, info):
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        if status_code is not None:
+            raise ModelHTTPError(status_code=status_code, model_name=name)
+        return ModelResponse(parts=[TextPart(name)])
+
+    async def stream(messages, info):
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        if status_code is not None:
+            raise ModelHTTPError(status_code=status_code, model_name=name)
+        yield name
+
+    return FunctionModel(respond, stream_function=stream, model_name=name)
+
+
+class TestModelPool(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_fails_over_on_provider_error(self):
+        agent = Agent(model=ModelPool([_model("primary", status_code=529), _model("backup")]), output_type=str)
+
+        result = await agent.run("Hi")
+
+        assert result.output == "backup"
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_timeout(self):
+        pool = ModelPool([_model("hanging", delay=5), _model("backup")], timeout_seconds=0.05)
+
+        result = await Agent(model=pool, output_type=str).run("Hi")
+
+        assert result.output == "backup"
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_when_it_does_not_start_in_time(self):
+        pool = ModelPool([_model("hanging", delay=5), _model("backup")], timeout_seconds=0.05)
+
+        async with Agent(model=pool, output_type=str).run_stream("Hi") as stream:
+            output = await stream.get_output()
+
+        assert output == "backup"
+
+    @pytest.mark.asyncio
+    async def test_raises_when_every_model_fails(self):
+        pool = ModelPool([_model("first", status_code=500), _model("second", status_code=503)])
+
+        with pytest.raises(FallbackExceptionGroup) as exc_info:
+            await Agent(model=pool, output_type=str).run("Hi")
+
+        assert len(exc_info.value.exceptions) == 2
+
+    @pytest.mark.asyncio
+    async def test_hedges_when_primary_is_slower_than_its_p95(self):
+        calls = []
+        pool = ModelPool([_model("slow", delay=1, calls=calls), _model("fast", calls=calls)], hedge=True)
+        pool._latencies[0].extend([0.01] * 20)
+
+        result = await Agent(model=pool, output_type=str).run("Hi")
+
+        assert result.output == "fast"
+        assert calls == ["slow", "fast"]
+
+    @pytest.mark.asyncio
+    async def test_does_not_hedge_without_latency_history(self):
+        calls = []
+        pool = ModelPool([_model("primary", delay=0.05, calls=calls), _model("backup", calls=calls)], hedge=True)
+
+        result = await Agent(model=pool, output_type=str).run("Hi")
+
+        assert result.output == "primary"
+        assert calls == ["primary"]
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from app.agents.routing import ModelTier, RoutingDecision, TierPools, complexity_score, route_review
+from app.models.review_models import ReviewRequest, ReviewRuleLanguage
+from tests.base import BaseTestCase
+
+SMALL_PYTHON = "def add(a, b):\n    return a + b\n"
+COMPLEX_PYTHON = "\n".join(f"    if x == {i} and y:\n        return {i}" for i in range(30))
+
+
+class TestModelRouting(BaseTestCase):
+    def test_small_simple_file_goes_to_fast_model(self):
+        decision = route_review(ReviewRequest(filePath="add.py", fileContent=SMALL_PYTHON), ReviewRuleLanguage.PYTHON)
+
+        assert decision.tier == ModelTier.FAST
+
+    def test_complex_file_goes_to_strong_model(self):
+        decision = route_review(
+            ReviewRequest(filePath="branches.py", fileContent=COMPLEX_PYTHON), ReviewRuleLanguage.PYTHON
+        )
+
+        assert decision.tier == ModelTier.STRONG
+        assert decision.complexity == 60
+
+    def test_documentation_and_deleted_files_go_to_fast_model(self):
+        docs = route_review(ReviewRequest(filePath="README.md", fileContent="# Title\n" * 100), ReviewRuleLanguage.MD)
+        deleted = route_review(
+            ReviewRequest(filePath="old.py", fileContent=COMPLEX_PYTHON, changeType="delete"), ReviewRuleLanguage.PYTHON
+        )
+
+        assert docs.tier == ModelTier.FAST
+        assert deleted.tier == ModelTier.FAST
+
+    def test_sql_complexity_is_case_insensitive(self):
+        sql = "select * from a JOIN b on a.id = b.id where a.x = 1 union select * from c"
+
+        assert complexity_score(sql, ReviewRuleLanguage.SQL) == 3
+
+    @pytest.mark.asyncio
+    async def test_tier_pool_bounds_concurrent_reviews(self):
+        pools = TierPools({ModelTier.FAST: 1, ModelTier.STRONG: 1})
+        decision = RoutingDecision(tier=ModelTier.FAST, reason="test", line_count=1, complexity=0)
+        running = 0
+        peak = 0
+
+        agent = Agent(model=TestModel(), output_type=str)
+
+        @agent.tool_plain
+        async def slow_tool() -> str:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "done"
+
+        await asyncio.gather(*(pools.run(decision, agent, "Review", deps=None) for _ in range(3)))
+
+        assert peak == 1
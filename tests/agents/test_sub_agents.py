@@ -0,0 +1,202 @@
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+from app.agents.routing import ModelTier, RoutingDecision
+from app.agents.sub_agents import markdown_docs_reviewer, python_code_reviewer, sql_code_reviewer
+from app.analysis.markdown import SectionReviewCache
+from app.models.review_models import ReviewRequest, ReviewRuleSeverity
+from tests.analysis.test_chunking import HEADER, _function
+from tests.base import BaseTestCase
+
+
+def _reviewer_model(function) -> FunctionModel:
+    """A FunctionModel that also streams the tool call arguments of the function's response, in small pieces."""
+
+    async def stream(messages, info: AgentInfo):
+        for index, part in enumerate(function(messages, info).parts):
+            arguments = json.dumps(part.args)
+            for start in range(0, len(arguments), 20):
+                yield {
+                    index: DeltaToolCall(
+                        name=part.tool_name if not start else None, json_args=arguments[start : start + 20]
+                    )
+                }
+
+    return FunctionModel(function, stream_function=stream)
+
+
+def _report_line_6(messages, info: AgentInfo) -> ModelResponse:
+    item = {"r": "PY005", "sl": 6, "so": 1, "el": 6, "eo": 10, "p": "No error handling."}
+    return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": [item]})])
+
+
+class TestPythonCodeReviewer(BaseTestCase):
+    @pytest.mark.asyncio
+    @patch("app.agents.sub_agents.get_azure_devops_settings")
+    @patch("app.agents.sub_agents.route_review")
+    async def test_large_file_is_reviewed_in_chunks(self, mock_route, mock_settings):
+        mock_settings.return_value.REVIEW_CHUNK_MAX_TOKENS = 300
+        routing = RoutingDecision(ModelTier.STRONG, "test", line_count=0, complexity=0)
+        mock_route.return_value = routing
+        source = HEADER + "".join(_function(f"function_{n}", 20) for n in range(3))
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.STRONG: _reviewer_model(_report_line_6)}):
+            output = await python_code_reviewer(Mock(), ReviewRequest(filePath="/big.py", fileContent=source))
+
+        llm_lines = sorted(item.start_line for item in output if item.review_comment.rule_id == "PY005")
+        # Line 6 of the first chunk is line 6 of the file, of the next chunks it's the second line of their function
+        assert llm_lines == [6, 30, 54]
+
+
+class TestSqlCodeReviewer(BaseTestCase):
+    @pytest.mark.asyncio
+    @patch("app.agents.sub_agents.get_blob_content", new_callable=AsyncMock)
+    @patch("app.agents.sub_agents.route_review")
+    async def test_only_changed_statements_are_reviewed(self, mock_route, mock_get_blob):
+        mock_route.return_value = RoutingDecision(ModelTier.STRONG, "test", line_count=0, complexity=0)
+        base = "".join(f"SELECT col_{n} FROM table_{n};\n" for n in range(10))
+        mock_get_blob.return_value = base
+        source = base.replace("col_7", "col_seven")
+        seen_contents = []
+
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            seen_contents.append(messages[0].parts[1].content)
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": []})])
+
+        review_request = ReviewRequest(
+            filePath="/views.sql", fileContent=source, repositoryId="repo", originalObjectId="a" * 40
+        )
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.STRONG: _reviewer_model(reviewer)}):
+            output = await sql_code_reviewer(Mock(), review_request)
+
+        assert output is None
+        assert len(seen_contents) == 1
+        assert "col_seven" in seen_contents[0]
+        assert "col_6" not in seen_contents[0]
+        assert "lines 8" in seen_contents[0]
+
+
+class TestMarkdownDocsReviewer(BaseTestCase):
+    @pytest.mark.asyncio
+    @patch("app.agents.sub_agents.get_section_review_cache")
+    @patch("app.agents.sub_agents.route_review")
+    async def test_sections_reviewed_before_come_from_cache(self, mock_route, mock_cache):
+        mock_route.return_value = RoutingDecision(ModelTier.FAST, "test", line_count=0, complexity=0)
+        mock_cache.return_value = SectionReviewCache(max_entries=10)
+        document = "# Guide\n\nWelcome.\n\n## Usage\n\nRun it.\n"
+        calls = []
+
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            calls.append(messages)
+            item = {"r": "MD001", "sl": 1, "so": 1, "el": 1, "eo": 8, "p": "Vague heading"}
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": [item]})])
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            first = await markdown_docs_reviewer(Mock(), ReviewRequest(filePath="/docs/guide.md", fileContent=document))
+            second = await markdown_docs_reviewer(Mock(), ReviewRequest(filePath="/docs/copy.md", fileContent=document))
+
+        assert len(calls) == 1
+        assert [item.start_line for item in first] == [item.start_line for item in second] == [1]
+        assert [item.file_path for item in second] == ["/docs/copy.md"]
+
+    @pytest.mark.asyncio
+    @patch("app.agents.sub_agents.get_section_review_cache")
+    @patch("app.agents.sub_agents.route_review")
+    async def test_capped_review_is_not_cached(self, mock_route, mock_cache):
+        mock_route.return_value = RoutingDecision(ModelTier.FAST, "test", line_count=0, complexity=0)
+        mock_cache.return_value = SectionReviewCache(max_entries=10)
+        document = "# Guide\n\nWelcome.\n"
+        calls = []
+
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            calls.append(messages)
+            items = [{"r": "MD001", "sl": 1, "so": 1, "el": 1, "eo": 8, "p": f"Issue {n}"} for n in range(20)]
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": items})])
+
+        request = ReviewRequest(filePath="/docs/guide.md", fileContent=document)
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            await markdown_docs_reviewer(Mock(), request)
+            await markdown_docs_reviewer(Mock(), request)
+
+        assert len(calls) == 2
+
+
+class TestTrivialChanges(BaseTestCase):
+    @pytest.mark.asyncio
+    @patch("app.agents.sub_agents.get_blob_content", new_callable=AsyncMock)
+    async def test_whitespace_change_is_not_reviewed(self, mock_blob):
+        mock_blob.return_value = "x = 1\n\n\ny = 2\n"
+        request = ReviewRequest(
+            filePath="/settings.py",
+            fileContent="x = 1\ny = 2\n",
+            changeType="edit",
+            repositoryId="repo",
+            originalObjectId="abc",
+        )
+
+        with patch("app.agents.sub_agents.get_review_rules", new_callable=AsyncMock) as mock_rules:
+            output = await python_code_reviewer(Mock(), request)
+
+        assert "trivial (whitespace only)" in output
+        mock_rules.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.agents.sub_agents.route_review")
+    @patch("app.agents.sub_agents.get_blob_content", new_callable=AsyncMock)
+    async def test_formatting_change_is_reviewed_against_layout_rules_only(self, mock_blob, mock_route):
+        mock_blob.return_value = "x = {'a': 1,\n     'b': 2}\n"
+        mock_route.return_value = RoutingDecision(ModelTier.FAST, "test", line_count=0, complexity=0)
+        request = ReviewRequest(
+            filePath="/settings.py",
+            fileContent='x = {"a": 1, "b": 2}\n',
+            changeType="edit",
+            repositoryId="repo",
+            originalObjectId="abc",
+        )
+        prompts = []
+
+        def reviewer(messages, info: AgentInfo) -> ModelResponse:
+            prompts.append(str(messages[0]))
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response": []})])
+
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: _reviewer_model(reviewer)}):
+            output = await python_code_reviewer(Mock(), request)
+
+        assert output is None
+        assert "PY008" in prompts[0]
+        assert "PY005" not in prompts[0]
+
+
+class TestViolationCap(BaseTestCase):
+    @pytest.mark.asyncio
+    @patch("app.agents.sub_agents.route_review")
+    async def test_generation_stops_at_the_cap(self, mock_route):
+        mock_route.return_value = RoutingDecision(ModelTier.FAST, "test", line_count=0, complexity=0)
+        streamed, chunk_count = [], []
+
+        async def stream(messages, info: AgentInfo):
+            items = [
+                {"r": "GENERIC", "sl": line, "so": 1, "el": line, "eo": 5, "p": "Unclear name"} for line in range(1, 41)
+            ]
+            arguments = json.dumps({"response": items})
+            chunk_count.append(len(range(0, len(arguments), 50)))
+            for start in range(0, len(arguments), 50):
+                streamed.append(start)
+                yield {
+                    0: DeltaToolCall(
+                        name=info.output_tools[0].name if not start else None, json_args=arguments[start : start + 50]
+                    )
+                }
+
+        content = "".join(f"x{line} = {line}\n" for line in range(1, 41))
+        with patch.dict("app.agents.routing.MODELS_BY_TIER", {ModelTier.FAST: FunctionModel(stream_function=stream)}):
+            output = await python_code_reviewer(Mock(), ReviewRequest(filePath="/bad.py", fileContent=content))
+
+        assert len(output) == 16
+        assert output[-1].review_comment.rule_level == ReviewRuleSeverity.DECLINED
+        # The rest of the output was never generated
+        assert len(streamed) < chunk_count[0] / 2
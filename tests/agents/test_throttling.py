@@ -0,0 +1,104 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from pydantic_ai import Agent, ModelHTTPError
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from app.agents.throttling import AdaptiveConcurrencyLimiter, ConcurrencyLimitedModel
+from tests.base import BaseTestCase
+
+
+class TestAdaptiveConcurrencyLimiter(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded_by_the_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=2)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(6)))
+
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_limit_grows_additively_while_healthy(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=10)
+
+        for _ in range(4):
+            async with limiter.slot():
+                pass
+
+        assert limiter.limit == 3
+
+    @pytest.mark.asyncio
+    async def test_throttling_cuts_the_limit_once_for_overlapping_requests(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=1, max_limit=10, backoff_ratio=0.5)
+
+        async def throttled_request():
+            with pytest.raises(ModelHTTPError):
+                async with limiter.slot():
+                    await asyncio.sleep(0.01)
+                    raise ModelHTTPError(status_code=429, model_name="test")
+
+        await asyncio.gather(*(throttled_request() for _ in range(3)))
+        assert limiter.limit == 5
+
+        await throttled_request()
+        assert limiter.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_other_errors_leave_the_limit_alone(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=10)
+
+        with pytest.raises(ModelHTTPError):
+            async with limiter.slot():
+                raise ModelHTTPError(status_code=400, model_name="test")
+
+        assert limiter.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_rising_p95_latency_backs_off(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=1, max_limit=8, latency_window=5)
+        # Seconds per output token
+        limiter._baseline_latency = 0.00001
+
+        for _ in range(5):
+            async with limiter.slot():
+                await asyncio.sleep(0.01)
+
+        assert limiter.limit < 8
+
+    def test_long_responses_are_not_mistaken_for_a_slow_provider(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=8, latency_window=5)
+        for _ in range(5):
+            limiter._on_success(started_at=0, latency=1.0, output_tokens=50)
+
+        # A file with many findings takes 20 times as long, for 40 times the output
+        for _ in range(5):
+            limiter._on_success(started_at=0, latency=20.0, output_tokens=2000)
+
+        assert limiter.limit == 6
+
+    @pytest.mark.asyncio
+    async def test_limited_model_takes_a_slot_per_request(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        in_flight_during_request = []
+
+        def respond(messages, info):
+            in_flight_during_request.append(limiter.in_flight)
+            return ModelResponse(parts=[TextPart("ok")])
+
+        agent = Agent(model=ConcurrencyLimitedModel(FunctionModel(respond)), output_type=str)
+        with patch("app.agents.throttling.get_llm_concurrency_limiter", return_value=limiter):
+            result = await agent.run("Hi")
+
+        assert result.output == "ok"
+        assert in_flight_during_request == [1]
+        assert limiter.in_flight == 0
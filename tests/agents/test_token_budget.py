@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from app.agents.token_budget import TokenBudget, TokenBudgetedModel, estimate_input_tokens
+from app.rate_limiting import InMemoryTokenBucketBackend
+from tests.base import BaseTestCase
+
+
+class TestTokenBudget(BaseTestCase):
+    def test_estimate_counts_roughly_four_characters_per_token(self):
+        messages = [ModelRequest(parts=[UserPromptPart("x" * 400)])]
+
+        assert estimate_input_tokens(messages, ModelRequestParameters()) == 101
+
+    @pytest.mark.asyncio
+    async def test_overestimate_is_refunded_after_the_request(self):
+        backend = InMemoryTokenBucketBackend()
+        budget = TokenBudget(backend, input_tokens_per_minute=1000, output_tokens_per_minute=1000)
+
+        reservation = await budget.reserve("model", input_tokens=800, output_tokens=800)
+        await budget.settle(reservation, RequestUsage(input_tokens=100, output_tokens=50))
+
+        assert await backend.acquire("tpm:model:input", 850, rate=1000 / 60, capacity=1000) == 0
+        assert await backend.acquire("tpm:model:output", 900, rate=1000 / 60, capacity=1000) == 0
+
+    @pytest.mark.asyncio
+    async def test_request_waits_for_budget_instead_of_firing(self):
+        backend = InMemoryTokenBucketBackend()
+        budget = TokenBudget(backend, input_tokens_per_minute=600, output_tokens_per_minute=600)
+        await budget.reserve("model", input_tokens=600, output_tokens=0)
+
+        async def refill(seconds: float):
+            await backend.acquire("tpm:model:input", -600, rate=10, capacity=600, force=True)
+
+        with patch("app.agents.token_budget.asyncio.sleep", side_effect=refill) as mock_sleep:
+            await budget.reserve("model", input_tokens=100, output_tokens=0)
+
+        assert mock_sleep.call_args.args[0] == pytest.approx(10, abs=0.1)
+
+    @pytest.mark.asyncio
+    async def test_budgeted_model_settles_on_reported_usage(self):
+        budget = TokenBudget(
+            InMemoryTokenBucketBackend(), input_tokens_per_minute=10_000, output_tokens_per_minute=10_000
+        )
+
+        def respond(messages, info):
+            return ModelResponse(parts=[TextPart("ok")], usage=RequestUsage(input_tokens=7, output_tokens=3))
+
+        agent = Agent(model=TokenBudgetedModel(FunctionModel(respond)), output_type=str)
+        with (
+            patch("app.agents.token_budget.get_token_budget", return_value=budget),
+            patch.object(budget, "settle", wraps=budget.settle) as mock_settle,
+        ):
+            await agent.run("Hi")
+
+        assert mock_settle.call_args.args[1].input_tokens == 7
+
+    @pytest.mark.asyncio
+    async def test_failed_request_gives_its_budget_back(self):
+        backend = InMemoryTokenBucketBackend()
+        budget = TokenBudget(backend, input_tokens_per_minute=1000, output_tokens_per_minute=1000)
+
+        def fail(messages, info):
+            raise RuntimeError("provider down")
+
+        agent = Agent(model=TokenBudgetedModel(FunctionModel(fail)), output_type=str)
+        with patch("app.agents.token_budget.get_token_budget", return_value=budget), pytest.raises(RuntimeError):
+            await agent.run("Hi")
+
+        assert await backend.acquire("tpm:function:fail:input", 1000, rate=1000 / 60, capacity=1000) == 0
+
+    @pytest.mark.asyncio
+    async def test_aborted_stream_settles_on_the_usage_so_far(self):
+        budget = TokenBudget(
+            InMemoryTokenBucketBackend(), input_tokens_per_minute=10_000, output_tokens_per_minute=10_000
+        )
+
+        async def stream(messages, info):
+            for _ in range(10):
+                yield "word "
+
+        model = TokenBudgetedModel(FunctionModel(stream_function=stream))
+        with (
+            patch("app.agents.token_budget.get_token_budget", return_value=budget),
+            patch.object(budget, "settle", wraps=budget.settle) as mock_settle,
+        ):
+            with pytest.raises(RuntimeError):
+                async with model.request_stream(
+                    [ModelRequest(parts=[UserPromptPart("Hi")])], None, ModelRequestParameters()
+                ) as response_stream:
+                    async for _ in response_stream:
+                        raise RuntimeError("Stopped reading")
+
+        assert mock_settle.call_args.args[1].output_tokens > 0
@@ -0,0 +1,58 @@
+import pytest
+
+from app.analysis import run_static_checks
+from app.models.review_models import ReviewRuleLanguage
+from app.rules import get_review_rules
+from tests.base import BaseTestCase
+
+
+class TestStaticReview(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_checked_rules_are_removed_from_the_reviewer_rules(self):
+        rules = await get_review_rules(ReviewRuleLanguage.PYTHON)
+
+        static_review = run_static_checks(ReviewRuleLanguage.PYTHON, "/app/main.py", 'print("x")\n', rules)
+
+        remaining = {rule.id: rule for rule in static_review.remaining_rules}
+        assert {"PY001", "PY013"}.isdisjoint(remaining)
+        assert "PY005" in remaining
+        assert remaining["PY012"] == next(rule for rule in rules if rule.id == "PY012")
+        assert remaining["PY004"].code_smells == [
+            "Docstrings missing parameter or return descriptions",
+            "Inconsistent formatting of docstrings",
+        ]
+        item = static_review.items[0]
+        assert item.file_path == "/app/main.py"
+        assert item.review_comment.rule_id == "PY001"
+        assert item.review_comment.rule_title == "Use logger instead of print"
+        assert item.review_comment.rule_level == "warning"
+
+    @pytest.mark.asyncio
+    async def test_partly_checked_rules_keep_their_unchecked_code_smells(self):
+        rules = await get_review_rules(ReviewRuleLanguage.SQL)
+
+        static_review = run_static_checks(ReviewRuleLanguage.SQL, "/db/query.sql", "SELECT * FROM users;\n", rules)
+
+        remaining = {rule.id: rule for rule in static_review.remaining_rules}
+        assert "SQL006" not in remaining
+        assert remaining["SQL002"].code_smells == ["Subqueries returning unused columns"]
+        assert "Use of SELECT * in queries" in remaining["SQL002"].rule_instructions
+        assert [item.review_comment.rule_id for item in static_review.items] == ["SQL002"]
+
+    @pytest.mark.asyncio
+    async def test_unparsable_python_keeps_every_rule(self):
+        rules = await get_review_rules(ReviewRuleLanguage.PYTHON)
+
+        static_review = run_static_checks(ReviewRuleLanguage.PYTHON, "/app/main.py", "def broken(:\n", rules)
+
+        assert static_review.items == []
+        assert static_review.remaining_rules == rules
+
+    @pytest.mark.asyncio
+    async def test_markdown_has_no_static_checks(self):
+        rules = await get_review_rules(ReviewRuleLanguage.MD)
+
+        static_review = run_static_checks(ReviewRuleLanguage.MD, "/README.md", "# Title\n", rules)
+
+        assert static_review.remaining_rules == rules
+        assert static_review.merge(None) is None
@@ -0,0 +1,126 @@
+from app.analysis.chunking import Chunk, chunk_python, chunk_sql, map_to_file, merge_reviews
+from app.models.review_models import ReviewOutcomeItem
+from tests.base import BaseTestCase
+
+HEADER = '"""Module docstring."""\n\nimport os\n\n'
+
+
+def _function(name: str, body_lines: int) -> str:
+    body = "".join(f"    value_{n} = os.getenv('VARIABLE_{n}')\n" for n in range(body_lines))
+    return f"def {name}():\n{body}    return None\n\n\n"
+
+
+def _item(line: int, rule_id: str | None = "PY005", level: str = "critical") -> ReviewOutcomeItem:
+    return ReviewOutcomeItem.model_validate(
+        {
+            "filePath": "/big.py",
+            "startLine": line,
+            "startOffset": 1,
+            "endLine": line,
+            "endOffset": 5,
+            "reviewComment": {"ruleLevel": level, "ruleId": rule_id, "problemDescription": "Problem"},
+        }
+    )
+
+
+class TestPythonChunking(BaseTestCase):
+    def test_small_file_is_one_chunk(self):
+        source = HEADER + _function("small", 3)
+
+        chunks = chunk_python(source, max_tokens=1000)
+
+        assert len(chunks) == 1
+        assert chunks[0].content == source
+        assert chunks[0].describe() is None
+
+    def test_large_file_is_split_at_definitions_with_header(self):
+        source = HEADER + _function("first", 20) + _function("second", 20) + _function("third", 20)
+
+        chunks = chunk_python(source, max_tokens=300)
+
+        assert len(chunks) == 3
+        assert chunks[0].content.startswith(HEADER + "def first")
+        assert chunks[1].content.startswith(HEADER + "def second")
+        assert chunks[1].context_lines == 4
+        lines = source.splitlines()
+        # Every line of every chunk maps back to the same line in the file
+        for chunk in chunks:
+            for number, line in enumerate(chunk.content.splitlines(), start=1):
+                assert lines[chunk.to_original_line(number) - 1] == line
+
+    def test_decorators_stay_with_their_definition(self):
+        source = HEADER + _function("first", 20) + "@decorator\n" + _function("second", 20)
+
+        chunks = chunk_python(source, max_tokens=300)
+
+        assert chunks[1].content.startswith(HEADER + "@decorator\ndef second")
+
+    def test_unparsable_source_is_one_chunk(self):
+        source = HEADER + _function("first", 50) + "def broken(:\n"
+
+        assert len(chunk_python(source, max_tokens=100)) == 1
+
+
+class TestSqlChunking(BaseTestCase):
+    def test_unchanged_and_repeated_statements_are_left_out(self):
+        source = (
+            "-- Orders\n"
+            "CREATE TABLE orders (id INT);\n"
+            "\n"
+            "INSERT INTO orders VALUES (1);\n"
+            "INSERT INTO orders VALUES (2);\n"
+            "SELECT id FROM orders; SELECT 1;\n"
+            "-- The end\n"
+        )
+
+        chunking = chunk_sql(source, max_tokens=1000, base_source="CREATE TABLE orders (\n    id INT\n);")
+
+        assert (chunking.statements, chunking.unchanged, chunking.repeated) == (4, 1, 1)
+        chunk = chunking.chunks[0]
+        assert chunk.line_numbers == [3, 4, 6, 7]
+        assert chunk.content == "\nINSERT INTO orders VALUES (1);\nSELECT id FROM orders; SELECT 1;\n-- The end\n"
+        assert "lines 3-4, 6-7" in chunk.describe()
+
+    def test_statements_are_batched_within_budget(self):
+        source = "".join(f"CREATE VIEW view_{n} AS SELECT col_{n} FROM table_{n};\n" for n in range(30))
+
+        chunking = chunk_sql(source, max_tokens=50)
+
+        assert len(chunking.chunks) > 1
+        assert sum(len(chunk.line_numbers) for chunk in chunking.chunks) == 30
+
+    def test_small_file_without_skipped_statements_is_whole(self):
+        source = "SELECT id FROM orders;\n"
+
+        chunking = chunk_sql(source, max_tokens=1000)
+
+        assert chunking.chunks[0].describe() is None
+
+    def test_unchanged_file_has_nothing_to_review(self):
+        source = "SELECT id FROM orders;\n"
+
+        assert chunk_sql(source, max_tokens=1000, base_source=source).chunks == []
+
+
+class TestMergeReviews(BaseTestCase):
+    def test_findings_are_mapped_and_deduplicated(self):
+        chunk = Chunk(content="", line_numbers=[1, 2, 3, 4, *range(100, 151)], context_lines=4)
+
+        mapped = map_to_file(chunk, _item(6))
+
+        assert mapped.start_line == 101
+        assert mapped.end_line == 101
+        assert map_to_file(chunk, _item(2)).start_line == 2
+        assert map_to_file(chunk, _item(500)).start_line == 150
+
+    def test_duplicates_and_declined_items_are_merged(self):
+        merged = merge_reviews(
+            [
+                [_item(2), _item(40), _item(12, None, "declined")],
+                [_item(2), _item(101), _item(130, None, "declined")],
+                None,
+            ]
+        )
+
+        assert [item.start_line for item in merged] == [2, 40, 101, 12]
+        assert merge_reviews([None, []]) is None
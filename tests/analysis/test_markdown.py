@@ -0,0 +1,104 @@
+from app.analysis.markdown import (
+    SectionReviewCache,
+    changed_sections,
+    markdown_sections,
+    section_chunks,
+)
+from app.models.review_models import ReviewOutcomeItem
+from tests.base import BaseTestCase
+
+DOCUMENT = """Intro without heading.
+
+# Guide
+
+Welcome.
+
+## Install
+
+```bash
+# not a heading
+pip install app
+```
+
+## Usage
+
+Run it.
+
+# Reference
+"""
+
+
+def _item(line: int) -> ReviewOutcomeItem:
+    return ReviewOutcomeItem.model_validate(
+        {
+            "filePath": "/docs/guide.md",
+            "startLine": line,
+            "startOffset": 1,
+            "endLine": line,
+            "endOffset": 5,
+            "reviewComment": {"ruleLevel": "warning", "ruleId": "MD001", "problemDescription": "Vague heading"},
+        }
+    )
+
+
+class TestMarkdownSections(BaseTestCase):
+    def test_sections_follow_heading_hierarchy(self):
+        sections = markdown_sections(DOCUMENT)
+
+        assert [section.heading_path for section in sections] == [
+            [""],
+            ["Guide"],
+            ["Guide", "Install"],
+            ["Guide", "Usage"],
+            ["Reference"],
+        ]
+        install = sections[2]
+        assert (install.first_line, install.last_line) == (7, 13)
+        assert install.heading_lines == [3]
+        assert "# not a heading" in install.text
+
+    def test_only_changed_sections_are_returned(self):
+        edited = DOCUMENT.replace("Run it.", "Run it with care.")
+
+        changed = changed_sections(markdown_sections(edited), DOCUMENT)
+
+        assert [section.heading_path for section in changed] == [["Guide", "Usage"]]
+        assert changed_sections(markdown_sections(DOCUMENT), None) == markdown_sections(DOCUMENT)
+
+    def test_chunk_of_changed_section_starts_with_its_headings(self):
+        sections = markdown_sections(DOCUMENT)
+
+        chunks = section_chunks([sections[3]], DOCUMENT, max_tokens=1000)
+
+        assert len(chunks) == 1
+        assert chunks[0].content == "# Guide\n## Usage\n\nRun it.\n\n"
+        assert chunks[0].context_lines == 1
+        assert chunks[0].to_original_line(2) == 14
+
+    def test_document_that_changed_entirely_is_one_chunk(self):
+        chunks = section_chunks(markdown_sections(DOCUMENT), DOCUMENT, max_tokens=1000)
+
+        assert chunks[0].describe() is None
+
+
+class TestSectionReviewCache(BaseTestCase):
+    def test_cached_outcome_follows_moved_section(self):
+        cache = SectionReviewCache(max_entries=10)
+        usage = markdown_sections(DOCUMENT)[3]
+        cache.put(usage, "rules", [_item(14), _item(2)])
+
+        moved = markdown_sections("# Guide\n## Usage\n\nRun it.\n\n")[1]
+        items = cache.get(moved, "rules", "/docs/moved.md")
+
+        assert [item.start_line for item in items] == [2]
+        assert [item.file_path for item in items] == ["/docs/moved.md"]
+        assert cache.get(moved, "other rules", "/docs/moved.md") is None
+
+    def test_least_recently_used_section_is_evicted(self):
+        cache = SectionReviewCache(max_entries=1)
+        sections = markdown_sections(DOCUMENT)
+        cache.put(sections[1], "rules", [])
+        cache.put(sections[2], "rules", [])
+
+        assert cache.get(sections[1], "rules", "/docs/guide.md") is None
+        assert cache.get(sections[2], "rules", "/docs/guide.md") == []
@@ -0,0 +1,45 @@
+from app.analysis.positions import LineIndex, Span, repair_positions
+from app.models.review_models import ReviewOutcomeItem
+from tests.base import BaseTestCase
+
+SOURCE = """def total_price(items):
+    return sum(item.price for item in items)
+"""
+
+
+class TestLineIndex(BaseTestCase):
+    def test_valid_span_is_kept(self):
+        assert LineIndex(SOURCE).repair(1, 5, 1, 16) == Span(1, 5, 1, 16)
+
+    def test_span_is_widened_to_whole_words(self):
+        assert LineIndex(SOURCE).repair(1, 7, 1, 10) == Span(1, 5, 1, 16)
+
+    def test_positions_past_the_end_are_clamped(self):
+        assert LineIndex(SOURCE).repair(2, 12, 99, 50) == Span(2, 12, 2, 45)
+
+    def test_reversed_span_is_swapped(self):
+        assert LineIndex(SOURCE).repair(2, 5, 1, 1) == Span(1, 1, 2, 5)
+
+    def test_empty_or_missing_end_takes_the_rest_of_the_line(self):
+        line_index = LineIndex(SOURCE)
+
+        assert line_index.repair(2, 5, 2, 5) == line_index.repair(2, 5, None, None) == Span(2, 5, 2, 45)
+
+    def test_empty_file(self):
+        assert LineIndex("").repair(3, 4, 5, 6) == Span(1, 1, 1, 1)
+
+
+class TestRepairPositions(BaseTestCase):
+    def test_only_invalid_items_are_copied(self):
+        valid = ReviewOutcomeItem(filePath="/a.py", startLine=1, startOffset=5, endLine=1, endOffset=16)
+        invalid = ReviewOutcomeItem(filePath="/a.py", startLine=7, startOffset=1, endLine=7, endOffset=3)
+
+        repaired = repair_positions([valid, invalid], SOURCE)
+
+        assert repaired[0] is valid
+        assert (repaired[1].start_line, repaired[1].end_line, repaired[1].end_offset) == (2, 2, 3)
+
+    def test_items_without_a_full_position_are_left_alone(self):
+        item = ReviewOutcomeItem(filePath="/a.py", startLine=1, startOffset=7, endLine=None, endOffset=None)
+
+        assert repair_positions([item], SOURCE)[0] is item
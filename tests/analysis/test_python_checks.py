@@ -0,0 +1,75 @@
+from app.analysis.python_checks import PYTHON_CHECKS, check_python
+from tests.base import BaseTestCase
+
+ALL_RULES = set(PYTHON_CHECKS)
+
+
+def _rule_ids(source: str) -> list[str]:
+    return [finding.rule_id for finding in check_python(source, ALL_RULES)]
+
+
+class TestPythonChecks(BaseTestCase):
+    def test_print_is_raised_once_at_first_call(self):
+        source = 'import logging\n\nx = 1\nprint("é", x)\nprint(x)\n'
+
+        findings = check_python(source, {"PY001"})
+
+        assert len(findings) == 1
+        assert (findings[0].start_line, findings[0].start_offset, findings[0].end_offset) == (4, 1, 14)
+        assert "2 times" in findings[0].problem_description
+
+    def test_offsets_count_characters_not_bytes(self):
+        source = 's = "é"; print(s)\n'
+
+        finding = check_python(source, {"PY001"})[0]
+
+        assert finding.start_offset == 10
+
+    def test_missing_annotations_skip_self_and_init_return(self):
+        source = (
+            "class Client:\n"
+            '    """A client."""\n\n'
+            "    def __init__(self, url: str):\n"
+            '        """Create it."""\n\n'
+            "    def get(self, path, retries: int = 3) -> str:\n"
+            '        """Get it."""\n'
+        )
+
+        findings = check_python(source, {"PY002"})
+
+        assert len(findings) == 1
+        assert findings[0].start_line == 7
+        assert "path" in findings[0].problem_description
+        assert "return" not in findings[0].problem_description
+
+    def test_docstrings_are_required_on_all_definitions(self):
+        source = (
+            'def public() -> None:\n    """Public."""\n\n    def nested():\n        pass\n\n\n'
+            "def _private() -> None:\n    pass\n"
+        )
+
+        findings = check_python(source, {"PY004"})
+
+        assert [finding.start_line for finding in findings] == [4, 8]
+
+    def test_secrets_by_name_and_by_format(self):
+        source = (
+            'API_KEY = "3f9a1c0e5b7d2a4c"\n'
+            'token_url = "https://login.example.com/token"\n'
+            'client = connect(password="hunter2hunter2")\n'
+            'HEADERS = {"Authorization": "ghp_' + "a" * 36 + '"}\n'
+            'EMPTY_TOKEN = ""\n'
+        )
+
+        findings = check_python(source, {"PY012"})
+
+        assert [finding.start_line for finding in findings] == [1, 3, 4]
+
+    def test_wildcard_import(self):
+        assert _rule_ids("from os.path import *\n") == ["PY013"]
+
+    def test_only_requested_rules_are_checked(self):
+        assert check_python('print("x")\n', {"PY013"}) == []
+
+    def test_unparsable_source_is_left_to_the_reviewer(self):
+        assert check_python("def broken(:\n", ALL_RULES) is None
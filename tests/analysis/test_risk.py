@@ -0,0 +1,97 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.analysis.risk import changed_lines, rank_changes, risk_score
+from app.models.azure_devops.lean_models import ChangedFile, DiffSummary
+from tests.base import BaseTestCase
+
+
+def _change(path: str, change_type: str = "edit") -> ChangedFile:
+    return ChangedFile(path=path, change_type=change_type)
+
+
+class TestRiskScore(BaseTestCase):
+    def test_sensitive_paths_outrank_docs_and_tests(self):
+        auth = risk_score(_change("/app/auth.py"))
+        plain = risk_score(_change("/app/report.py"))
+        test = risk_score(_change("/tests/test_report.py"))
+        docs = risk_score(_change("/docs/usage.md"))
+
+        assert auth > plain > test > docs
+
+    def test_larger_change_and_more_churn_score_higher(self):
+        change = _change("/app/report.py")
+
+        assert risk_score(change, changed_line_count=300) > risk_score(change, changed_line_count=3)
+        assert risk_score(change, churn=1.0) > risk_score(change) > risk_score(change, churn=0.0)
+
+    def test_changed_lines_counts_additions_and_removals(self):
+        assert changed_lines("a\nb\nc\n", "a\nx\nc\n") == 2
+        assert changed_lines("a\nb\n", None) == 2
+
+
+class TestRankChanges(BaseTestCase):
+    @pytest.mark.asyncio
+    @patch("app.analysis.risk.get_commit_count", new_callable=AsyncMock)
+    async def test_changes_are_ordered_by_descending_risk(self, mock_commits):
+        mock_commits.side_effect = lambda repository_id, path, version, top: 20 if "hot" in path else 0
+        diffs = DiffSummary(
+            changes=[
+                _change("/README.md"),
+                _change("/app/cold.py"),
+                _change("/app/hot.py"),
+                _change("/infra/main.tf", "add"),
+                _change("/app/login.py", "add"),
+            ]
+        )
+
+        ranked = await rank_changes("repo", "main", diffs)
+
+        assert [change.path for change in ranked.changes] == [
+            "/app/login.py",
+            "/infra/main.tf",
+            "/app/hot.py",
+            "/app/cold.py",
+            "/README.md",
+        ]
+        # Added files have no history to look up
+        assert {call.args[1] for call in mock_commits.call_args_list} == {"/README.md", "/app/cold.py", "/app/hot.py"}
+
+    @pytest.mark.asyncio
+    @patch("app.analysis.risk.get_commit_count", new_callable=AsyncMock)
+    async def test_failed_lookup_counts_as_no_churn_for_that_file_only(self, mock_commits):
+        mock_commits.side_effect = lambda repository_id, path, version, top: 20 if "hot" in path else 1 / 0
+        diffs = DiffSummary(changes=[_change("/app/renamed.py"), _change("/app/hot.py")])
+
+        ranked = await rank_changes("repo", "main", diffs)
+
+        assert [change.path for change in ranked.changes] == ["/app/hot.py", "/app/renamed.py"]
+
+    @pytest.mark.asyncio
+    @patch("app.analysis.risk.get_azure_devops_settings")
+    @patch("app.analysis.risk.get_commit_count", new_callable=AsyncMock)
+    async def test_churn_is_only_looked_up_for_the_riskiest_files(self, mock_commits, mock_settings):
+        mock_settings.return_value.RISK_CHURN_MAX_COMMITS = 20
+        mock_settings.return_value.RISK_CHURN_MAX_FILES = 1
+        mock_settings.return_value.RISK_CHURN_CONCURRENCY = 1
+        mock_commits.return_value = 0
+        diffs = DiffSummary(changes=[_change("/docs/usage.md"), _change("/app/auth.py")])
+
+        await rank_changes("repo", "main", diffs)
+
+        assert [call.args[1] for call in mock_commits.call_args_list] == ["/app/auth.py"]
+
+    @pytest.mark.asyncio
+    @patch("app.analysis.risk.get_azure_devops_settings")
+    @patch("app.analysis.risk.get_commit_count", new_callable=AsyncMock)
+    async def test_files_without_a_lookup_dont_outrank_rarely_changed_files(self, mock_commits, mock_settings):
+        mock_settings.return_value.RISK_CHURN_MAX_COMMITS = 20
+        mock_settings.return_value.RISK_CHURN_MAX_FILES = 1
+        mock_settings.return_value.RISK_CHURN_CONCURRENCY = 1
+        mock_commits.return_value = 0
+        diffs = DiffSummary(changes=[_change("/app/looked_up.py"), _change("/app/skipped.py")])
+
+        ranked = await rank_changes("repo", "main", diffs)
+
+        assert [change.path for change in ranked.changes] == ["/app/looked_up.py", "/app/skipped.py"]
@@ -0,0 +1,72 @@
+from app.analysis.sql_checks import SQL_CHECKS, TokenKind, check_sql, split_statements, tokenize
+from tests.base import BaseTestCase
+
+ALL_RULES = set(SQL_CHECKS)
+
+
+def _findings(source: str, rule_id: str) -> list[tuple[int, int]]:
+    return [
+        (finding.start_line, finding.start_offset)
+        for finding in check_sql(source, ALL_RULES)
+        if finding.rule_id == rule_id
+    ]
+
+
+class TestSqlTokenizer(BaseTestCase):
+    def test_literals_and_comments_are_single_tokens(self):
+        tokens = tokenize("SELECT 'it''s; -- not a comment' AS \"Quoted Name\" -- comment\nFROM t /* a\nb */;")
+
+        kinds = [token.kind for token in tokens]
+        assert kinds.count(TokenKind.STRING) == 1
+        assert kinds.count(TokenKind.QUOTED_IDENTIFIER) == 1
+        assert kinds.count(TokenKind.COMMENT) == 2
+        assert (tokens[-1].line, tokens[-1].offset) == (3, 5)
+
+    def test_statements_split_on_top_level_semicolons(self):
+        statements = split_statements(tokenize("SELECT 1; SELECT ';' ; ;"))
+
+        assert len(statements) == 2
+
+
+class TestSqlChecks(BaseTestCase):
+    def test_select_star(self):
+        source = "SELECT o.*, COUNT(*), price * 2\nFROM orders o;\nSELECT DISTINCT * FROM t;"
+
+        assert _findings(source, "SQL002") == [(1, 8), (3, 17)]
+
+    def test_joins_without_condition(self):
+        source = (
+            "SELECT a.id\n"
+            "FROM a\n"
+            "    INNER JOIN b ON a.id = b.id\n"
+            "    LEFT JOIN c USING (id)\n"
+            "    CROSS JOIN d\n"
+            "    JOIN (SELECT id FROM e JOIN f ON e.id = f.id) g\n"
+            "WHERE a.id > 0;"
+        )
+
+        assert _findings(source, "SQL003") == [(5, 5), (6, 5)]
+
+    def test_joins_to_a_subquery_with_condition(self):
+        source = (
+            "SELECT a.id FROM a JOIN (SELECT id FROM b) s ON a.id = s.id;\n"
+            "SELECT a.id FROM a LEFT JOIN (SELECT id FROM b) s ON a.id = s.id;\n"
+            "SELECT a.id FROM a JOIN (SELECT id FROM b) s WHERE a.id = s.id;"
+        )
+
+        assert _findings(source, "SQL003") == [(3, 20)]
+
+    def test_capitalization_is_raised_once_per_kind(self):
+        source = "select customerId, orderTotal from orders where status = 'openOrder';"
+
+        findings = check_sql(source, {"SQL006"})
+
+        assert len(findings) == 2
+        assert "3 keywords" in findings[0].problem_description
+        assert "customerId, orderTotal" in findings[1].problem_description
+        assert "openOrder" not in findings[1].problem_description
+
+    def test_clean_sql_has_no_findings(self):
+        source = "SELECT o.order_id\nFROM orders AS o\n    INNER JOIN customers AS c\n        ON o.customer_id = c.customer_id;"
+
+        assert check_sql(source, ALL_RULES) == []
@@ -0,0 +1,71 @@
+from app.analysis.triviality import TrivialChange, classify_change, rules_for_change
+from app.models.review_models import ReviewRule, ReviewRuleLanguage
+from tests.base import BaseTestCase
+
+PYTHON = """def total(items):
+    return sum(item.price for item in items)
+"""
+
+SQL = """SELECT id, name FROM customers WHERE active = 1;
+"""
+
+
+class TestClassifyChange(BaseTestCase):
+    def test_added_file_is_not_trivial(self):
+        assert classify_change(ReviewRuleLanguage.PYTHON, PYTHON, None) is None
+
+    def test_identical_content_is_a_rename(self):
+        assert classify_change(ReviewRuleLanguage.MD, "# Title\n", "# Title\n") == TrivialChange.RENAME
+
+    def test_line_endings_are_whitespace(self):
+        assert classify_change(ReviewRuleLanguage.MD, "# Title\r\n\r\n", "# Title\n") == TrivialChange.WHITESPACE
+
+    def test_markdown_blank_lines_are_not_trivial(self):
+        assert classify_change(ReviewRuleLanguage.MD, "one\n\ntwo\n", "one\ntwo\n") is None
+
+    def test_python_trailing_whitespace_and_blank_lines(self):
+        edited = PYTHON.replace("items):", "items):   \n")
+
+        assert classify_change(ReviewRuleLanguage.PYTHON, edited, PYTHON) == TrivialChange.WHITESPACE
+
+    def test_python_comments(self):
+        edited = "# Totals\n" + PYTHON.replace("items)\n", "items)  # all of them\n")
+
+        assert classify_change(ReviewRuleLanguage.PYTHON, edited, PYTHON) == TrivialChange.COMMENTS
+
+    def test_python_formatter_output(self):
+        base = "x = {'a': 1,\n     'b': 2}\n"
+        formatted = 'x = {"a": 1, "b": 2}\n'
+
+        assert classify_change(ReviewRuleLanguage.PYTHON, formatted, base) == TrivialChange.FORMATTING
+
+    def test_python_docstring_is_not_trivial(self):
+        edited = PYTHON.replace("items):\n", 'items):\n    """Sum of the prices."""\n')
+
+        assert classify_change(ReviewRuleLanguage.PYTHON, edited, PYTHON) is None
+
+    def test_python_code_change_is_not_trivial(self):
+        assert classify_change(ReviewRuleLanguage.PYTHON, PYTHON.replace("price", "cost"), PYTHON) is None
+
+    def test_sql_layout_and_comments(self):
+        reformatted = "SELECT id, name\nFROM customers\nWHERE active = 1;\n"
+        commented = "-- Active customers\n" + SQL
+
+        assert classify_change(ReviewRuleLanguage.SQL, reformatted, SQL) == TrivialChange.FORMATTING
+        assert classify_change(ReviewRuleLanguage.SQL, commented, SQL) == TrivialChange.COMMENTS
+
+    def test_sql_keyword_case_is_not_trivial(self):
+        assert classify_change(ReviewRuleLanguage.SQL, SQL.lower(), SQL) is None
+
+
+class TestRulesForChange(BaseTestCase):
+    def test_trivial_changes_keep_the_rules_they_can_violate(self):
+        rules = [
+            ReviewRule(id=rule_id, title=rule_id, description="", severity="warning", code_smells=[])
+            for rule_id in ("PY005", "PY008", "PY011")
+        ]
+
+        assert rules_for_change(rules, None) == rules
+        assert [rule.id for rule in rules_for_change(rules, TrivialChange.COMMENTS)] == ["PY011"]
+        assert [rule.id for rule in rules_for_change(rules, TrivialChange.FORMATTING)] == ["PY008"]
+        assert rules_for_change(rules, TrivialChange.WHITESPACE) == []
@@ -0,0 +1,41 @@
+import json
+import os
+
+import pytest
+
+from app.agents.token_budget import CHARS_PER_TOKEN
+from app.models.review_models import CompactFinding, ReviewRule
+
+RULE = ReviewRule(
+    id="PY005",
+    title="Handle errors explicitly",
+    description="Calls that can fail must handle their errors.",
+    severity="error",
+    code_smells=["requests.get("],
+)
+
+
+@pytest.mark.skipif(not os.getenv("BENCHMARK"), reason="Benchmarks are skipped unless BENCHMARK is set")
+class TestOutputSchemaBenchmark:
+    @pytest.mark.parametrize(
+        "description, fix",
+        [
+            ("Missing error handling.", None),
+            (
+                "The HTTP call to the billing API has no error handling, so a failed request crashes the export job.",
+                "Catch the request exceptions and log or retry.",
+            ),
+        ],
+    )
+    def test_output_tokens_per_finding(self, description, fix):
+        finding = CompactFinding(r=RULE.id, sl=42, so=5, el=44, eo=18, p=description, x=fix)
+        full = finding.expand("/billing/export.py", {RULE.id: RULE})
+
+        full_chars = len(json.dumps(full.model_dump(mode="json", by_alias=True)))
+        compact_chars = len(json.dumps(finding.model_dump(mode="json", by_alias=True)))
+
+        print(
+            f"\nOutput tokens per finding: full={full_chars // CHARS_PER_TOKEN} "
+            f"compact={compact_chars // CHARS_PER_TOKEN} ({1 - compact_chars / full_chars:.0%} less)"
+        )
+        assert compact_chars < full_chars
@@ -0,0 +1,73 @@
+import json
+import os
+import time
+from unittest.mock import patch, AsyncMock
+
+import pytest
+from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi.testclient import TestClient
+
+from app.admission import ReviewAdmissionController
+from app.dependencies import get_token_claims
+from app.models.azure_devops.pull_request_models import AzureDevOpsWebhookEvent, WebhookEventEnvelope
+from app.routers.webhooks import create_pull_request
+from tests.fixtures.azure_devops import build_webhook_event
+
+PAYLOAD_SIZE_BYTES = 50_000
+REQUESTS = 500
+
+
+def _build_benchmark_app() -> FastAPI:
+    """The webhook handler before and after the fast path, side by side and without auth or rate limiting."""
+    bench_app = FastAPI()
+
+    @bench_app.post("/before")
+    async def full_validation(pr_body: AzureDevOpsWebhookEvent, background_tasks: BackgroundTasks):
+        if not pr_body.resource.pull_request_id:
+            raise HTTPException(status_code=422, detail="Invalid pull request body")
+        background_tasks.add_task(lambda: None)
+        return {"status": "Accepted"}
+
+    bench_app.post("/after", status_code=202)(create_pull_request)
+    bench_app.dependency_overrides[get_token_claims] = lambda: {"sub": "benchmark"}
+    return bench_app
+
+
+def _requests_per_second(client: TestClient, path: str, events: list[dict]) -> float:
+    bodies = [json.dumps(event) for event in events]
+    start = time.perf_counter()
+    for body in bodies:
+        response = client.post(path, content=body, headers={"Content-Type": "application/json"})
+        assert response.status_code in (200, 202)
+    return len(bodies) / (time.perf_counter() - start)
+
+
+@pytest.mark.skipif(not os.getenv("BENCHMARK"), reason="Benchmarks are skipped unless BENCHMARK is set")
+class TestWebhookIngestionBenchmark:
+    def test_validation_throughput(self):
+        body = json.dumps(build_webhook_event(PAYLOAD_SIZE_BYTES))
+
+        timings = {}
+        for name, model in [("full", AzureDevOpsWebhookEvent), ("envelope", WebhookEventEnvelope)]:
+            start = time.perf_counter()
+            for _ in range(REQUESTS):
+                model.model_validate_json(body)
+            timings[name] = REQUESTS / (time.perf_counter() - start)
+
+        print(f"\nValidations/sec on a {len(body)} byte payload: {timings}")
+        assert timings["envelope"] > timings["full"]
+
+    @patch("app.routers.webhooks.get_review_admission")
+    @patch("app.routers.webhooks.process_pull_request_event", new_callable=AsyncMock)
+    def test_webhook_requests_per_second(self, mock_process, mock_admission):
+        # The mocked worker never starts a review, so admission control would fill up and refuse most requests
+        mock_admission.return_value = ReviewAdmissionController(max_in_flight=1, max_queued=REQUESTS)
+        # Unique event ids, otherwise the fast path would answer most requests from its deduplication check
+        events = [build_webhook_event(PAYLOAD_SIZE_BYTES) for _ in range(REQUESTS)]
+
+        with TestClient(_build_benchmark_app()) as client:
+            before = _requests_per_second(client, "/before", events)
+            after = _requests_per_second(client, "/after", events)
+
+        print(f"\nWebhook requests/sec with ~{PAYLOAD_SIZE_BYTES} byte payloads: before={before:.0f} after={after:.0f}")
+        assert after > before
@@ -0,0 +1,45 @@
+import copy
+import json
+import uuid
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent
+
+
+def load_fixture(name: str) -> dict:
+    return json.loads(FIXTURES_DIR.joinpath(name).read_text())
+
+
+def build_webhook_event(min_size_bytes: int = 0) -> dict:
+    """A git.pullrequest.created event around the pull request fixture, padded with commits up to min_size_bytes."""
+    pull_request = load_fixture("pull_request.json")
+    event = {
+        "subscriptionId": "00ca946b-2fe9-4f2a-ae2f-40d5c48001bc",
+        "notificationId": 3,
+        "id": str(uuid.uuid4()),
+        "eventType": "git.pullrequest.created",
+        "publisherId": "tfs",
+        "message": {
+            "text": "Jamal Hartnett created a new pull request",
+            "markdown": "Jamal Hartnett created a new pull request",
+        },
+        "detailedMessage": {
+            "text": f"Jamal Hartnett created a new pull request\r\n\r\n- {pull_request['title']}\r\n",
+            "markdown": f"Jamal Hartnett created a new pull request\r\n\r\n+ {pull_request['title']}\r\n",
+        },
+        "resource": pull_request,
+        "resourceVersion": "1.0",
+        "resourceContainers": {
+            "collection": {"id": "c12d0eb8-e382-443b-9f9c-c52cba5014c2"},
+            "account": {"id": "f844ec47-a9db-4511-8281-8b63f4eaf94e"},
+            "project": {"id": "be9b3917-87e6-42a4-a549-2bc06a7a878f"},
+        },
+        "createdDate": "2025-10-08T09:41:12.7082035Z",
+    }
+
+    template_commit = pull_request["commits"][0]
+    while len(json.dumps(event)) < min_size_bytes:
+        commit = copy.deepcopy(template_commit)
+        commit["commitId"] = uuid.uuid4().hex + uuid.uuid4().hex[:8]
+        pull_request["commits"].append(commit)
+    return event
@@ -0,0 +1,69 @@
+import zlib
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.mcp import operations
+from app.mcp.blob_cache import BlobContentCache
+from tests.base import BaseTestCase
+
+OBJECT_ID_A = "a" * 40
+OBJECT_ID_B = "b" * 40
+OBJECT_ID_C = "c" * 40
+
+
+class TestBlobContentCache(BaseTestCase):
+    def test_least_recently_used_blob_is_evicted_when_over_budget(self):
+        cache = BlobContentCache(max_bytes=10)
+        cache.put(OBJECT_ID_A, "aaaa")
+        cache.put(OBJECT_ID_B, "bbbb")
+        cache.get(OBJECT_ID_A)
+        cache.put(OBJECT_ID_C, "cccc")
+
+        assert cache.get(OBJECT_ID_A) == "aaaa"
+        assert cache.get(OBJECT_ID_B) is None
+        assert cache.get(OBJECT_ID_C) == "cccc"
+        assert cache.current_bytes == 8
+
+    def test_blob_larger_than_budget_is_not_kept_in_memory(self):
+        cache = BlobContentCache(max_bytes=3)
+        cache.put(OBJECT_ID_A, "aaaa")
+
+        assert cache.get(OBJECT_ID_A) is None
+        assert cache.current_bytes == 0
+
+    def test_blobs_survive_in_compressed_disk_tier(self, temp_storage_dir):
+        BlobContentCache(max_bytes=1024, disk_dir=temp_storage_dir).put(OBJECT_ID_A, "print('hello')")
+
+        stored_file = temp_storage_dir.joinpath(OBJECT_ID_A[:2], OBJECT_ID_A[2:])
+        assert zlib.decompress(stored_file.read_bytes()) == b"print('hello')"
+
+        fresh_cache = BlobContentCache(max_bytes=1024, disk_dir=temp_storage_dir)
+        assert fresh_cache.get(OBJECT_ID_A) == "print('hello')"
+
+    def test_invalid_object_ids_are_ignored(self, temp_storage_dir):
+        cache = BlobContentCache(max_bytes=1024, disk_dir=temp_storage_dir)
+        cache.put("../../etc/passwd", "nope")
+
+        assert cache.get("../../etc/passwd") is None
+        assert list(temp_storage_dir.iterdir()) == []
+
+
+class TestGetBlobContent(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_blob_is_fetched_once_and_then_served_from_cache(self):
+        object_id = OBJECT_ID_A
+        blob_cache = BlobContentCache(max_bytes=1024)
+
+        with (
+            patch("app.mcp.operations.get_blob_cache", return_value=blob_cache),
+            patch.object(
+                operations.AZDO_REST_CLIENT, "make_get_request", new=AsyncMock(return_value={"content": "SELECT 1;"})
+            ) as mock_get,
+        ):
+            first = await operations.get_blob_content("repo", object_id)
+            second = await operations.get_blob_content("repo", object_id)
+
+        assert first == second == "SELECT 1;"
+        mock_get.assert_awaited_once()
+        assert mock_get.call_args.args == (f"git/repositories/repo/blobs/{object_id}", {"$format": "text"})
@@ -0,0 +1,87 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.mcp.cache import ReviewReadCache, cached_read, get_active_review_cache, review_cache_scope
+from app.mcp.operations import AZDO_REST_CLIENT, create_thread, get_item
+from app.models.azure_devops.comment_thread_models import Comment, CommentPosition, CommentThreadContext
+from app.models.azure_devops.enums import GitVersionType
+from tests.base import BaseTestCase
+
+
+class TestReviewReadCache(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_reads_share_one_fetch(self):
+        cache = ReviewReadCache()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        results = await asyncio.gather(*(cache.get_or_fetch("key", fetch) for _ in range(5)))
+
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+
+    @pytest.mark.asyncio
+    async def test_failed_reads_are_not_cached(self):
+        cache = ReviewReadCache()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ValueError("Transient error")
+            return "ok"
+
+        with pytest.raises(ValueError):
+            await cache.get_or_fetch("key", fetch)
+
+        assert await cache.get_or_fetch("key", fetch) == "ok"
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_reads_are_memoized_within_a_review_and_discarded_after(self):
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        async with review_cache_scope():
+            assert await cached_read("git/repositories", {"a": 1}, fetch) == 1
+            assert await cached_read("git/repositories", {"a": 1}, fetch) == 1
+            assert await cached_read("git/repositories", {"a": 2}, fetch) == 2
+
+        assert get_active_review_cache() is None
+        assert await cached_read("git/repositories", {"a": 1}, fetch) == 3
+
+
+class TestThreadPositions(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_positions_are_repaired_against_the_file_read_in_the_review(self):
+        content = "import os\nprint(os.getcwd())\n"
+        thread_context = CommentThreadContext(
+            filePath="/main.py",
+            rightFileStart=CommentPosition(line=2, offset=11),
+            rightFileEnd=CommentPosition(line=4, offset=30),
+        )
+        fetched_item = {"objectId": "b" * 40, "path": "/main.py", "content": content, "isFolder": False}
+
+        with (
+            patch.object(AZDO_REST_CLIENT, "make_get_request", AsyncMock(return_value=fetched_item)),
+            patch.object(AZDO_REST_CLIENT, "make_post_request", AsyncMock(return_value={"id": 1})) as mock_post,
+        ):
+            async with review_cache_scope():
+                await get_item("repo", "main.py", "feature", GitVersionType.BRANCH)
+                await create_thread("repo", 1, [Comment(content="Hardcoded path")], thread_context)
+
+        posted = mock_post.call_args.args[1]["threadContext"]
+        assert posted["rightFileStart"] == {"line": 2, "offset": 10}
+        assert posted["rightFileEnd"] == {"line": 2, "offset": 19}
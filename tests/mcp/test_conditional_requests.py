@@ -0,0 +1,62 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from pydantic import BaseModel
+
+from app.mcp import AzureDevOpsClient, ConditionalResponseCache, CachedResponse
+from tests.base import BaseTestCase
+
+
+class DummyModel(BaseModel):
+    name: str
+
+
+class TestConditionalResponseCache(BaseTestCase):
+    def test_entries_expire_after_ttl(self):
+        cache = ConditionalResponseCache(max_entries=10, ttl_seconds=0)
+        cache.put("key", CachedResponse(etag='"1"', last_modified=None, model=DummyModel(name="a")))
+
+        assert cache.get("key") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ConditionalResponseCache(max_entries=2, ttl_seconds=60)
+        for key in ["a", "b"]:
+            cache.put(key, CachedResponse(etag=key, last_modified=None, model=DummyModel(name=key)))
+        cache.get("a")
+        cache.put("c", CachedResponse(etag="c", last_modified=None, model=DummyModel(name="c")))
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+
+class TestConditionalGetModel(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_not_modified_response_is_served_from_cache(self):
+        client = AzureDevOpsClient()
+        first_response = httpx.Response(
+            200, json={"name": "repo"}, headers={"ETag": '"abc"', "Content-Type": "application/json"}
+        )
+        not_modified_response = httpx.Response(304)
+
+        with patch.object(
+            client, "_send_get_request", new_callable=AsyncMock, side_effect=[first_response, not_modified_response]
+        ) as mock_send:
+            first = await client.get_model("git/repositories", DummyModel)
+            second = await client.get_model("git/repositories", DummyModel)
+
+        assert second is first
+        assert mock_send.call_args_list[0].args[2] == {}
+        assert mock_send.call_args_list[1].args[2] == {"If-None-Match": '"abc"'}
+
+    @pytest.mark.asyncio
+    async def test_responses_without_validators_are_not_cached(self):
+        client = AzureDevOpsClient()
+        response = httpx.Response(200, json={"name": "repo"}, headers={"Content-Type": "application/json"})
+
+        with patch.object(client, "_send_get_request", new_callable=AsyncMock, return_value=response) as mock_send:
+            await client.get_model("git/repositories", DummyModel)
+            await client.get_model("git/repositories", DummyModel)
+
+        assert mock_send.call_args_list[1].args[2] == {}
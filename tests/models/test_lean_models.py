@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+
+import pydantic_core
+
+from app.models.azure_devops.git_models import GitCommitDiffs
+from app.models.azure_devops.lean_models import DiffSummary, PullRequestSummary
+from app.models.azure_devops.pull_request_models import GitPullRequest
+from tests.base import BaseTestCase
+
+FIXTURES = Path(__file__).parent.parent.joinpath("fixtures", "azure_devops")
+
+
+def _serialized_size(model) -> int:
+    """Size of the tool response as FastMCP serializes it into the coordinator's context."""
+    return len(pydantic_core.to_json(model))
+
+
+class TestLeanModels(BaseTestCase):
+    def test_pull_request_summary_keeps_what_the_workflow_needs(self):
+        pull_request = GitPullRequest.model_validate(json.loads(FIXTURES.joinpath("pull_request.json").read_text()))
+        summary = PullRequestSummary.from_pull_request(pull_request)
+
+        assert summary.repository_id == "3411ebc1-d5aa-464f-9615-0b527bc66719"
+        assert summary.source_ref_name == "refs/heads/feature/billing-export"
+        assert summary.target_ref_name == "refs/heads/main"
+        # 13.9 KB -> 0.3 KB on this fixture
+        assert _serialized_size(summary) < 0.05 * _serialized_size(pull_request)
+
+    def test_diff_summary_drops_folders_and_keeps_object_ids(self):
+        diffs = GitCommitDiffs.model_validate(json.loads(FIXTURES.joinpath("diffs.json").read_text()))
+        summary = DiffSummary.from_diffs(diffs)
+
+        assert [change.path for change in summary.changes if change.path in ("/billing", "/docs")] == []
+        edited = next(change for change in summary.changes if change.path == "/billing/upload.py")
+        assert edited.change_type == "edit"
+        assert edited.object_id is not None
+        assert edited.original_object_id is not None
+        # 5.0 KB -> 1.2 KB on this fixture
+        assert _serialized_size(summary) < 0.3 * _serialized_size(diffs)
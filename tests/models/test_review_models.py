@@ -0,0 +1,44 @@
+from app.models.review_models import CompactFinding, ReviewRule, ReviewRuleSeverity
+from tests.base import BaseTestCase
+
+RULE = ReviewRule(
+    id="PY005",
+    title="Handle errors explicitly",
+    description="Calls that can fail must handle their errors.",
+    severity="error",
+    code_smells=["requests.get("],
+)
+
+
+def _finding(rule_id: str) -> CompactFinding:
+    return CompactFinding.model_validate(
+        {"r": rule_id, "sl": 3, "so": 5, "el": 4, "eo": 9, "p": "No error handling.", "x": "Catch the error."}
+    )
+
+
+class TestCompactFinding(BaseTestCase):
+    def test_expand_looks_up_rule(self):
+        item = _finding("PY005").expand("/billing/export.py", {RULE.id: RULE})
+
+        assert item.file_path == "/billing/export.py"
+        assert (item.start_line, item.start_offset, item.end_line, item.end_offset) == (3, 5, 4, 9)
+        assert item.review_comment.rule_level == ReviewRuleSeverity.ERROR
+        assert item.review_comment.rule_title == "Handle errors explicitly"
+        assert item.review_comment.rule_id == "PY005"
+        assert item.review_comment.expected_fix == "Catch the error."
+
+    def test_generic_declined_and_unknown_rules(self):
+        rules_by_id = {RULE.id: RULE}
+
+        generic = _finding("GENERIC").expand("/a.py", rules_by_id).review_comment
+        declined = _finding("DECLINED").expand("/a.py", rules_by_id).review_comment
+        made_up = _finding("PY999").expand("/a.py", rules_by_id).review_comment
+
+        assert (generic.rule_level, generic.rule_id) == (ReviewRuleSeverity.GENERIC, None)
+        assert declined.rule_level == ReviewRuleSeverity.DECLINED
+        assert (made_up.rule_level, made_up.rule_id) == (ReviewRuleSeverity.GENERIC, None)
+
+    def test_expand_all_keeps_none_for_no_issues(self):
+        assert CompactFinding.expand_all(None, "/a.py", [RULE]) is None
+        assert CompactFinding.expand_all([], "/a.py", [RULE]) is None
+        assert len(CompactFinding.expand_all([_finding("PY005")], "/a.py", [RULE])) == 1
@@ -1,10 +1,15 @@
+import json
 from datetime import datetime, UTC, timedelta
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock, Mock
 
 import jwt
+import pytest
 
+from app.admission import ReviewAdmissionController
 from app.models.webhooks import TokenValidationResponse
+from app.routers.webhooks import process_pull_request_event
 from tests.base import BaseTestCase
+from tests.fixtures.azure_devops import build_webhook_event
 
 
 class TestWebhookTokens(BaseTestCase):
@@ -52,3 +57,103 @@ class TestWebhookTokens(BaseTestCase):
         validation_response = TokenValidationResponse(**result.json())
         assert not validation_response.valid
         assert "expired" in validation_response.reason.lower()
+
+
+class TestPullRequestWebhook(BaseTestCase):
+    def _auth_header(self, mock_settings, client_name: str) -> dict:
+        secret_key = "234"
+        mock_settings.return_value.JWT_SECRET_STRING = secret_key
+        payload = {"sub": client_name, "iat": datetime.now(UTC), "exp": datetime.now(UTC) + timedelta(days=90)}
+        return {"Authorization": f"Bearer {jwt.encode(payload, secret_key, algorithm='HS256')}"}
+
+    @patch("app.routers.webhooks.process_pull_request_event", new_callable=AsyncMock)
+    @patch("app.dependencies.get_azure_devops_settings")
+    def test_event_is_accepted_and_deferred_to_the_worker(self, mock_settings, mock_process):
+        event = build_webhook_event()
+
+        response = self.client.post(
+            "/webhooks/pull-request/created", json=event, headers=self._auth_header(mock_settings, "accept")
+        )
+
+        assert response.status_code == 202
+        mock_process.assert_called_once()
+        assert json.loads(mock_process.call_args.args[0])["id"] == event["id"]
+
+    @patch("app.routers.webhooks.process_pull_request_event", new_callable=AsyncMock)
+    @patch("app.dependencies.get_azure_devops_settings")
+    def test_duplicate_event_is_processed_once(self, mock_settings, mock_process):
+        event = build_webhook_event()
+        headers = self._auth_header(mock_settings, "duplicate")
+
+        self.client.post("/webhooks/pull-request/created", json=event, headers=headers)
+        response = self.client.post("/webhooks/pull-request/created", json=event, headers=headers)
+
+        assert response.json() == {"status": "Duplicate"}
+        mock_process.assert_called_once()
+
+    @patch("app.routers.webhooks.process_pull_request_event", new_callable=AsyncMock)
+    @patch("app.dependencies.get_azure_devops_settings")
+    def test_event_without_pull_request_id_is_rejected(self, mock_settings, mock_process):
+        event = build_webhook_event()
+        del event["resource"]["pullRequestId"]
+
+        response = self.client.post(
+            "/webhooks/pull-request/created", json=event, headers=self._auth_header(mock_settings, "reject")
+        )
+
+        assert response.status_code == 422
+        mock_process.assert_not_called()
+
+    @patch("app.routers.webhooks.get_review_admission")
+    @patch("app.routers.webhooks.process_pull_request_event", new_callable=AsyncMock)
+    @patch("app.dependencies.get_azure_devops_settings")
+    def test_event_is_refused_when_saturated_and_accepted_on_redelivery(
+        self, mock_settings, mock_process, mock_admission
+    ):
+        admission = ReviewAdmissionController(max_in_flight=1, max_queued=0)
+        mock_admission.return_value = admission
+        event = build_webhook_event()
+        headers = self._auth_header(mock_settings, "saturated")
+
+        admission.reserve()
+        refused = self.client.post("/webhooks/pull-request/created", json=event, headers=headers)
+        admission.withdraw()
+        redelivered = self.client.post("/webhooks/pull-request/created", json=event, headers=headers)
+
+        assert refused.status_code == 503
+        assert int(refused.headers["Retry-After"]) >= 1
+        assert redelivered.status_code == 202
+        mock_process.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("app.routers.webhooks.review_created_pull_request", new_callable=AsyncMock)
+    async def test_worker_reviews_fully_validated_event(self, mock_review):
+        event = build_webhook_event()
+
+        await process_pull_request_event(json.dumps(event).encode(), Mock())
+
+        assert mock_review.call_args.args[0] == 221
+
+    @pytest.mark.asyncio
+    @patch("app.routers.webhooks.review_created_pull_request", new_callable=AsyncMock)
+    async def test_worker_drops_event_that_fails_full_validation(self, mock_review):
+        event = build_webhook_event()
+        del event["resource"]["repository"]
+
+        await process_pull_request_event(json.dumps(event).encode(), Mock())
+
+        mock_review.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.routers.webhooks.get_azure_devops_settings")
+    @patch("app.routers.webhooks.run_deferred_reviews", new_callable=AsyncMock)
+    @patch("app.routers.webhooks.review_created_pull_request", new_callable=AsyncMock)
+    async def test_worker_defers_review_of_draft(self, mock_review, mock_deferred, mock_settings):
+        mock_settings.return_value.DEFER_DRAFT_REVIEWS = True
+        event = build_webhook_event()
+        event["resource"]["isDraft"] = True
+
+        await process_pull_request_event(json.dumps(event).encode(), Mock())
+
+        mock_deferred.assert_awaited_once_with([221])
+        mock_review.assert_not_called()
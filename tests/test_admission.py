@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.admission import ReviewAdmissionController
+from tests.base import BaseTestCase
+
+
+class TestReviewAdmission(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_in_flight_reviews_are_bounded_and_start_in_order(self):
+        admission = ReviewAdmissionController(max_in_flight=2, max_queued=10)
+        release = asyncio.Event()
+        started = []
+        peak = 0
+
+        async def review(number: int):
+            nonlocal peak
+            admission.reserve()
+            async with admission.running():
+                started.append(number)
+                peak = max(peak, admission.in_flight)
+                await release.wait()
+
+        tasks = [asyncio.create_task(review(number)) for number in range(5)]
+        await asyncio.sleep(0)
+        assert started == [0, 1]
+        assert admission.queued == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        assert started == [0, 1, 2, 3, 4]
+        assert peak == 2
+        assert admission.in_flight == 0 and admission.queued == 0
+
+    def test_reservation_is_refused_when_queue_is_full(self):
+        admission = ReviewAdmissionController(max_in_flight=1, max_queued=1, initial_duration_seconds=30)
+        admission.reserve()
+        admission.reserve()
+
+        with pytest.raises(HTTPException) as exc_info:
+            admission.reserve()
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "30"
+
+        admission.withdraw()
+        admission.reserve()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_gives_up_its_place(self):
+        admission = ReviewAdmissionController(max_in_flight=1, max_queued=10)
+        release = asyncio.Event()
+
+        async def review():
+            async with admission.running():
+                await release.wait()
+
+        first = asyncio.create_task(review())
+        second = asyncio.create_task(review())
+        third = asyncio.create_task(review())
+        await asyncio.sleep(0)
+        second.cancel()
+        release.set()
+        await asyncio.gather(first, third)
+
+        assert second.cancelled()
+        assert admission.in_flight == 0
@@ -1,11 +1,14 @@
+import time
 from datetime import datetime, UTC, timedelta
 from unittest.mock import patch, Mock
 
 import jwt
 import pytest
-from fastapi import HTTPException, Request
+from fastapi import HTTPException, Request, Response
 
-from app.dependencies import validate_authorization_header, _extract_auth_header
+from app.auth import TokenVerificationCache, verify_token
+from app.dependencies import RateLimiter, get_token_claims, _extract_auth_header
+from app.rate_limiting import InMemoryTokenBucketBackend
 from tests.base import BaseTestCase
 
 
@@ -13,7 +16,7 @@ class TestDependencies(BaseTestCase):
     @pytest.mark.asyncio
     async def test_authorization_header_must_start_with_bearer(self):
         with pytest.raises(HTTPException):
-            await validate_authorization_header(authorization="Nonsense")
+            await get_token_claims(authorization="Nonsense")
 
     @pytest.mark.asyncio
     @patch("app.dependencies.get_azure_devops_settings")
@@ -23,16 +26,16 @@ class TestDependencies(BaseTestCase):
         secret_key = "234"
         mock_settings.return_value.JWT_SECRET_STRING = secret_key
         token = jwt.encode(payload, secret_key, algorithm="HS256")
-        result = await validate_authorization_header(authorization=f"Bearer {token}")
+        result = await get_token_claims(authorization=f"Bearer {token}")
 
-        assert result == f"Bearer {token}"
+        assert result["sub"] == "youri"
 
     @pytest.mark.asyncio
     @patch("app.dependencies.get_azure_devops_settings")
     async def test_authorization_header_with_invalid_token_is_rejected(self, mock_settings):
         mock_settings.return_value.JWT_SECRET_STRING = "123"
         with pytest.raises(HTTPException) as exc_info:
-            await validate_authorization_header(authorization="Bearer madness")
+            await get_token_claims(authorization="Bearer madness")
 
         assert "invalid" in exc_info.value.detail.lower()
 
@@ -45,7 +48,7 @@ class TestDependencies(BaseTestCase):
         mock_settings.return_value.JWT_SECRET_STRING = secret_key
         token = jwt.encode(payload, secret_key, algorithm="HS256")
         with pytest.raises(HTTPException) as exc_info:
-            await validate_authorization_header(authorization=f"Bearer {token}")
+            await get_token_claims(authorization=f"Bearer {token}")
 
         assert "expired" in exc_info.value.detail.lower()
 
@@ -60,3 +63,99 @@ class TestDependencies(BaseTestCase):
         mock.headers = {}
 
         assert _extract_auth_header(mock) == "unknown"
+
+
+class TestTokenVerificationCache(BaseTestCase):
+    def _token(self, secret_key: str, expires_in: timedelta) -> str:
+        payload = {"sub": "youri", "iat": datetime.now(UTC), "exp": datetime.now(UTC) + expires_in}
+        return jwt.encode(payload, secret_key, algorithm="HS256")
+
+    @patch("app.auth.get_token_verification_cache")
+    def test_token_signature_is_verified_once(self, mock_get_cache):
+        mock_get_cache.return_value = TokenVerificationCache(max_entries=10, ttl_seconds=60)
+        token = self._token("234", timedelta(days=1))
+
+        with patch("app.auth.jwt.decode", wraps=jwt.decode) as mock_decode:
+            first_claims = verify_token(token, "234")
+            second_claims = verify_token(token, "234")
+
+        assert mock_decode.call_count == 1
+        assert second_claims == first_claims
+        assert first_claims["sub"] == "youri"
+
+    @patch("app.auth.get_token_verification_cache")
+    def test_cached_token_is_verified_again_for_another_secret(self, mock_get_cache):
+        mock_get_cache.return_value = TokenVerificationCache(max_entries=10, ttl_seconds=60)
+        token = self._token("234", timedelta(days=1))
+        verify_token(token, "234")
+
+        with pytest.raises(jwt.InvalidSignatureError):
+            verify_token(token, "567")
+
+    def test_entry_never_outlives_token_expiry(self):
+        cache = TokenVerificationCache(max_entries=10, ttl_seconds=3600)
+        cache.put(b"key", {"sub": "youri", "exp": time.time() - 1})
+
+        assert cache.get(b"key") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TokenVerificationCache(max_entries=1, ttl_seconds=3600)
+        cache.put(b"first", {"sub": "a"})
+        cache.put(b"second", {"sub": "b"})
+
+        assert cache.get(b"first") is None
+        assert cache.get(b"second") == {"sub": "b"}
+
+
+class TestRateLimiter(BaseTestCase):
+    @staticmethod
+    def _request(token: str) -> Request:
+        return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+    @pytest.mark.asyncio
+    @patch("app.dependencies.get_azure_devops_settings")
+    @patch("app.dependencies.get_token_bucket_backend")
+    async def test_quota_is_shared_by_all_tokens_of_a_client(self, mock_backend, mock_settings):
+        mock_backend.return_value = InMemoryTokenBucketBackend()
+        mock_settings.return_value.JWT_SECRET_STRING = "secret"
+        tokens = [jwt.encode({"sub": "client-a", "jti": str(i)}, "secret", algorithm="HS256") for i in range(3)]
+        limiter = RateLimiter(scope="test", times=2, seconds=60)
+
+        await limiter(self._request(tokens[0]), Response())
+        await limiter(self._request(tokens[1]), Response())
+        with pytest.raises(HTTPException) as exc_info:
+            await limiter(self._request(tokens[2]), Response())
+
+        assert exc_info.value.status_code == 429
+        assert int(exc_info.value.headers["Retry-After"]) == 30
+
+    @pytest.mark.asyncio
+    @patch("app.dependencies.get_azure_devops_settings")
+    @patch("app.dependencies.get_token_bucket_backend")
+    async def test_scopes_and_client_quotas_are_separate(self, mock_backend, mock_settings):
+        mock_backend.return_value = InMemoryTokenBucketBackend()
+        mock_settings.return_value.JWT_SECRET_STRING = "secret"
+        token = jwt.encode({"sub": "big-client"}, "secret", algorithm="HS256")
+        cheap = RateLimiter(scope="cheap", times=1, seconds=60)
+        reviews = RateLimiter(scope="reviews", times=1, seconds=60, quotas={"big-client": 3})
+
+        await cheap(self._request(token), Response())
+        for _ in range(3):
+            response = Response()
+            await reviews(self._request(token), response)
+
+        assert response.headers["X-RateLimit-Limit"] == "3"
+        with pytest.raises(HTTPException):
+            await cheap(self._request(token), Response())
+
+    @pytest.mark.asyncio
+    @patch("app.dependencies.get_azure_devops_settings")
+    @patch("app.dependencies.get_token_bucket_backend")
+    async def test_invalid_tokens_are_limited_too(self, mock_backend, mock_settings):
+        mock_backend.return_value = InMemoryTokenBucketBackend()
+        mock_settings.return_value.JWT_SECRET_STRING = "secret"
+        limiter = RateLimiter(scope="cheap", times=1, seconds=60)
+
+        await limiter(self._request("garbage"), Response())
+        with pytest.raises(HTTPException):
+            await limiter(self._request("garbage"), Response())
@@ -0,0 +1,62 @@
+import asyncio
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from app.rate_limiting import InMemoryTokenBucketBackend, SQLiteTokenBucketBackend
+from tests.base import BaseTestCase
+
+
+class TestTokenBucketBackends(BaseTestCase):
+    @pytest.mark.asyncio
+    async def test_bucket_runs_out_and_reports_wait_time(self):
+        backend = InMemoryTokenBucketBackend()
+        for _ in range(3):
+            assert await backend.acquire("key", cost=1, rate=0.5, capacity=3) == 0
+
+        assert await backend.acquire("key", cost=1, rate=0.5, capacity=3) == pytest.approx(2.0, abs=0.01)
+        assert await backend.acquire("other-key", cost=1, rate=0.5, capacity=3) == 0
+
+    @pytest.mark.asyncio
+    async def test_bucket_refills_over_time(self):
+        backend = InMemoryTokenBucketBackend()
+        with patch("app.rate_limiting.time.time", return_value=1000.0):
+            await backend.acquire("key", cost=2, rate=1, capacity=2)
+        with patch("app.rate_limiting.time.time", return_value=1001.5):
+            assert await backend.acquire("key", cost=1, rate=1, capacity=2) == 0
+            assert await backend.acquire("key", cost=1, rate=1, capacity=2) > 0
+
+    @pytest.mark.asyncio
+    async def test_forced_acquire_can_go_negative_and_negative_cost_refunds(self):
+        backend = InMemoryTokenBucketBackend()
+        with patch("app.rate_limiting.time.time", return_value=1000.0):
+            assert await backend.acquire("key", cost=5, rate=1, capacity=2, force=True) == 0
+            assert await backend.acquire("key", cost=1, rate=1, capacity=2) == pytest.approx(4.0)
+            await backend.acquire("key", cost=-10, rate=1, capacity=2, force=True)
+            assert await backend.acquire("key", cost=2, rate=1, capacity=2) == 0
+
+    @pytest.mark.asyncio
+    async def test_sqlite_buckets_are_shared_between_instances(self, tmp_path):
+        # Two instances on the same file stand in for two workers
+        first = SQLiteTokenBucketBackend(tmp_path / "limits.sqlite3")
+        second = SQLiteTokenBucketBackend(tmp_path / "limits.sqlite3")
+
+        results = await asyncio.gather(
+            *(backend.acquire("key", cost=1, rate=0.01, capacity=4) for backend in [first, second] * 4)
+        )
+
+        assert sum(1 for wait_seconds in results if wait_seconds == 0) == 4
+
+    def test_sqlite_lock_timeout_raises_the_lock_error(self, tmp_path):
+        path = tmp_path / "limits.sqlite3"
+        backend = SQLiteTokenBucketBackend(path)
+        other_worker = sqlite3.connect(path, isolation_level=None)
+        other_worker.execute("BEGIN IMMEDIATE")
+
+        with patch.object(backend, "_connect", lambda: sqlite3.connect(path, timeout=0, isolation_level=None)):
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                backend._acquire_blocking("key", cost=1, rate=1, capacity=2, force=False)
+
+        other_worker.execute("ROLLBACK")
+        other_worker.close()